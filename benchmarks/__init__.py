@@ -0,0 +1,5 @@
+"""
+Standalone benchmarks for performance-sensitive code paths.
+
+Run a benchmark with `python -m benchmarks.<module>`.
+"""
@@ -0,0 +1,78 @@
+"""
+Benchmark for the vectorized recommendation scoring engine
+
+Ranks a synthetic watchlist against synthetic top-rated titles and
+reports the median time of rank_titles. No network access is needed.
+
+Usage:
+    python -m benchmarks.bench_scoring [watchlist_size] [repeats]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault('TMDB_API_KEY', 'benchmark')
+
+from models.title_metadata import TitleMetadata  # noqa: E402
+from models.user_data import UserTitleData  # noqa: E402
+from models.title import Title  # noqa: E402
+from recommendations.scoring import (  # noqa: E402
+    rank_titles,
+    genre_scores_from_titles,
+    get_preferred_media_type
+)
+
+GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary',
+    'Drama', 'Family', 'Fantasy', 'History', 'Horror', 'Music', 'Mystery',
+    'Romance', 'Science Fiction', 'Thriller', 'War', 'Western'
+]
+
+
+def make_title(index, rating='N/A'):
+    """
+    Build a Title without touching TMDb or the identity map
+    """
+    title = Title.__new__(Title)
+    title.metadata = TitleMetadata(
+        id=index,
+        title=f'Title {index}',
+        media_type=random.choice(('movie', 'tv')),
+        release_date='2020',
+        genre_ids=[],
+        genres=random.sample(GENRES, random.randint(1, 4)),
+        popularity=random.uniform(0, 2000),
+        overview=''
+    )
+    title.user_data = UserTitleData(rating=rating)
+    return title
+
+
+def main(size=10_000, repeats=20):
+    """
+    Run the benchmark and print timings
+    """
+    random.seed(42)
+    watchlist = [make_title(i) for i in range(size)]
+    top_rated = [
+        make_title(size + i, rating=random.randint(3, 5)) for i in range(200)
+        ]
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rank_titles(
+            watchlist,
+            genre_scores_from_titles(top_rated),
+            top_k=6,
+            preferred_media_type=get_preferred_media_type(top_rated)
+            )
+        timings.append(time.perf_counter() - start)
+    print(f"rank_titles: {size} watchlist titles, {len(top_rated)} top-rated")
+    print(f"  median {statistics.median(timings) * 1000:.2f} ms, "
+          f"min {min(timings) * 1000:.2f} ms over {repeats} runs")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
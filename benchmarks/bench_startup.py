@@ -0,0 +1,77 @@
+"""
+Benchmark for CLI startup: how much is imported before the menu shows
+
+Runs `python -X importtime` in fresh interpreters, once importing only
+what `run` needs to render the main menu and once importing every module
+the menu actions use (what startup cost before imports were deferred),
+and reports the median import time of each with the slowest modules.
+The 'interpreter' scenario is the baseline imported by Python itself.
+No network access or credentials are needed.
+
+Usage:
+    python -m benchmarks.bench_startup [repeats] [top]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports timed in each interpreter
+SCENARIOS = {
+    'interpreter': 'pass',
+    'menu': 'import run',
+    'full': (
+        'import run, ui.handlers, sheets.auth, recommendations.recs, '
+        'recommendations.trending, recommendations.similarity'
+    ),
+}
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure_imports(statement):
+    """
+    Run a statement under -X importtime in a fresh interpreter
+
+    Args:
+        statement (str): Python code to run
+
+    Returns:
+        dict: top-level module -> cumulative import time in microseconds
+    """
+    env = dict(os.environ)
+    env.setdefault('TMDB_API_KEY', 'benchmark')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        # one leading space marks a module imported by the statement itself
+        if match and len(match.group(3)) == 1:
+            modules[match.group(4)] = int(match.group(2))
+    return modules
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    for name, statement in SCENARIOS.items():
+        runs = [measure_imports(statement) for _ in range(repeats)]
+        totals = [sum(modules.values()) for modules in runs]
+        slowest = sorted(
+            runs[-1].items(), key=lambda item: item[1], reverse=True
+            )[:top]
+        print(f"{name}: {statement}")
+        print(f"  median import time {statistics.median(totals) / 1000:.1f}"
+              f" ms over {repeats} runs")
+        for module, micros in slowest:
+            print(f"    {module:<32} {micros / 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
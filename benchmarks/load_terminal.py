@@ -0,0 +1,160 @@
+"""
+Load test for the web terminal: time to first menu under concurrency
+
+Opens many websocket connections to a running web terminal
+(`node index.js`) at the same moment and measures, for each, the time
+from connecting until the main menu prompt arrives. With the warm worker
+pool, the first WORKER_POOL_SIZE connections get a menu at once and the
+rest wait for workers to warm up.
+
+Only the standard library is used: a minimal websocket client that
+performs the handshake and reads server frames.
+
+Usage:
+    python -m benchmarks.load_terminal [url] [connections] [timeout]
+    (defaults: ws://localhost:$PORT/, 50 connections, 120 s)
+"""
+import base64
+import os
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+MENU_PROMPT = b'Select an option'
+
+
+def open_websocket(url, timeout):
+    """
+    Connect and perform the websocket handshake
+
+    Args:
+        url (str): ws:// URL
+        timeout (float): socket timeout in seconds
+
+    Returns:
+        tuple[socket.socket, bytes]: the connection and any bytes read
+        past the handshake response
+    """
+    parsed = urlparse(url)
+    connection = socket.create_connection(
+        (parsed.hostname, parsed.port or 80), timeout=timeout
+        )
+    key = base64.b64encode(os.urandom(16)).decode()
+    connection.sendall((
+        f'GET {parsed.path or "/"} HTTP/1.1\r\n'
+        f'Host: {parsed.netloc}\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        f'Sec-WebSocket-Key: {key}\r\n'
+        'Sec-WebSocket-Version: 13\r\n\r\n'
+        ).encode())
+    response = b''
+    while b'\r\n\r\n' not in response:
+        chunk = connection.recv(4096)
+        if not chunk:
+            raise ConnectionError('connection closed during handshake')
+        response += chunk
+    head, rest = response.split(b'\r\n\r\n', 1)
+    if b' 101 ' not in head.split(b'\r\n', 1)[0]:
+        raise ConnectionError(head.split(b'\r\n', 1)[0].decode())
+    return connection, rest
+
+
+def read_frames(connection, buffer):
+    """
+    Yield the payloads of the server's frames (unmasked, per RFC 6455)
+
+    Args:
+        connection (socket.socket): open websocket
+        buffer (bytes): bytes already read
+    """
+    while True:
+        while len(buffer) < 2:
+            buffer += _recv(connection)
+        opcode, length = buffer[0] & 0x0f, buffer[1] & 0x7f
+        offset = 2
+        if length == 126:
+            while len(buffer) < 4:
+                buffer += _recv(connection)
+            length, offset = struct.unpack('>H', buffer[2:4])[0], 4
+        elif length == 127:
+            while len(buffer) < 10:
+                buffer += _recv(connection)
+            length, offset = struct.unpack('>Q', buffer[2:10])[0], 10
+        while len(buffer) < offset + length:
+            buffer += _recv(connection)
+        payload = buffer[offset:offset + length]
+        buffer = buffer[offset + length:]
+        if opcode == 0x8:  # close
+            return
+        yield payload
+
+
+def _recv(connection):
+    chunk = connection.recv(65536)
+    if not chunk:
+        raise ConnectionError('connection closed')
+    return chunk
+
+
+def time_to_menu(url, timeout, barrier):
+    """
+    Connect once the barrier opens and wait for the menu prompt
+
+    Returns:
+        float or str: seconds until the menu, or an error message
+    """
+    barrier.wait()
+    started = time.perf_counter()
+    try:
+        connection, rest = open_websocket(url, timeout)
+        with connection:
+            received = b''
+            for payload in read_frames(connection, rest):
+                received += payload
+                if MENU_PROMPT in received:
+                    return time.perf_counter() - started
+            return 'closed before the menu'
+    except (OSError, ConnectionError) as e:
+        return str(e) or type(e).__name__
+
+
+def main():
+    url = sys.argv[1] if len(sys.argv) > 1 else (
+        f"ws://localhost:{os.getenv('PORT', '8000')}/"
+        )
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    timeout = float(sys.argv[3]) if len(sys.argv) > 3 else 120.0
+    barrier = threading.Barrier(connections)
+    results = [None] * connections
+
+    def run(index):
+        results[index] = time_to_menu(url, timeout, barrier)
+
+    threads = [
+        threading.Thread(target=run, args=(index,))
+        for index in range(connections)
+        ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    times = sorted(result for result in results if isinstance(result, float))
+    errors = [result for result in results if not isinstance(result, float)]
+    print(f"{url}: {connections} simultaneous connections")
+    if times:
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"  time to first menu: min {times[0]:.3f} s, "
+              f"median {statistics.median(times):.3f} s, "
+              f"p95 {p95:.3f} s, max {times[-1]:.3f} s")
+    if errors:
+        print(f"  {len(errors)} failed, e.g. {errors[0]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,89 @@
 const Pty = require('node-pty');
 const fs = require('fs');
 
+// Warm `run.py worker` processes kept ready for new connections
+const POOL_SIZE = parseInt(process.env.WORKER_POOL_SIZE || '2');
+// Written by a worker once its modules are imported and the sheet is open
+const WORKER_READY = '\x1b]0;reeltracker\x07';
+// Delay before replacing a worker that exited while idle
+const RESPAWN_DELAY = 1000;
+
+const pool = [];
+
 exports.install = function () {
 
     ROUTE('/');
     WEBSOCKET('/', socket, ['raw']);
 
+    // workers authorize on startup, so they need creds.json
+    credsWritten.then(replenishPool);
+
 };
 
+function spawnWorker() {
+
+    const worker = {
+        tty: null,
+        client: null,
+        ready: false,
+        onReady: null
+    };
+
+    worker.tty = Pty.spawn('python3', ['run.py', 'worker'], {
+        name: 'xterm-color',
+        cols: 80,
+        rows: 24,
+        cwd: process.env.PWD,
+        env: process.env
+    });
+
+    worker.tty.on('data', function (data) {
+        if (worker.client) {
+            worker.client.send(data);
+            return;
+        }
+        // nothing else is written before the session starts
+        if (!worker.ready && data.indexOf(WORKER_READY) !== -1) {
+            worker.ready = true;
+            worker.onReady && worker.onReady();
+        }
+    });
+
+    worker.tty.on('exit', function (code, signal) {
+        worker.tty = null;
+        const index = pool.indexOf(worker);
+        if (index !== -1) {
+            // died while idle, e.g. missing credentials
+            pool.splice(index, 1);
+            setTimeout(replenishPool, RESPAWN_DELAY);
+        }
+        if (worker.client) {
+            worker.client.tty = null;
+            worker.client.close();
+            console.log("Process killed");
+        }
+    });
+
+    pool.push(worker);
+    return worker;
+}
+
+function replenishPool() {
+    while (pool.length < POOL_SIZE) {
+        spawnWorker();
+    }
+}
+
+function acquireWorker() {
+    // a ready worker, else the one warming up the longest, else a new one
+    let worker = pool.find(function (candidate) {
+        return candidate.ready;
+    }) || pool[0] || spawnWorker();
+    pool.splice(pool.indexOf(worker), 1);
+    replenishPool();
+    return worker;
+}
+
 function socket() {
 
     this.encodedecode = false;
@@ -15,24 +91,19 @@ function socket() {
 
     this.on('open', function (client) {
 
-        // Spawn terminal
-        client.tty = Pty.spawn('python3', ['run.py'], {
-            name: 'xterm-color',
-            cols: 80,
-            rows: 24,
-            cwd: process.env.PWD,
-            env: process.env
-        });
-
-        client.tty.on('exit', function (code, signal) {
-            client.tty = null;
-            client.close();
-            console.log("Process killed");
-        });
+        // Attach a warm terminal and start its session
+        const worker = acquireWorker();
+        worker.client = client;
+        client.tty = worker.tty;
 
-        client.tty.on('data', function (data) {
-            client.send(data);
-        });
+        const start = function () {
+            worker.tty && worker.tty.write('\r');
+        };
+        if (worker.ready) {
+            start();
+        } else {
+            worker.onReady = start;
+        }
 
     });
 
@@ -49,12 +120,17 @@ function socket() {
     });
 }
 
+let credsWritten = Promise.resolve();
+
 if (process.env.CREDS != null) {
     console.log("Creating creds.json file.");
-    fs.writeFile('creds.json', process.env.CREDS, 'utf8', function (err) {
-        if (err) {
-            console.log('Error writing file: ', err);
-            socket.emit("console_output", "Error saving credentials: " + err);
-        }
+    credsWritten = new Promise(function (resolve) {
+        fs.writeFile('creds.json', process.env.CREDS, 'utf8', function (err) {
+            if (err) {
+                console.log('Error writing file: ', err);
+                socket.emit("console_output", "Error saving credentials: " + err);
+            }
+            resolve();
+        });
     });
-}
\ No newline at end of file
+}
@@ -6,7 +6,7 @@ used throughout the ReelTracker CLI application,
 including `Title` for media entries
 and `UserTitleData` for user-specific metadata
 """
-from .title import Title
+from .title import Title, SHEET_HEADERS
 from .user_data import UserTitleData
 
-__all__ = ['Title', 'UserTitleData']
+__all__ = ['Title', 'SHEET_HEADERS', 'UserTitleData']
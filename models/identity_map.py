@@ -0,0 +1,224 @@
+"""
+Title identity map
+
+Keeps one canonical `TitleMetadata` per (media_type, id) for the session,
+so the same title coming from search, trending, recommendations or
+discover is only built once. Titles read from the user's sheet are kept
+under their own keys and replaced whenever the row changes: the sheet
+owns their fields, and TMDb data never leaks into them (nor into the
+rows written back from them). The map is an LRU bounded by an
+approximate memory budget; hit rate and memory use are exposed through
+`stats()` to help tune that budget (REELTRACKER_TITLE_CACHE_KB).
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import fields
+
+DEFAULT_BUDGET_KB = 2048
+
+# Values that mean "nothing known" and never overwrite real data
+_EMPTY_VALUES = ('', 'Unknown', 'No title available', 'No overview available')
+
+
+def _is_empty(value):
+    """
+    Check if a metadata field holds no useful information
+    """
+    if value is None:
+        return True
+    if isinstance(value, (list, tuple)):
+        return not value
+    if isinstance(value, (int, float)):
+        return value == 0
+    return value in _EMPTY_VALUES
+
+
+def estimate_size(metadata):
+    """
+    Approximate memory footprint of a TitleMetadata, in bytes
+
+    Args:
+        metadata (TitleMetadata): metadata to measure
+
+    Returns:
+        int: size of the object and its field values
+    """
+    size = sys.getsizeof(metadata) + sys.getsizeof(metadata.__dict__)
+    for value in metadata.__dict__.values():
+        size += sys.getsizeof(value)
+        if isinstance(value, list):
+            size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+class TitleIdentityMap:
+    """
+    Bounded LRU of canonical TitleMetadata keyed by (media_type, id)
+
+    Attributes:
+        max_bytes (int): memory budget
+        bytes_used (int): estimated memory held by the entries
+        hits (int): lookups answered from the map
+        misses (int): lookups that required building metadata
+        evictions (int): entries dropped to stay within budget
+    """
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes (int): memory budget in bytes
+        """
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> [metadata, fingerprint, size]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, fingerprint=None):
+        """
+        Return the canonical metadata for a key
+
+        Args:
+            key (tuple): (media_type, id as str)
+            fingerprint (tuple, optional): raw source fields; when given,
+                the entry only counts as a hit if it was built from the
+                same values
+
+        Returns:
+            TitleMetadata or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (
+                fingerprint is not None and entry[1] != fingerprint
+            ):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, metadata, fingerprint=None, replace=False):
+        """
+        Store metadata, merging it into the canonical entry if present
+
+        Args:
+            key (tuple): (media_type, id as str), or another key
+                namespace such as sheet rows'
+            metadata (TitleMetadata): newly built metadata
+            fingerprint (tuple, optional): raw source fields
+            replace (bool): replace the canonical entry instead of
+                merging the non-empty fields of metadata into it (for
+                sources that own every field, e.g. sheet rows)
+
+        Returns:
+            TitleMetadata: the canonical metadata for the key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or replace:
+                if entry is not None:
+                    self.bytes_used -= entry[2]
+                entry = [metadata, fingerprint, estimate_size(metadata)]
+                self._entries[key] = entry
+                self.bytes_used += entry[2]
+            else:
+                _merge_metadata(entry[0], metadata)
+                if fingerprint is not None:
+                    entry[1] = fingerprint
+                size = estimate_size(entry[0])
+                self.bytes_used += size - entry[2]
+                entry[2] = size
+            self._entries.move_to_end(key)
+            self._evict()
+            return entry[0]
+
+    def _evict(self):
+        """
+        Drop least recently used entries until within budget
+        The most recent entry is always kept
+        """
+        while self.bytes_used > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.bytes_used -= size
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Remove all entries and reset counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, hit_rate, entries, bytes_used,
+            max_bytes and evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes_used': self.bytes_used,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+            }
+
+
+def _merge_metadata(canonical, other):
+    """
+    Copy the non-empty fields of newer metadata into canonical
+
+    Args:
+        canonical (TitleMetadata): metadata kept in the map
+        other (TitleMetadata): newly built metadata
+    """
+    for field in fields(canonical):
+        value = getattr(other, field.name)
+        if not _is_empty(value):
+            setattr(canonical, field.name, value)
+
+
+def format_stats(stats):
+    """
+    Format identity map stats for display
+
+    Args:
+        stats (dict): result of TitleIdentityMap.stats()
+
+    Returns:
+        str: one line summary
+    """
+    return (
+        f"Title cache: {stats['entries']} titles, "
+        f"{stats['bytes_used'] / 1024:.1f}"
+        f"/{stats['max_bytes'] / 1024:.0f} KB, "
+        f"hit rate {stats['hit_rate']:.0%} "
+        f"({stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['evictions']} evictions)"
+    )
+
+
+def _budget_kb():
+    """
+    REELTRACKER_TITLE_CACHE_KB, unless it isn't a number
+    """
+    try:
+        return int(os.getenv('REELTRACKER_TITLE_CACHE_KB', DEFAULT_BUDGET_KB))
+    except ValueError:
+        return DEFAULT_BUDGET_KB
+
+
+title_identity_map = TitleIdentityMap(_budget_kb() * 1024)
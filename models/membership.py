@@ -0,0 +1,64 @@
+"""
+Library membership filter
+
+Answers "is this title already in the user's list?" for TMDb candidates
+without touching the sheet. Membership is an exact hash table keyed by
+(media_type, id), so a lookup is one dict probe whatever the size of
+the library.
+"""
+
+
+def _key(title_id, media_type):
+    return (media_type, str(title_id))
+
+
+class LibraryMembership:
+    """
+    Set of the (media_type, id) keys in the library, updated incrementally
+    """
+    def __init__(self, keys=()):
+        """
+        Args:
+            keys (Iterable[tuple]): (media_type, id) keys in the library
+        """
+        # key -> number of rows with that key
+        self._counts = {}
+        for media_type, title_id in keys:
+            key = _key(title_id, media_type)
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, title_id, media_type):
+        """
+        Account for a title added to the library
+        """
+        key = _key(title_id, media_type)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def remove(self, title_id, media_type):
+        """
+        Account for a title removed from the library
+        """
+        key = _key(title_id, media_type)
+        count = self._counts.get(key, 0) - 1
+        if count > 0:
+            self._counts[key] = count
+        else:
+            self._counts.pop(key, None)
+
+    def contains(self, title_id, media_type):
+        """
+        Args:
+            title_id (int | str): TMDb id
+            media_type (str): 'movie' or 'tv'
+
+        Returns:
+            bool: True if the title is in the library
+        """
+        return _key(title_id, media_type) in self._counts
+
+    def __contains__(self, key):
+        media_type, title_id = key
+        return self.contains(title_id, media_type)
@@ -0,0 +1,297 @@
+"""
+Taste profile model
+
+Defines the `TasteProfile` aggregate, which holds everything the
+recommendations need to know about the user's preferences: rating-weighted
+genre and media type scores, (media_type, genre_id) counts and the best
+rated titles. It is updated incrementally, one row at a time, as titles
+are saved, toggled, rated or deleted, so recommendations never have to
+scan the whole library.
+"""
+import heapq
+from utils.utils import timestamp_to_epoch
+
+# Ratings from this value up count as "liked"
+MIN_TOP_RATING = 3
+# Number of best rated titles kept ordered
+TOP_TITLES_SIZE = 10
+PROFILE_VERSION = 1
+
+
+def _parse_rating(value):
+    """
+    Rating cell to int, None if not rated
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value or '').strip()
+    return int(value) if value.isdigit() else None
+
+
+def _split_list(value):
+    """
+    'a, b' cell to ['a', 'b']
+    """
+    return [item.strip() for item in str(value or '').split(',')
+            if item.strip()]
+
+
+def _sort_key(entry):
+    return entry['rating'], entry['watched_epoch']
+
+
+def _add_count(counts, key, amount):
+    """
+    Add to a counter dict, dropping keys that fall to zero
+    """
+    total = counts.get(key, 0) + amount
+    if total:
+        counts[key] = total
+    else:
+        counts.pop(key, None)
+
+
+class TasteProfile:
+    """
+    Aggregated user preferences
+
+    Attributes:
+        genre_scores (dict): genre name -> rating total of liked titles
+        media_type_scores (dict): media type -> rating total of liked titles
+        pair_counts (dict): (media_type, genre_id) -> number of titles
+        watched_count (int): number of watched titles
+        watchlist_count (int): number of watchlist titles
+    """
+    def __init__(self):
+        self.genre_scores = {}
+        self.media_type_scores = {}
+        self.pair_counts = {}
+        self.watched_count = 0
+        self.watchlist_count = 0
+        # (media_type, id) -> liked title entry
+        self._liked = {}
+        # keys of the best liked titles, best first
+        self._top = []
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build a profile from sheet rows
+
+        Args:
+            records (Iterable[dict]): rows keyed by header name
+
+        Returns:
+            TasteProfile
+        """
+        profile = cls()
+        for record in records:
+            profile.add(record)
+        return profile
+
+    # --- Events ---
+    def add(self, record):
+        """
+        Account for a row added to the library
+
+        Args:
+            record (dict): row keyed by header name
+        """
+        self._apply(record, 1)
+
+    def remove(self, record):
+        """
+        Account for a row removed from the library
+
+        Args:
+            record (dict): row keyed by header name, as it was stored
+        """
+        self._apply(record, -1)
+
+    def replace(self, old_record, new_record):
+        """
+        Account for a row changed in place (toggle, rating)
+
+        Args:
+            old_record (dict): row before the change
+            new_record (dict): row after the change
+        """
+        self.remove(old_record)
+        self.add(new_record)
+
+    def _apply(self, record, sign):
+        """
+        Add (sign=1) or subtract (sign=-1) one row from the aggregates
+        """
+        media_type = record.get('media_type')
+        key = (media_type, str(record.get('id')))
+        watched = str(record.get('is_watched', '')).lower() == 'true'
+        if watched:
+            self.watched_count += sign
+        else:
+            self.watchlist_count += sign
+        for genre_id in _split_list(record.get('genre_ids')):
+            if genre_id.isdigit():
+                _add_count(self.pair_counts, (media_type, int(genre_id)), sign)
+
+        rating = _parse_rating(record.get('rating'))
+        if not watched or rating is None or rating < MIN_TOP_RATING:
+            return
+        genres = _split_list(record.get('genres'))
+        for genre in genres:
+            _add_count(self.genre_scores, genre, sign * rating)
+        _add_count(self.media_type_scores, media_type, sign * rating)
+        if sign > 0:
+            self._liked[key] = {
+                'id': record.get('id'),
+                'media_type': media_type,
+                'title': record.get('title'),
+                'rating': rating,
+                'watched_epoch': timestamp_to_epoch(
+                    record.get('watched_date')
+                    ),
+                'genres': genres,
+            }
+            self._offer_top(key)
+        elif self._liked.pop(key, None) is not None and key in self._top:
+            self._rebuild_top()
+
+    def _offer_top(self, key):
+        """
+        Insert a liked title in the top list if it ranks high enough
+        """
+        if key in self._top:
+            self._top.remove(key)
+        entry_key = _sort_key(self._liked[key])
+        position = len(self._top)
+        for index, top_key in enumerate(self._top):
+            if entry_key > _sort_key(self._liked[top_key]):
+                position = index
+                break
+        self._top.insert(position, key)
+        del self._top[TOP_TITLES_SIZE:]
+
+    def _rebuild_top(self):
+        """
+        Recompute the top list after one of its titles left
+        """
+        self._top = heapq.nlargest(
+            TOP_TITLES_SIZE, self._liked,
+            key=lambda key: _sort_key(self._liked[key])
+            )
+
+    # --- Queries ---
+    def has_top_rated(self):
+        """
+        Returns:
+            bool: True if at least one watched title is rated 3 or more
+        """
+        return bool(self._liked)
+
+    def preferred_genre(self):
+        """
+        Returns:
+            str or None: genre with the highest rating total
+        """
+        if not self.genre_scores:
+            return None
+        return max(self.genre_scores, key=self.genre_scores.get)
+
+    def preferred_media_type(self):
+        """
+        Returns:
+            str or None: media type with the highest rating total
+        """
+        if not self.media_type_scores:
+            return None
+        return max(self.media_type_scores, key=self.media_type_scores.get)
+
+    def preferred_media_type_and_genre_id(self):
+        """
+        Returns:
+            tuple[str, int] or None: most frequent (media_type, genre_id)
+            across all titles in the library
+        """
+        if not self.pair_counts:
+            return None
+        return max(self.pair_counts, key=self.pair_counts.get)
+
+    def top_titles(self, count=TOP_TITLES_SIZE):
+        """
+        Best liked titles by rating, then most recently watched
+
+        Args:
+            count (int): number of titles, up to TOP_TITLES_SIZE
+
+        Returns:
+            list[dict]: entries with id, media_type, title, rating,
+            watched_epoch and genres
+        """
+        return [self._liked[key] for key in self._top[:count]]
+
+    def top_title(self, genre=None):
+        """
+        Best liked title, optionally within a genre
+
+        Args:
+            genre (str, optional): genre the title must have
+
+        Returns:
+            dict or None: title entry (see top_titles)
+        """
+        for key in self._top:
+            entry = self._liked[key]
+            if genre is None or genre in entry['genres']:
+                return entry
+        in_genre = [
+            entry for entry in self._liked.values()
+            if genre in entry['genres']
+            ]
+        return max(in_genre, key=_sort_key) if in_genre else None
+
+    # --- Persistence ---
+    def to_dict(self):
+        """
+        Returns:
+            dict: JSON serializable representation
+        """
+        return {
+            'version': PROFILE_VERSION,
+            'genre_scores': self.genre_scores,
+            'media_type_scores': self.media_type_scores,
+            'pair_counts': [
+                [media_type, genre_id, count]
+                for (media_type, genre_id), count in self.pair_counts.items()
+                ],
+            'watched_count': self.watched_count,
+            'watchlist_count': self.watchlist_count,
+            'liked': list(self._liked.values()),
+            'top': [list(key) for key in self._top],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Args:
+            data (dict): result of to_dict()
+
+        Returns:
+            TasteProfile or None: None if the data is from another version
+        """
+        if data.get('version') != PROFILE_VERSION:
+            return None
+        profile = cls()
+        profile.genre_scores = dict(data['genre_scores'])
+        profile.media_type_scores = dict(data['media_type_scores'])
+        profile.pair_counts = {
+            (media_type, genre_id): count
+            for media_type, genre_id, count in data['pair_counts']
+            }
+        profile.watched_count = data['watched_count']
+        profile.watchlist_count = data['watchlist_count']
+        profile._liked = {
+            (entry['media_type'], str(entry['id'])): entry
+            for entry in data['liked']
+            }
+        profile._top = [tuple(key) for key in data['top']]
+        return profile
@@ -8,10 +8,10 @@ user-generated data such as watch status and ratings
 The class supports integration with Google Sheets for persistent storage,
 and includes methods for data transformation from and to spreadsheet rows.
 """
-
+import heapq
+from collections.abc import Sequence
 from utils.utils import (
     calculate_weighted_popularity,
-    sort_items_by_popularity,
     extract_year
     )
 from tmdb.utils import (
@@ -20,6 +20,47 @@ from tmdb.utils import (
     )
 from .user_data import UserTitleData
 from .title_metadata import TitleMetadata
+from .identity_map import title_identity_map
+from utils.tracing import traced
+
+# Default column order of the My_List worksheet
+SHEET_HEADERS = [
+    "id", "title", "media_type", "release_date",
+    "genre_ids", "genres", "weighted_popularity", "overview",
+    "is_watched", "added_date", "watched_date", "rating"
+]
+# Identity map key namespace of metadata read from sheet rows
+SHEET_KEY = 'sheet'
+# Row fields the metadata of a sheet title is built from
+_SHEET_METADATA_FIELDS = (
+    "title", "release_date", "genre_ids", "genres",
+    "weighted_popularity", "overview"
+)
+
+
+def _metadata_from_sheet_dict(row):
+    """
+    TitleMetadata of a sheet row, or of a to_sheet_dict() mapping
+    """
+    genre_ids = [
+        int(g.strip())
+        for g in str(row.get('genre_ids', '')).split(',')
+        if g.strip().isdigit()
+    ] if row.get('genre_ids') else []
+
+    genres = [
+        g.strip() for g in row.get('genres', '').split(',')
+    ] if row.get('genres') else []
+    return TitleMetadata(
+        id=row.get('id'),
+        title=row.get('title'),
+        media_type=row.get('media_type'),
+        release_date=row.get('release_date'),
+        genre_ids=genre_ids,
+        genres=genres,
+        popularity=float(row.get('weighted_popularity', 0)),
+        overview=row.get('overview', 'No overview available')
+    )
 
 
 class Title:
@@ -32,44 +73,63 @@ class Title:
         like title, genre, release date, etc
         user_data (UserTitleData): Stores user-generated attributes
         (watched, rating, etc.)
+        in_library (bool or None): True if the title is already in the
+        user's list, None if it wasn't checked
     """
-    def __init__(self, data):
+    def __init__(self, data, weighted_popularity=None, media_type=None):
         """
         Initializes a Title object from TMDb API data
+        Metadata is shared through the title identity map and only
+        rebuilt when the raw fields differ from the cached ones
 
         Args:
             data (dict): Dictionary containing TMDb API response fields
+            weighted_popularity (float, optional): precomputed score,
+                defaults to data['weighted_popularity']
+            media_type (str, optional): media type overriding data's value
         """
-        release_date = (
-            data.get('release_date') or data.get('first_air_date') or 'Unknown'
-            )
-        self.release_date = (
-            extract_year(release_date)
-            if release_date != 'Unknown'
-            else release_date
+        if weighted_popularity is None:
+            weighted_popularity = data.get('weighted_popularity', 0)
+        if media_type is None:
+            media_type = data.get('media_type', 'Unknown')
+        popularity = round(weighted_popularity, 2)
+        raw_release_date = (
+            data.get('release_date') or data.get('first_air_date')
             )
         genre_ids = data.get('genre_ids', [])
-        self.metadata = TitleMetadata(
-            id=data.get('id'),
-            title=str(
-                data.get('title') or data.get('name') or 'No title available'
-                ),
-            media_type=data.get('media_type', 'Unknown'),
-            release_date=self.release_date,
-            genre_ids=genre_ids,
-            genres=(
-                get_genre_names_from_ids(
-                    genre_ids,
-                    data.get('media_type', 'Unknown')
-                    )
-                if genre_ids else []
-                ),
-            popularity=round(data.get('weighted_popularity', 0), 2),
-            overview=data.get(
-                'overview',
-                'No overview available').replace('\n', '')
-        )
+        key = (media_type, str(data.get('id')))
+        # Raw fields the metadata derives from: same values, same metadata
+        fingerprint = (
+            popularity,
+            raw_release_date,
+            tuple(genre_ids),
+            data.get('title') or data.get('name'),
+            data.get('overview')
+            )
+        metadata = title_identity_map.get(key, fingerprint)
+        if metadata is None:
+            metadata = title_identity_map.put(key, TitleMetadata(
+                id=data.get('id'),
+                title=str(
+                    data.get('title') or data.get('name')
+                    or 'No title available'
+                    ),
+                media_type=media_type,
+                release_date=extract_year(raw_release_date),
+                genre_ids=genre_ids,
+                genres=(
+                    get_genre_names_from_ids(genre_ids, media_type)
+                    if genre_ids else []
+                    ),
+                popularity=popularity,
+                overview=data.get(
+                    'overview',
+                    'No overview available').replace('\n', '')
+            ), fingerprint)
+        self.metadata = metadata
+        self.release_date = metadata.release_date
         self.user_data = UserTitleData()
+        self.in_library = None
 
     def toggle_watched(self, rating=None):
         """
@@ -96,86 +156,199 @@ class Title:
         """
         self.user_data.set_rating(rating)
 
+    def to_sheet_dict(self):
+        """
+        Converts title object into a column name -> cell value mapping
+        suitable for Google Sheets
+
+        Returns:
+            dict: title metadata and user data keyed by SHEET_HEADERS
+        """
+        return {
+            'id': str(self.metadata.id),
+            'title': self.metadata.title,
+            'media_type': self.metadata.media_type,
+            'release_date': str(self.metadata.release_date),
+            'genre_ids': ', '.join(map(str, self.metadata.genre_ids)),
+            'genres': ', '.join(map(str, self.metadata.genres)),
+            'weighted_popularity': str(self.metadata.popularity),
+            'overview': self.metadata.overview,
+            'is_watched': str(self.user_data.watched),
+            'added_date': self.user_data.added_date,
+            'watched_date': self.user_data.watched_date,
+            'rating': str(self.user_data.rating)
+        }
+
     def to_sheet_row(self):
         """
         Converts title object into list format
-        suitable for Google Sheets
+        suitable for Google Sheets, in SHEET_HEADERS order
 
         Returns:
             lists: title metadata and user data as lists
         """
-        values = [
-            str(self.metadata.id),
-            self.metadata.title,
-            self.metadata.media_type,
-            str(self.metadata.release_date),
-            ', '.join(map(str, self.metadata.genre_ids)),
-            ', '.join(map(str, self.metadata.genres)),
-            str(self.metadata.popularity),
-            self.metadata.overview,
-            str(self.user_data.watched),
-            self.user_data.added_date,
-            self.user_data.watched_date,
-            str(self.user_data.rating)
-        ]
-        return values
+        values = self.to_sheet_dict()
+        return [values[header] for header in SHEET_HEADERS]
 
     @classmethod
     def from_sheet_row(cls, row):
         """
         Creates a Title object (including user data) from Google Sheet row
-        This method reconstructs both metadata and user data
+        This method reconstructs both metadata and user data, reusing
+        the metadata built from the same row values if there is one
 
         Args:
             row (dict): dictionary representing a row from Google Sheets
         Returns:
             obj: reconstructed Title object
         """
-        genre_ids = [
-            int(g.strip()) for g in str(row.get('genre_ids', '')).split(',')
-            if g.strip().isdigit()
-        ] if row.get('genre_ids') else []
-
-        # genre_ids = [
-        # int(g.strip()) for g in row.get('genre_ids', '').split(',')
-        # if g.strip().isdigit()
-        # ] if row.get('genre_ids') else []
-
-        genres = [
-            g.strip() for g in row.get('genres', '').split(',')
-        ] if row.get('genres') else []
-        metadata = TitleMetadata(
-            id=row.get('id'),
-            title=row.get('title'),
-            media_type=row.get('media_type'),
-            release_date=row.get('release_date'),
-            genre_ids=genre_ids,
-            genres=genres,
-            popularity=float(row.get('weighted_popularity', 0)),
-            overview=row.get('overview', 'No overview available')
-        )
+        # kept apart from TMDb metadata: the row owns these fields
+        key = (SHEET_KEY, row.get('media_type'), str(row.get('id')))
+        fingerprint = tuple(
+            str(row.get(field, '')) for field in _SHEET_METADATA_FIELDS
+            )
+        metadata = title_identity_map.get(key, fingerprint)
+        if metadata is None:
+            metadata = title_identity_map.put(
+                key, _metadata_from_sheet_dict(row), fingerprint,
+                replace=True
+                )
 
         user_data = UserTitleData.from_dict(row)
 
         obj = cls.__new__(cls)  # Bypass __init__
         obj.metadata = metadata
         obj.user_data = user_data
+        obj.in_library = True
         return obj
 
+    @classmethod
+    def from_sheet_dict(cls, values):
+        """
+        Rebuild a Title from a to_sheet_dict() mapping saved outside the
+        sheet, e.g. a cached recommendation
+        Its metadata stays out of the identity map: a saved copy must not
+        replace a sheet row's metadata nor TMDb's current data
+
+        Args:
+            values (dict): to_sheet_dict() result, user fields optional
 
+        Returns:
+            Title: title with in_library unset
+        """
+        obj = cls.__new__(cls)  # Bypass __init__
+        obj.metadata = _metadata_from_sheet_dict(values)
+        obj.user_data = UserTitleData.from_dict(values)
+        obj.in_library = None
+        return obj
+
+
+class RankedTitles(Sequence):
+    """
+    Read-only list of Title objects ranked by a score
+    (weighted popularity unless another ranking is given)
+
+    Only the top k raw results are ordered up front (heap selection),
+    the remainder is sorted the first time an index past k is read.
+    Title objects are built on first access and then reused.
+    Raw result dicts are never modified.
+    """
+    def __init__(
+        self,
+        results,
+        scores,
+        media_types,
+        top_k,
+        popularity=None,
+        saved=None
+    ):
+        """
+        Args:
+            results (list[dict]): raw TMDb results
+            scores (list): ranking keys, aligned with results
+            media_types (list[str]): media type, aligned with results
+            top_k (int): number of results to rank eagerly
+            popularity (list[float], optional): weighted popularity,
+                aligned with results, defaults to scores
+            saved (list[bool], optional): library membership,
+                aligned with results, sets Title.in_library
+        """
+        self._results = results
+        self._scores = scores
+        self._popularity = scores if popularity is None else popularity
+        self._media_types = media_types
+        self._saved = saved
+        self._order = heapq.nlargest(
+            top_k, range(len(results)), key=scores.__getitem__
+            )
+        self._titles = {}
+
+    def __len__(self):
+        return len(self._results)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('RankedTitles index out of range')
+        if index >= len(self._order):
+            self._rank_remaining()
+        position = self._order[index]
+        title = self._titles.get(position)
+        if title is None:
+            title = Title(
+                self._results[position],
+                weighted_popularity=self._popularity[position],
+                media_type=self._media_types[position]
+                )
+            if self._saved is not None:
+                title.in_library = self._saved[position]
+            self._titles[position] = title
+        return title
+
+    def _rank_remaining(self):
+        """
+        Append the results left out of the top k, by descending score
+        """
+        selected = set(self._order)
+        remaining = [
+            i for i in range(len(self._results)) if i not in selected
+            ]
+        remaining.sort(key=self._scores.__getitem__, reverse=True)
+        self._order.extend(remaining)
+
+
+@traced('titles.from_tmdb')
 def prepare_title_objects_from_tmdb(
     api_results,
     skip_filter=False,
-    known_media_type=None
+    known_media_type=None,
+    top_k=6,
+    membership=None,
+    drop_saved=False
 ):
     """
-    Filters, sorts, and converts TMDB api results into Title objects
+    Filters, ranks, and converts TMDB api results into Title objects
+
+    Weighted popularity is computed into a side list, so the raw
+    results stay untouched, and only the top_k results are ranked
+    and built right away. The rest are built lazily if accessed.
+    With a library membership filter, titles already in the user's
+    list are either marked (Title.in_library) or dropped.
 
     Args:
         api_results (list): Raw results from TMDB API
+        skip_filter (bool): skip filtering by media type
+        known_media_type (str, optional): media type for results missing one
+        top_k (int): number of titles to rank eagerly
+        membership (LibraryMembership, optional): titles in the library
+        drop_saved (bool): drop titles in the library instead of
+            marking them
 
     Returns:
-        list[Title]: List of Title objects ready to display
+        RankedTitles: Title objects ready to display, most popular first
     """
     results = (
         api_results if skip_filter
@@ -184,11 +357,24 @@ def prepare_title_objects_from_tmdb(
 
     if not results:
         return []
+    media_types = []
     for result in results:
-        weighted_popularity = calculate_weighted_popularity(result)
-        result['weighted_popularity'] = weighted_popularity
-        if 'media_type' not in result or result['media_type'] == 'Unknown':
-            result['media_type'] = known_media_type
-    sorted_results = sort_items_by_popularity(results)
-    title_objects = [Title(result) for result in sorted_results]
-    return title_objects
+        media_type = result.get('media_type')
+        if not media_type or media_type == 'Unknown':
+            media_type = known_media_type
+        media_types.append(media_type)
+    saved = None
+    if membership is not None:
+        saved = [
+            membership.contains(result.get('id'), media_type)
+            for result, media_type in zip(results, media_types)
+            ]
+        if drop_saved:
+            kept = [i for i, is_saved in enumerate(saved) if not is_saved]
+            results = [results[i] for i in kept]
+            media_types = [media_types[i] for i in kept]
+            saved = [False] * len(kept)
+            if not results:
+                return []
+    scores = [calculate_weighted_popularity(result) for result in results]
+    return RankedTitles(results, scores, media_types, top_k, saved=saved)
@@ -0,0 +1,215 @@
+"""
+Fuzzy title search over the user's library
+
+A trigram index: every title is normalized (lowercase, accents and
+punctuation dropped) and split into the overlapping 3-character windows
+of each padded word, e.g. 'matrix' -> '  m', ' ma', 'mat', ... 'ix '.
+A query matches the titles sharing the most trigrams with it, so typos
+and partial words still find the title. Titles are keyed by
+(media_type, id) like the membership filter, so row moves don't touch
+the index, and it's updated title by title as the library changes.
+
+Every title gets a small integer id and each posting is a numpy array
+of ids, so a query counts the trigrams each title shares with it in
+one np.bincount over the query's postings instead of a Python loop over
+every posting entry. The index is built in one pass; a later change
+copies the arrays of the title's trigrams, which is cheap next to a
+query.
+"""
+import re
+import unicodedata
+import numpy as np
+
+# Share of the query's trigrams a title must have to match
+MIN_SIMILARITY = 0.5
+# Candidates re-ranked with the exact substring bonus, per match wanted
+RERANK_FACTOR = 4
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """
+    Lowercase, strip accents and replace punctuation with spaces
+
+    Args:
+        text (str): title or query
+
+    Returns:
+        str: normalized words separated by single spaces
+    """
+    text = str(text)
+    if text.isascii():
+        text = text.casefold()  # nothing to decompose
+    else:
+        text = unicodedata.normalize('NFKD', text).casefold()
+        text = ''.join(
+            char for char in text if not unicodedata.combining(char)
+            )
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def trigrams(text):
+    """
+    Args:
+        text (str): normalized text
+
+    Returns:
+        set[str]: trigrams of every word, padded with two spaces in
+        front and one behind
+    """
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TitleSearchIndex:
+    """
+    Trigram index of titles keyed by (media_type, id as str)
+    """
+    def __init__(self, entries=()):
+        """
+        Args:
+            entries (Iterable[tuple]): (media_type, id, title) triples
+        """
+        # trigram -> np.ndarray of title ids
+        self._postings = {}
+        # key -> title id, and title id -> key (None once removed)
+        self._ids = {}
+        self._keys = []
+        self._free = []
+        # title id -> normalized title, and its trigram count
+        self._texts = []
+        self._sizes = np.zeros(0, dtype=np.intp)
+        self._build(entries)
+
+    def _build(self, entries):
+        """
+        Index the first titles in one pass, with lists as postings
+        """
+        postings = {}
+        sizes = []
+        repeated = []
+        for media_type, title_id, title in entries:
+            key = (media_type, str(title_id))
+            if key in self._ids:
+                repeated.append((title_id, media_type, title))
+                continue
+            text = normalize(title)
+            grams = trigrams(text)
+            doc = len(self._keys)
+            self._ids[key] = doc
+            self._keys.append(key)
+            self._texts.append(text)
+            sizes.append(len(grams))
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = [doc]
+                else:
+                    posting.append(doc)
+        self._sizes = np.array(sizes, dtype=np.intp)
+        self._postings = {
+            gram: np.array(docs, dtype=np.intp)
+            for gram, docs in postings.items()
+            }
+        for title_id, media_type, title in repeated:
+            self.add(title_id, media_type, title)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, title_id, media_type, title):
+        """
+        Index a title, replacing its previous title if any
+        """
+        key = (media_type, str(title_id))
+        if key in self._ids:
+            self.remove(title_id, media_type)
+        text = normalize(title)
+        grams = trigrams(text)
+        if self._free:
+            doc = self._free.pop()
+            self._keys[doc] = key
+            self._texts[doc] = text
+        else:
+            doc = len(self._keys)
+            self._keys.append(key)
+            self._texts.append(text)
+            if doc >= len(self._sizes):
+                self._sizes = np.resize(self._sizes, max(64, 2 * doc))
+        self._sizes[doc] = len(grams)
+        self._ids[key] = doc
+        for gram in grams:
+            posting = self._postings.get(gram)
+            self._postings[gram] = (
+                np.array([doc], dtype=np.intp) if posting is None
+                else np.append(posting, doc)
+                )
+
+    def remove(self, title_id, media_type):
+        """
+        Drop a title from the index if it's there
+        """
+        key = (media_type, str(title_id))
+        doc = self._ids.pop(key, None)
+        if doc is None:
+            return
+        for gram in trigrams(self._texts[doc]):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting = posting[posting != doc]
+            if len(posting):
+                self._postings[gram] = posting
+            else:
+                del self._postings[gram]
+        self._keys[doc] = None
+        self._texts[doc] = ''
+        self._sizes[doc] = 0
+        self._free.append(doc)
+
+    def search(self, query, limit=10):
+        """
+        Titles most similar to a query
+
+        Titles sharing at least MIN_SIMILARITY of the query's trigrams
+        score the Jaccard similarity of the two trigram sets; the best
+        are re-ranked with a bonus of one if the query appears in them
+        as typed, so exact substrings rank first.
+
+        Args:
+            query (str): text typed by the user
+            limit (int): maximum number of matches
+
+        Returns:
+            list[tuple[tuple, float]]: (key, score), best first
+        """
+        text = normalize(query)
+        grams = trigrams(text)
+        arrays = [
+            self._postings[gram] for gram in grams if gram in self._postings
+            ]
+        if not arrays:
+            return []
+        shared = np.bincount(
+            np.concatenate(arrays), minlength=len(self._keys)
+            )
+        candidates = np.flatnonzero(shared >= MIN_SIMILARITY * len(grams))
+        if not len(candidates):
+            return []
+        counts = shared[candidates]
+        scores = counts / (len(grams) + self._sizes[candidates] - counts)
+        best = min(len(candidates), limit * RERANK_FACTOR)
+        top = np.argpartition(-scores, best - 1)[:best]
+        ranked = []
+        for position in top:
+            doc = int(candidates[position])
+            score = float(scores[position])
+            if text in self._texts[doc]:
+                score += 1
+            ranked.append((doc, score))
+        ranked.sort(key=lambda item: (-item[1], len(self._texts[item[0]])))
+        return [(self._keys[doc], score) for doc, score in ranked[:limit]]
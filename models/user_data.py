@@ -5,7 +5,7 @@ This module contains the UserTitleData class,
 which tracks user-specific metadata
 for media titles such as watch status, dates, and rating
 """
-from utils.utils import get_current_timestamp
+from utils.utils import get_current_timestamp, timestamp_to_epoch
 
 
 class UserTitleData:
@@ -15,8 +15,10 @@ class UserTitleData:
 
     Attributes:
         added_date (str): Timestamp of when the title was added
+        added_epoch (int): added_date as epoch seconds (0 if unset)
         watched (bool): Identifies if title has been watched
         watched_date (str): Timestamp of when the title was watched
+        watched_epoch (int): watched_date as epoch seconds (0 if unset)
         rating ([int, str]): User's rating for the title (1-5) or 'N/A'
     """
     def __init__(
@@ -39,6 +41,30 @@ class UserTitleData:
         self.watched_date = watched_date
         self.rating = rating
 
+    @property
+    def added_date(self):
+        """
+        str: Timestamp of when the title was added
+        """
+        return self._added_date
+
+    @added_date.setter
+    def added_date(self, value):
+        self._added_date = value
+        self.added_epoch = timestamp_to_epoch(value)
+
+    @property
+    def watched_date(self):
+        """
+        str: Timestamp of when the title was watched
+        """
+        return self._watched_date
+
+    @watched_date.setter
+    def watched_date(self, value):
+        self._watched_date = value
+        self.watched_epoch = timestamp_to_epoch(value)
+
     def toggle_watched(self, rating=None):
         """
         Toggles watch status of a title
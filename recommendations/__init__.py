@@ -3,10 +3,15 @@ Initializes the recommendation module by exposing main handler functions.
 
 Enables external modules to access core recommendation features directly.
 """
+from .candidates import (
+    fetch_seed_recommendations,
+    merge_candidates,
+    generate_candidate_titles,
+    rerank_by_similarity
+)
 from .display import display_and_select_title
 from .filters import (
     get_top_rated_titles,
-    get_preferred_media_type_and_genre_ids,
     filter_list_by_genre,
     partition_list_by_media_type
 )
@@ -15,6 +20,7 @@ from .genre_analysis import (
     calculate_genre_similarity
 )
 from .handlers import (
+    handle_more_like_this,
     handle_no_watchlist_items,
     handle_no_items,
     handle_no_watched_items,
@@ -22,37 +28,61 @@ from .handlers import (
 )
 from .recs import handle_recommendations
 from .smart_recs import (
-    get_top_title_by_preferred_genre,
     generate_recommendations_from_history,
     handle_no_top_rated,
     get_personalized_recommendations,
-    reorder_titles_by_media_type
+    load_watchlist_titles
 )
-from .trending import show_trending_titles
-from .utils import (
-    get_top_title,
-    sort_titles_by_relevance
+from .result_cache import (
+    ResultCache,
+    recommendation_cache,
+    cached_result,
+    clone_title
 )
+from .similarity import (
+    SimilarityIndex,
+    tokenize,
+    document_terms,
+    load_similarity_index,
+    get_similarity_index,
+    save_similarity_index,
+    taste_query,
+    blend_scores
+)
+from .trending import show_trending_titles
 
 __all__ = [
+    "fetch_seed_recommendations",
+    "merge_candidates",
+    "generate_candidate_titles",
+    "rerank_by_similarity",
     "display_and_select_title",
     "get_top_rated_titles",
-    "get_preferred_media_type_and_genre_ids",
     "filter_list_by_genre",
     "partition_list_by_media_type",
     "get_preferred_genre",
     "calculate_genre_similarity",
+    "handle_more_like_this",
     "handle_no_watchlist_items",
     "handle_no_items",
     "handle_no_watched_items",
     "handle_watched_and_watchlist",
     "handle_recommendations",
-    "get_top_title_by_preferred_genre",
     "generate_recommendations_from_history",
     "handle_no_top_rated",
     "get_personalized_recommendations",
-    "reorder_titles_by_media_type",
+    "load_watchlist_titles",
+    "ResultCache",
+    "recommendation_cache",
+    "cached_result",
+    "clone_title",
+    "SimilarityIndex",
+    "tokenize",
+    "document_terms",
+    "load_similarity_index",
+    "get_similarity_index",
+    "save_similarity_index",
+    "taste_query",
+    "blend_scores",
     "show_trending_titles",
-    "get_top_title",
-    "sort_titles_by_relevance",
 ]
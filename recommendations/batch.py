@@ -0,0 +1,106 @@
+"""
+Batch precompute of recommendations for many spreadsheets.
+
+The main process opens every spreadsheet and downloads its library, then
+scores the libraries in a process pool: one library per task, so
+throughput scales with the number of cores. Workers share the TMDb
+response cache and the item graph read-only, and send back serialized
+results, which the main process writes to each user's precomputed file.
+"""
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from sheets.library import Library, get_library, register_library
+from tmdb.cache import CACHE_FILE, ResponseCache, set_response_cache
+from tmdb.utils import get_genre_table, get_genre_tables, set_genre_tables
+from storage.paths import cache_path
+from .item_graph import GRAPH_FILE, ItemGraph, set_item_graph
+from .precompute import compute_flows
+from .result_cache import serialize_results, write_precomputed
+
+# Stand-in for a spreadsheet inside worker processes: flows only
+# need its id, the library is registered under it beforehand
+SheetRef = namedtuple('SheetRef', ['id', 'title'])
+
+
+def _init_worker(genre_tables):
+    """
+    Open the shared caches read-only in a worker process
+
+    Args:
+        genre_tables (dict): genre tables loaded by the main process
+    """
+    set_response_cache(ResponseCache(cache_path(CACHE_FILE), read_only=True))
+    set_item_graph(ItemGraph(cache_path(GRAPH_FILE), read_only=True))
+    set_genre_tables(genre_tables)
+
+
+def score_library(sheet_ref, values):
+    """
+    Compute every recommendation flow for one library (worker task)
+
+    Args:
+        sheet_ref (SheetRef): id and title of the spreadsheet
+        values (list[list[str]]): worksheet values, header row first
+
+    Returns:
+        tuple[SheetRef, dict, float]: the sheet, its serialized flow
+        results and the time spent
+    """
+    started = time.perf_counter()
+    library = Library.from_values(values)
+    register_library(sheet_ref, library)
+    results = compute_flows(
+        sheet_ref, library.get_profile(), library.content_hash(),
+        verbose=False
+        )
+    return sheet_ref, serialize_results(results), (
+        time.perf_counter() - started
+        )
+
+
+def batch_precompute(google_sheets, max_workers=None):
+    """
+    Precompute recommendations for several spreadsheets in parallel
+
+    Args:
+        google_sheets (list[gspread.Spreadsheet]): opened spreadsheets
+        max_workers (int, optional): worker processes, one per core
+            (up to the number of sheets) if None
+
+    Returns:
+        dict: spreadsheet title -> number of precomputed titles
+    """
+    jobs = []
+    for google_sheet in google_sheets:
+        library = get_library(google_sheet)
+        if library is None:
+            print(f"\n❌  No worksheet found in '{google_sheet.title}'.")
+            continue
+        jobs.append((
+            SheetRef(google_sheet.id, google_sheet.title), library.values()
+            ))
+    if not jobs:
+        return {}
+    # load genre names once instead of once per worker
+    for media_type in ('movie', 'tv'):
+        get_genre_table(media_type)
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+    summary = {}
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(get_genre_tables(),)
+    ) as pool:
+        futures = [pool.submit(score_library, *job) for job in jobs]
+        for future in futures:
+            sheet_ref, flows, elapsed = future.result()
+            write_precomputed(sheet_ref, flows)
+            summary[sheet_ref.title] = sum(
+                len(entry['titles']) for entry in flows.values()
+                )
+            print(f"   - {sheet_ref.title}: {summary[sheet_ref.title]} "
+                  f"titles in {len(flows)} flows ({elapsed:.2f}s)")
+    return summary
@@ -0,0 +1,224 @@
+"""
+Multi-seed candidate generation from TMDb recommendations
+
+Fetches the recommendation lists of several top-rated titles at once,
+through a bounded thread pool, and stores them in the item graph, which
+ranks candidates by personalized PageRank seeded by the ratings of all
+favorites, across everything fetched so far. With a similarity index,
+the graph score is blended with content similarity.
+
+The baseline ranker merges the seeds' responses directly: a candidate
+scores the sum of the ratings of the seeds that produced it, so titles
+suggested by many favorites rank first. It is used when the graph
+ranks no candidate.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from tmdb.tmdb_api import (
+    TMDB_API_KEY,
+    fetch_title_base_recommendation
+    )
+from utils.utils import calculate_weighted_popularity
+from utils.tracing import traced
+from models.title import Title, RankedTitles
+from .similarity import blend_scores
+from .item_graph import node_key
+
+# Number of top-rated titles used as seeds
+SEED_COUNT = 5
+# Concurrent TMDb requests
+MAX_WORKERS = 5
+# Titles taken from the item graph before re-ranking
+GRAPH_CANDIDATES = 40
+
+
+@traced('tmdb.seed_recommendations')
+def fetch_seed_recommendations(seeds, max_workers=MAX_WORKERS, graph=None):
+    """
+    Fetch the TMDb recommendations of every seed concurrently
+
+    Args:
+        seeds (list[dict]): entries with 'media_type' and 'id'
+        max_workers (int): maximum concurrent requests
+        graph (ItemGraph, optional): graph the responses are stored in
+
+    Returns:
+        list[list[dict]]: raw results, aligned with seeds
+    """
+    if not seeds:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(seeds))
+    ) as pool:
+        # each request runs in a copy of the caller's context,
+        # so it counts against the caller's session quota
+        futures = [
+            pool.submit(
+                contextvars.copy_context().run,
+                fetch_title_base_recommendation,
+                seed['media_type'], seed['id'], TMDB_API_KEY
+                )
+            for seed in seeds
+            ]
+        responses = [future.result() for future in futures]
+    if graph is not None:
+        for seed, results in zip(seeds, responses):
+            graph.add_recommendations(seed, results)
+    return responses
+
+
+def merge_candidates(seeds, responses, exclude=None):
+    """
+    Merge and dedupe the seeds' recommendations
+
+    Args:
+        seeds (list[dict]): entries with 'media_type', 'id' and 'rating'
+        responses (list[list[dict]]): raw results, aligned with seeds
+        exclude (callable, optional): exclude(title_id, media_type) is
+            True for titles to leave out (e.g. already in the library)
+
+    Returns:
+        tuple[list[dict], list[str], list[int]]: unique raw results,
+        their media type and their seed score (sum of the ratings of
+        the seeds that recommended them)
+    """
+    positions = {}
+    results, media_types, seed_scores = [], [], []
+    for seed, seed_results in zip(seeds, responses):
+        for result in seed_results:
+            media_type = result.get('media_type') or seed['media_type']
+            if media_type not in ('movie', 'tv'):
+                continue
+            key = (media_type, str(result.get('id')))
+            position = positions.get(key)
+            if position is None:
+                if exclude is not None and exclude(key[1], media_type):
+                    continue
+                position = positions[key] = len(results)
+                results.append(result)
+                media_types.append(media_type)
+                seed_scores.append(0)
+            seed_scores[position] += seed['rating']
+    return results, media_types, seed_scores
+
+
+@traced('seed.candidates')
+def generate_candidate_titles(seeds, exclude=None, top_k=6, index=None):
+    """
+    Build ranked candidate titles from several seed titles
+
+    Args:
+        seeds (list[dict]): top-rated entries (see TasteProfile.top_titles)
+        exclude (callable, optional): exclude(title_id, media_type)
+        top_k (int): number of titles to rank eagerly
+        index (SimilarityIndex, optional): when given, candidates are
+            indexed and re-ranked by content similarity to the seeds
+
+    Returns:
+        RankedTitles or list: candidates, highest seed score first with
+        weighted popularity as tie-breaker, [] if there are none
+    """
+    responses = fetch_seed_recommendations(seeds)
+    results, media_types, seed_scores = merge_candidates(
+        seeds, responses, exclude
+        )
+    if not results:
+        return []
+    popularity = [calculate_weighted_popularity(result) for result in results]
+    # excluded titles are gone, so the rest are known not to be saved
+    saved = [False] * len(results) if exclude is not None else None
+    if index is None:
+        ranking = list(zip(seed_scores, popularity))
+        return RankedTitles(
+            results, ranking, media_types, top_k, popularity, saved
+            )
+    titles = [
+        Title(result, weighted_popularity=score, media_type=media_type)
+        for result, score, media_type in zip(results, popularity, media_types)
+        ]
+    if saved is not None:
+        for title in titles:
+            title.in_library = False
+    return rerank_by_similarity(titles, seed_scores, seeds, index)
+
+
+@traced('graph.candidates')
+def generate_graph_candidates(
+    seeds,
+    graph,
+    exclude=None,
+    index=None,
+    count=GRAPH_CANDIDATES
+):
+    """
+    Build candidate titles from the item graph by personalized PageRank
+    Only seeds the graph hasn't fetched recommendations for yet are
+    requested from TMDb, so known favorites cost no request; if the graph
+    ranks nothing, candidates come from the baseline ranker
+    (see generate_candidate_titles)
+
+    Args:
+        seeds (list[dict]): top-rated entries (see TasteProfile.top_titles)
+        graph (ItemGraph): item graph
+        exclude (callable, optional): exclude(title_id, media_type)
+        index (SimilarityIndex, optional): when given, candidates are
+            re-ranked by content similarity to the seeds
+        count (int): number of graph titles to keep
+
+    Returns:
+        list[Title]: candidates, best first
+    """
+    missing = [
+        seed for seed in seeds
+        if not graph.is_fetched(node_key(seed['media_type'], seed['id']))
+        ]
+    fetch_seed_recommendations(missing, graph=graph)
+    ranked = graph.recommend(
+        {
+            node_key(seed['media_type'], seed['id']): seed['rating']
+            for seed in seeds
+        },
+        count,
+        exclude
+        )
+    if not ranked:
+        return list(
+            generate_candidate_titles(seeds, exclude, count, index)
+            )[:count]
+    titles = [graph.build_title(key) for key, _ in ranked]
+    if exclude is not None:
+        for title in titles:
+            title.in_library = False
+    if index is None or not titles:
+        return titles
+    return rerank_by_similarity(
+        titles, [score for _, score in ranked], seeds, index
+        )
+
+
+@traced('similarity.rerank')
+def rerank_by_similarity(titles, base_scores, seeds, index):
+    """
+    Re-rank titles by their base score blended with content similarity
+    to the seeds
+
+    Args:
+        titles (list[Title]): candidate titles
+        base_scores (list[float]): original ranking scores
+        seeds (list[dict]): entries with 'media_type', 'id' and 'rating'
+        index (SimilarityIndex): index holding the seeds
+
+    Returns:
+        list[Title]: titles, best first
+    """
+    query = index.query_vector(
+        ((seed['media_type'], str(seed['id'])), seed['rating'])
+        for seed in seeds
+        )
+    scores = blend_scores(base_scores, index.score_titles(titles, query))
+    order = sorted(
+        range(len(titles)),
+        key=lambda i: (scores[i], titles[i].metadata.popularity),
+        reverse=True
+        )
+    return [titles[i] for i in order]
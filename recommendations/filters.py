@@ -4,9 +4,10 @@ Filtering utilities for recommendation logic.
 Includes functions to filter and partition Title objects
 based on user ratings, genres, and media types.
 """
-from collections import defaultdict
+from utils.tracing import traced
 
 
+@traced('filter.top_rated')
 def get_top_rated_titles(title_list):
     """
     Return titles with a user rating of 3 or higher
@@ -26,38 +27,7 @@ def get_top_rated_titles(title_list):
     return top_rated_titles
 
 
-def get_preferred_media_type_and_genre_ids(title_list):
-    """
-    Determine the user's preferred media_type, genre pair based on frequency
-
-    Args:
-        title_list (list): List of Title objects
-
-    Returns:
-        tuple [str, str]: (preferred_media_type, preferred_genre_ic)
-    """
-    media_type_genre_count = defaultdict(int)
-
-    for title in title_list:
-        metadata = getattr(title, 'metadata', None)
-        if not metadata:
-            continue
-        media_type = getattr(metadata, 'media_type', None)
-        genre_ids = getattr(metadata, 'genre_ids', None)
-        if media_type and genre_ids:
-            for genre_id in genre_ids:
-                media_type_genre_count[(media_type, genre_id)] += 1
-    if not media_type_genre_count:
-        print("⚠️ No media types / genre_ids pairs found.")
-        return None
-
-    preferred_pair = (
-        max(media_type_genre_count, key=media_type_genre_count.get)
-    )
-
-    return preferred_pair
-
-
+@traced('filter.genre')
 def filter_list_by_genre(title_list, genre):
     """
     Filter titles by a specific genre
@@ -79,6 +49,7 @@ def filter_list_by_genre(title_list, genre):
     return titles_in_genre
 
 
+@traced('filter.media_type', count=lambda parts: len(parts[0]))
 def partition_list_by_media_type(title_list, target_media_type):
     """
     Split titles into matching and non-matching media types
@@ -4,25 +4,21 @@ Handles different recommendation scenarios based on user activity.
 Each handler manages a unique user state: no data, no watched items, no
 watchlist, or full history.
 """
-from tmdb.tmdb_api import (
-    TMDB_API_KEY,
-    fetch_title_base_recommendation
-    )
-from models.title import (
-    prepare_title_objects_from_tmdb
-)
-from sheets.query import (
-    get_titles_by_watch_status
-    )
-from sheets.utils import build_title_objects_from_sheet
+from sheets.library import get_library_membership, get_taste_profile
 from utils.utils import sort_items_by_popularity
+from utils.tracing import traced
 from ui.display import display_title_entries
+from ui.progress import run_task
 from .smart_recs import (
-    get_top_title_by_preferred_genre,
-    get_personalized_recommendations
-)
+    get_personalized_recommendations,
+    load_watchlist_titles
+    )
 from .trending import show_trending_titles
 from .display import display_and_select_title
+from .candidates import SEED_COUNT, generate_graph_candidates
+from .item_graph import get_item_graph
+from .similarity import get_similarity_index
+from .result_cache import cached_result
 
 
 def handle_no_items(google_sheet):
@@ -63,21 +59,67 @@ def handle_no_watched_items(google_sheet):
         "but your watchlist has some great options."
         )
     print("\nHere are the most popular ones to get you started.")
-    watchlist_titles = get_titles_by_watch_status(google_sheet, False)
-    if not watchlist_titles:
+    sorted_titles = run_task(
+        'Sorting your watchlist',
+        cached_result,
+        'no_watched',
+        google_sheet,
+        lambda: compute_popular_watchlist(google_sheet)
+        )
+    if not sorted_titles:
         print("\n⚠️  Your watchlist is empty.")
         return
-    title_objects = build_title_objects_from_sheet(watchlist_titles)
-    sorted_titles = sort_items_by_popularity(title_objects)
     display_title_entries(sorted_titles, 'recommendation', 6)
 
 
+@traced('recs.popular_watchlist')
+def compute_popular_watchlist(google_sheet, profile=None):
+    """
+    Watchlist titles by popularity (the 'no_watched' flow)
+
+    Args:
+        google_sheet: Google Sheet object to read user watchlist data
+        profile (TasteProfile, optional): unused, for a common signature
+
+    Returns:
+        list: watchlist titles, most popular first
+    """
+    return sort_items_by_popularity(load_watchlist_titles(google_sheet))
+
+
+@traced('recs.similar_titles')
+def compute_similar_titles(google_sheet, profile):
+    """
+    TMDb titles similar to the best rated ones, not yet in the list
+    (the 'no_watchlist' flow)
+
+    Args:
+        google_sheet: Google Sheet object to read watched titles
+        profile (TasteProfile): user's taste profile
+
+    Returns:
+        list: candidate titles, best first, [] without liked titles
+    """
+    seeds = profile.top_titles(SEED_COUNT)
+    if not seeds:
+        return []
+    membership = get_library_membership(google_sheet)
+    return generate_graph_candidates(
+        seeds,
+        get_item_graph(),
+        exclude=membership.contains if membership is not None else None,
+        index=get_similarity_index(google_sheet)
+        )
+
+
 def handle_no_watchlist_items(google_sheet, mode):
     """
     Handle case when the user has watched titles but no watchlist
 
-    Picks a top title the user liked, fetches similar ones from TMDB,
-    and displays them for selection
+    Takes the best rated titles from the taste profile as seeds,
+    fetches similar titles from TMDB for the seeds not yet in the item
+    graph, ranks the graph by personalized PageRank from the seeds,
+    re-ranks by content similarity and displays them for selection
 
     Args:
         google_sheet: Google Sheet object to read watched titles
@@ -88,42 +130,66 @@ def handle_no_watchlist_items(google_sheet, mode):
     """
     print("\nYou haven't got any titles on your watchlist yet!")
     print("\n🔄  Analyzing viewing history...")
-    watched_titles = get_titles_by_watch_status(google_sheet, True)
-    if not watched_titles:
+    profile = get_taste_profile(google_sheet)
+    if profile is None or not profile.watched_count:
         print("\n⚠️  Your viewing history is empty.")
         return
-    title_objects = build_title_objects_from_sheet(watched_titles)
-    top_title = get_top_title_by_preferred_genre(title_objects)
-    if not top_title or not hasattr(top_title, "metadata"):
+    seeds = profile.top_titles(SEED_COUNT)
+    if not seeds:
         print(
             "\n⚠️  No favorite title found for recommendations."
             )
         print("\nMaybe you need some inspiration...")
-        show_trending_titles('trending', google_sheet)
+        show_trending_titles('trending', google_sheet, drop_saved=True)
         return
-    print(f"\nYou've recently liked '{top_title.metadata.title}'. "
+    liked = ', '.join(f"'{seed['title']}'" for seed in seeds)
+    print(f"\nYou've recently liked {liked}. "
           "Here are some titles you might also like...")
 
-    recommended_titles = fetch_title_base_recommendation(
-        top_title.metadata.media_type,
-        top_title.metadata.id,
-        TMDB_API_KEY
+    recommended_titles_object = run_task(
+        'Finding similar titles',
+        cached_result,
+        'no_watchlist',
+        google_sheet,
+        lambda: compute_similar_titles(google_sheet, profile)
         )
-    if not recommended_titles:
+    if not recommended_titles_object:
         print("\n⚠️  No similar titles found.")
         return
-    recommended_titles_object = prepare_title_objects_from_tmdb(
-        recommended_titles
-        )
     display_and_select_title(recommended_titles_object, mode, google_sheet)
 
 
+def handle_more_like_this(title, google_sheet):
+    """
+    Show titles similar to one of the user's titles, from the local
+    similarity index (no TMDb request), and let the user save one
+
+    Args:
+        title (Title): title from the user's list
+        google_sheet: Google Sheet object to access user data
+
+    Returns:
+        None
+    """
+    print(f"\n🔄  Looking for titles like '{title.metadata.title}'...")
+    index = get_similarity_index(google_sheet)
+    similar_titles = index.more_like_this(
+        (title.metadata.media_type, str(title.metadata.id)),
+        membership=get_library_membership(google_sheet)
+        )
+    if not similar_titles:
+        print("\n⚠️  No similar titles found yet. "
+              "Get some recommendations first!")
+        return
+    display_and_select_title(similar_titles, 'recommendation', google_sheet)
+
+
 def handle_watched_and_watchlist(google_sheet, mode):
     """
     Handle recommendation flow when user has both watched and watchlist items
 
-    Uses watched history and watchlist to generate personalized
-    recommendations, then displays them
+    Uses the taste profile and watchlist to generate personalized
+    recommendations (cached until the library changes), then displays them
 
     Args:
         google_sheet: Google Sheet object to access user data
@@ -133,19 +199,15 @@ def handle_watched_and_watchlist(google_sheet, mode):
         None
     """
     print("\n🔄  Analyzing viewing history...")
-    watched_titles = get_titles_by_watch_status(google_sheet, True)
-    if not watched_titles:
+    profile = get_taste_profile(google_sheet)
+    if profile is None or not profile.watched_count:
         print("\n⚠️  Your viewing history is empty.")
         return
-    watched_titles_objects = build_title_objects_from_sheet(watched_titles)
-    watchlist_titles = get_titles_by_watch_status(google_sheet, False)
-    if not watchlist_titles:
+    if not profile.watchlist_count:
         print("\n⚠️  Your watchlist is empty.")
         return
-    watchlist_titles_objects = build_title_objects_from_sheet(watchlist_titles)
     recommendation_list = get_personalized_recommendations(
-        watched_titles_objects,
-        watchlist_titles_objects,
+        profile,
         google_sheet
         )
     if recommendation_list:
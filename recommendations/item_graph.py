@@ -0,0 +1,411 @@
+"""
+Item-to-item graph built from TMDb recommendations
+
+Every title-based recommendations response is stored as weighted edges
+(seed -> recommended title) in a local SQLite adjacency store, together
+with the raw data of each title. Over time the graph spans the
+neighbourhoods of many titles; a personalized PageRank seeded by the
+user's rated titles scores it without any API call, so recommendations
+draw on all favorites at once and improve as the graph grows.
+"""
+import json
+import sqlite3
+import threading
+import time
+import numpy as np
+from models.title import Title
+from storage.paths import cache_path
+from utils.utils import calculate_weighted_popularity
+from utils.tracing import traced
+
+GRAPH_FILE = 'item_graph.sqlite'
+# Probability of following an edge rather than jumping back to a seed
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+# Share of an edge's weight also walked in the opposite direction,
+# so titles recommended together ("co-recommended") are connected
+REVERSE_WEIGHT = 0.5
+# Seconds before a title whose response had no results (or failed)
+# is fetched again
+EMPTY_REFETCH_AGE = 24 * 3600
+
+# Raw TMDb fields kept per title, enough to build a Title
+_NODE_FIELDS = (
+    'id', 'title', 'name', 'media_type', 'release_date', 'first_air_date',
+    'genre_ids', 'popularity', 'vote_count', 'overview'
+)
+# Fields a seed's node lacks until the seed shows up in a response
+_RESULT_FIELDS = ('genre_ids', 'popularity', 'vote_count', 'overview')
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS nodes (
+        key TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS edges (
+        src TEXT NOT NULL,
+        dst TEXT NOT NULL,
+        weight REAL NOT NULL,
+        PRIMARY KEY (src, dst)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fetched (
+        key TEXT PRIMARY KEY,
+        fetched_at REAL NOT NULL
+    )
+    """,
+)
+
+
+def node_key(media_type, title_id):
+    """
+    Args:
+        media_type (str): 'movie' or 'tv'
+        title_id (int | str): TMDb id
+
+    Returns:
+        str: 'media_type:id'
+    """
+    return f'{media_type}:{title_id}'
+
+
+def _is_seed_only(data):
+    """
+    Check if a node was only stored as a seed, without TMDb result data
+    """
+    return not any(field in data for field in _RESULT_FIELDS)
+
+
+def edge_weight(rank):
+    """
+    Weight of the edge to the result at a 0-based rank in a response
+    """
+    return 1.0 / (rank + 1)
+
+
+class ItemGraph:
+    """
+    Weighted directed graph of titles, mirrored in memory
+
+    Attributes:
+        path (str or None): SQLite file, None for an in-memory graph
+        read_only (bool): True if new edges are not persisted
+    """
+    def __init__(self, path=None, read_only=False):
+        """
+        Args:
+            path (str, optional): SQLite file to load and persist to
+            read_only (bool): load the file but never write to it
+        """
+        self.path = path
+        self.read_only = read_only
+        self.lock = threading.RLock()
+        # key -> raw title data
+        self._nodes = {}
+        # src -> {dst: weight}
+        self._edges = {}
+        # src -> time its recommendations were last fetched
+        self._fetched = {}
+        # arrays for PageRank, rebuilt after the graph changes
+        self._matrix = None
+        self._connection = None
+        if path is not None:
+            self._load()
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def edge_count(self):
+        """
+        Returns:
+            int: number of stored edges
+        """
+        return sum(len(targets) for targets in self._edges.values())
+
+    # --- Persistence ---
+    def _connect(self):
+        if self._connection is None:
+            if self.read_only:
+                self._connection = sqlite3.connect(
+                    f'file:{self.path}?mode=ro', uri=True,
+                    check_same_thread=False
+                    )
+            else:
+                self._connection = sqlite3.connect(
+                    self.path, check_same_thread=False
+                    )
+                for statement in _SCHEMA:
+                    self._connection.execute(statement)
+                self._connection.commit()
+        return self._connection
+
+    def _load(self):
+        """
+        Read nodes and edges from the file, if it can be opened
+        """
+        try:
+            connection = self._connect()
+            for key, data in connection.execute('SELECT key, data FROM nodes'):
+                self._nodes[key] = json.loads(data)
+            for src, dst, weight in connection.execute(
+                'SELECT src, dst, weight FROM edges'
+            ):
+                self._edges.setdefault(src, {})[dst] = weight
+            self._fetched.update(
+                connection.execute('SELECT key, fetched_at FROM fetched')
+                )
+        except sqlite3.Error:
+            self._connection = None
+
+    def close(self):
+        """
+        Close the SQLite connection
+        """
+        with self.lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # --- Updates ---
+    def is_fetched(self, key, now=None):
+        """
+        Check if a title's recommendations were fetched already
+        A response without results only counts for EMPTY_REFETCH_AGE,
+        as it may have been a failed request
+
+        Args:
+            key (str): node key
+            now (float, optional): current time, defaults to time.time()
+
+        Returns:
+            bool: True if the title needs no request
+        """
+        if self._edges.get(key):
+            return True
+        fetched_at = self._fetched.get(key)
+        now = time.time() if now is None else now
+        return fetched_at is not None and now - fetched_at < EMPTY_REFETCH_AGE
+
+    def add_recommendations(self, seed, results):
+        """
+        Store a recommendations response as edges from its seed
+
+        Args:
+            seed (dict): entry with 'media_type' and 'id'
+                (plus 'title' for its node if not known yet); a seed's
+                node only holds these until a response includes it, and
+                isn't recommended meanwhile (see recommend)
+            results (list[dict]): raw TMDb results, best first
+
+        Returns:
+            int: number of edges stored; a response without results
+            keeps the title's earlier edges and only marks it fetched
+        """
+        src = node_key(seed['media_type'], seed['id'])
+        fetched_at = time.time()
+        nodes = {}
+        edges = {}
+        for rank, result in enumerate(results):
+            media_type = result.get('media_type') or seed['media_type']
+            if media_type not in ('movie', 'tv'):
+                continue
+            dst = node_key(media_type, result.get('id'))
+            if dst == src:
+                continue
+            data = {
+                field: result[field] for field in _NODE_FIELDS
+                if field in result
+                }
+            data['media_type'] = media_type
+            nodes[dst] = data
+            edges[dst] = max(edges.get(dst, 0.0), edge_weight(rank))
+        with self.lock:
+            self._fetched[src] = fetched_at
+            if not edges:
+                if self.path is not None and not self.read_only:
+                    self._persist(src, {}, None)
+                return 0
+            self._nodes.update(nodes)
+            self._nodes.setdefault(src, {
+                'id': seed['id'],
+                'title': seed.get('title'),
+                'media_type': seed['media_type'],
+                })
+            self._edges[src] = edges
+            self._matrix = None
+            if self.path is not None and not self.read_only:
+                self._persist(src, nodes, edges)
+        return len(edges)
+
+    def _persist(self, src, nodes, edges):
+        """
+        Write a response's nodes and edges, or only its fetch time
+        if edges is None
+        """
+        try:
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO fetched VALUES (?, ?)',
+                (src, self._fetched[src])
+                )
+            if edges is not None:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO nodes VALUES (?, ?)',
+                    [(key, json.dumps(data)) for key, data in nodes.items()]
+                    + [(src, json.dumps(self._nodes[src]))]
+                    )
+                connection.execute(
+                    'DELETE FROM edges WHERE src = ?', (src,)
+                    )
+                connection.executemany(
+                    'INSERT INTO edges VALUES (?, ?, ?)',
+                    [(src, dst, weight) for dst, weight in edges.items()]
+                    )
+            connection.commit()
+        except sqlite3.Error:
+            print("\n⚠️  Could not save the recommendations graph.")
+
+    # --- Scoring ---
+    def _build_matrix(self):
+        """
+        Node index and column-normalized edge arrays for the power method
+        """
+        keys = list(self._nodes)
+        index = {key: position for position, key in enumerate(keys)}
+        sources, targets, weights = [], [], []
+        for src, edges in self._edges.items():
+            for dst, weight in edges.items():
+                sources.append(index[src])
+                targets.append(index[dst])
+                weights.append(weight)
+        sources = np.array(sources, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int64)
+        weights = np.array(weights, dtype=np.float64)
+        if REVERSE_WEIGHT:
+            sources, targets = (
+                np.concatenate([sources, targets]),
+                np.concatenate([targets, sources])
+                )
+            weights = np.concatenate([weights, REVERSE_WEIGHT * weights])
+        out_weight = np.bincount(sources, weights=weights, minlength=len(keys))
+        if weights.size:
+            weights = weights / out_weight[sources]
+        self._matrix = (keys, index, sources, targets, weights, out_weight > 0)
+        return self._matrix
+
+    def personalized_pagerank(self, seeds):
+        """
+        Stationary distribution of a random walk that restarts at the seeds
+
+        Args:
+            seeds (dict): node key -> restart weight (e.g. rating)
+
+        Returns:
+            dict: node key -> score, for every node reached
+        """
+        with self.lock:
+            keys, index, sources, targets, weights, has_out = (
+                self._matrix or self._build_matrix()
+                )
+        restart = np.zeros(len(keys))
+        for key, weight in seeds.items():
+            if key in index and weight > 0:
+                restart[index[key]] += weight
+        total = restart.sum()
+        if not total:
+            return {}
+        restart /= total
+        ranks = restart.copy()
+        for _ in range(MAX_ITERATIONS):
+            spread = np.bincount(
+                targets, weights=weights * ranks[sources],
+                minlength=len(keys)
+                )
+            # mass on titles without edges restarts at the seeds
+            dangling = ranks[~has_out].sum()
+            updated = DAMPING * (spread + dangling * restart) + (
+                (1 - DAMPING) * restart
+                )
+            converged = np.abs(updated - ranks).sum() < TOLERANCE
+            ranks = updated
+            if converged:
+                break
+        return {keys[i]: float(ranks[i]) for i in np.flatnonzero(ranks)}
+
+    @traced('graph.pagerank')
+    def recommend(self, seeds, count=20, exclude=None):
+        """
+        Best scoring titles that aren't seeds
+
+        Args:
+            seeds (dict): node key -> restart weight
+            count (int): maximum number of results
+            exclude (callable, optional): exclude(title_id, media_type)
+
+        Returns:
+            list[tuple[str, float]]: (node key, score), best first
+        """
+        ranked = []
+        for key, score in self.personalized_pagerank(seeds).items():
+            if key in seeds:
+                continue
+            data = self._nodes[key]
+            if _is_seed_only(data):
+                continue  # no genres, overview or popularity to show
+            if exclude is not None and exclude(
+                data.get('id'), data.get('media_type')
+            ):
+                continue
+            ranked.append((key, score))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:count]
+
+    def build_title(self, key):
+        """
+        Args:
+            key (str): node key
+
+        Returns:
+            Title: title built from the stored TMDb data
+        """
+        data = self._nodes[key]
+        return Title(
+            data,
+            weighted_popularity=calculate_weighted_popularity(data),
+            media_type=data.get('media_type')
+            )
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_item_graph():
+    """
+    Return the session's item graph, loading it on first use
+
+    Returns:
+        ItemGraph
+    """
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = ItemGraph(cache_path(GRAPH_FILE))
+        return _graph
+
+
+def set_item_graph(graph):
+    """
+    Replace the session's item graph (e.g. with a read-only one)
+
+    Args:
+        graph (ItemGraph): graph to use
+    """
+    global _graph
+    with _graph_lock:
+        _graph = graph
@@ -0,0 +1,74 @@
+"""
+Offline batch precompute of recommendations.
+
+Loads the library once, then computes and ranks the titles of every
+recommendation flow the library has data for, and saves them with their
+timestamp, library revision and TMDb dependencies. The interactive
+"Get recommendation" option serves them while they are fresh.
+"""
+import time
+from sheets.library import get_library_revision, get_taste_profile
+from tmdb.cache import get_response_cache
+from .handlers import compute_popular_watchlist, compute_similar_titles
+from .smart_recs import (
+    compute_history_recommendations,
+    compute_discover_recommendations
+)
+from .result_cache import recommendation_cache, save_precomputed
+
+# Flow name -> compute(google_sheet, profile)
+PRECOMPUTED_FLOWS = {
+    'no_watched': compute_popular_watchlist,
+    'no_watchlist': compute_similar_titles,
+    'no_top_rated': compute_discover_recommendations,
+    'history': compute_history_recommendations,
+}
+
+
+def compute_flows(google_sheet, profile, revision, verbose=True):
+    """
+    Run every recommendation flow against the current library
+
+    Args:
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+        profile (TasteProfile): user's taste profile
+        revision (str): library content hash
+        verbose (bool): print one line per flow
+
+    Returns:
+        dict: flow -> (revision, titles, dependencies), only flows
+        with results
+    """
+    results = {}
+    for flow, compute in PRECOMPUTED_FLOWS.items():
+        started = time.perf_counter()
+        with get_response_cache().record() as used:
+            titles = list(compute(google_sheet, profile) or [])
+        if verbose:
+            print(f"   - {flow}: {len(titles)} titles "
+                  f"({time.perf_counter() - started:.2f}s)")
+        if titles:
+            results[flow] = (revision, titles, dict(used))
+    return results
+
+
+def precompute_recommendations(google_sheet):
+    """
+    Compute every recommendation flow and save the results
+
+    Args:
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        dict: flow -> number of titles computed (flows with results)
+    """
+    profile = get_taste_profile(google_sheet)
+    revision = get_library_revision(google_sheet)
+    if profile is None or revision is None:
+        print("\n❌  No worksheet found.")
+        return {}
+    results = compute_flows(google_sheet, profile, revision)
+    for flow, (_, titles, used) in results.items():
+        recommendation_cache.put(flow, revision, titles, used)
+    save_precomputed(google_sheet, results)
+    return {flow: len(entry[1]) for flow, entry in results.items()}
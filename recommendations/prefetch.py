@@ -0,0 +1,144 @@
+"""
+Prefetch plan run while the user is at the main menu.
+
+Warms, in order of how soon they are likely needed: the genre tables,
+the first trending page, the library and its snapshot, the title
+search index, the TMDb
+recommendations of the current top-rated titles (into the item graph),
+and finally the result of the recommendation flow the next
+"Get recommendation" will take. Every unit sends at most one TMDb
+request and returns how many it sent, for the scheduler's budget.
+"""
+from tmdb.tmdb_api import (
+    TMDB_API_KEY,
+    count_requests,
+    fetch_title_base_recommendation,
+    fetch_trending_titles,
+    quiet_errors
+)
+from tmdb.utils import get_genre_table
+from sheets.library import (
+    get_library,
+    get_taste_profile,
+    save_library_snapshot,
+    wait_for_library
+)
+from .candidates import SEED_COUNT
+from .item_graph import get_item_graph, node_key
+from .precompute import PRECOMPUTED_FLOWS
+from .result_cache import cached_result
+
+
+def _counted(func, *args):
+    """
+    Wrap a call as a unit returning the number of requests it sent
+    Failed requests aren't reported: the unit runs while the user is
+    at the main menu prompt
+    """
+    def unit():
+        with count_requests() as counter, quiet_errors():
+            func(*args)
+        return counter.count
+    return unit
+
+
+def next_flow(profile):
+    """
+    Recommendation flow "Get recommendation" takes for a library
+
+    Args:
+        profile (TasteProfile): user's taste profile
+
+    Returns:
+        str or None: flow name, None for an empty list (trending)
+    """
+    if profile.watched_count and profile.watchlist_count:
+        return 'history' if profile.has_top_rated() else 'no_top_rated'
+    if profile.watchlist_count:
+        return 'no_watched'
+    if profile.watched_count:
+        return 'no_watchlist'
+    return None
+
+
+class LibraryPrefetch:
+    """
+    Prefetch plan for one spreadsheet
+
+    Attributes:
+        google_sheet (gspread.Spreadsheet or Future): the spreadsheet,
+            or a future resolving to it
+        sheet_name (str): name the library snapshot is saved under
+    """
+    def __init__(self, google_sheet, sheet_name):
+        self.google_sheet = google_sheet
+        self.sheet_name = sheet_name
+        # library revision of the last snapshot saved
+        self._saved_revision = None
+
+    def __call__(self):
+        """
+        Yields:
+            callable: units, each returning the requests it sent
+        """
+        google_sheet = self.google_sheet
+        if hasattr(google_sheet, 'result'):
+            google_sheet = google_sheet.result()
+        for media_type in ('movie', 'tv'):
+            yield _counted(get_genre_table, media_type)
+        yield _counted(fetch_trending_titles, TMDB_API_KEY)
+        yield _counted(self._save_snapshot, google_sheet)
+        yield _counted(self._build_search_index, google_sheet)
+
+        profile = get_taste_profile(google_sheet)
+        if profile is None:
+            return
+        graph = get_item_graph()
+        seeds = profile.top_titles(SEED_COUNT)
+        for seed in seeds:
+            if not graph.is_fetched(node_key(seed['media_type'], seed['id'])):
+                yield _counted(self._add_seed, graph, seed)
+
+        flow = next_flow(profile)
+        if flow == 'no_watchlist' and not all(
+            graph.is_fetched(node_key(seed['media_type'], seed['id']))
+            for seed in seeds
+        ):
+            return  # more than one request left, wait for the next pass
+        if flow is not None:
+            yield _counted(
+                cached_result, flow, google_sheet,
+                lambda: PRECOMPUTED_FLOWS[flow](google_sheet, profile)
+                )
+
+    def _save_snapshot(self, google_sheet):
+        """
+        Load the library, once revalidated, and save its snapshot
+        for the next launch if it changed
+        """
+        wait_for_library(google_sheet)
+        library = get_library(google_sheet)
+        if library is None:
+            return
+        revision = library.content_hash()
+        if revision != self._saved_revision:
+            save_library_snapshot(google_sheet, self.sheet_name)
+            self._saved_revision = revision
+
+    @staticmethod
+    def _build_search_index(google_sheet):
+        """
+        Build the library's title search index for "Find in my list"
+        """
+        library = get_library(google_sheet)
+        if library is not None:
+            library.search_index()
+
+    @staticmethod
+    def _add_seed(graph, seed):
+        """
+        Store the TMDb recommendations of a top-rated title in the graph
+        """
+        graph.add_recommendations(seed, fetch_title_base_recommendation(
+            seed['media_type'], seed['id'], TMDB_API_KEY
+            ))
@@ -4,11 +4,10 @@ Controls the logic for generating title recommendations.
 Selects the appropriate handler based on what content the user has added
 or watched.
 """
-from sheets.query import (
-    has_items,
-    has_watched,
-    has_watchlist,
-    )
+from sheets.query import has_items
+from sheets.library import get_taste_profile
+from tmdb.utils import get_genre_table
+from ui.progress import run_tasks
 from recommendations.handlers import (
     handle_no_items,
     handle_no_watched_items,
@@ -28,12 +27,19 @@ def handle_recommendations(mode, google_sheet):
     Args:
         google_sheet (_type_): _description_
     """
-    items = has_items(google_sheet)
+    # the library read and the genre names, which every flow needs to
+    # build titles from TMDb results, load concurrently
+    items = run_tasks('Loading your list', [
+        (has_items, google_sheet),
+        (get_genre_table, 'movie'),
+        (get_genre_table, 'tv'),
+        ])[0]
     if not items:
         handle_no_items(google_sheet)
         return
-    watchlist_items = has_watchlist(google_sheet)
-    watched_items = has_watched(google_sheet)
+    profile = get_taste_profile(google_sheet)
+    watchlist_items = profile.watchlist_count > 0
+    watched_items = profile.watched_count > 0
     if watched_items and watchlist_items:
         handle_watched_and_watchlist(google_sheet, mode)
         return
@@ -0,0 +1,314 @@
+"""
+Caches the ranked output of each recommendation flow.
+
+An entry is keyed by the flow name and stays valid while the library
+content hash is unchanged and every TMDb response the flow read is still
+the same, unexpired entry of the response cache. Repeating a request
+with nothing changed in between skips sheet reads, TMDb calls and ranking.
+
+Results computed ahead of time by `python run.py precompute` are saved
+to disk and served the same way, as long as they are recent enough.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from models.title import Title
+from sheets.library import get_library_revision
+from storage.paths import cache_path
+from tmdb.cache import get_response_cache
+from utils.tracing import trace_span
+
+PRECOMPUTED_VERSION = 1
+DEFAULT_MAX_AGE_HOURS = 12
+# Sheet columns only meaningful for titles in the user's list
+_USER_FIELDS = ('is_watched', 'added_date', 'watched_date', 'rating')
+
+
+def clone_title(title_obj):
+    """
+    Copy a Title so its user data can change without touching the cache
+    Metadata stays shared (it is canonical, see the title identity map)
+
+    Args:
+        title_obj (Title): title to copy
+
+    Returns:
+        Title: copy with its own user data
+    """
+    clone = copy.copy(title_obj)
+    clone.user_data = copy.copy(title_obj.user_data)
+    return clone
+
+
+class ResultCache:
+    """
+    Ranked titles by flow, with the revision they were computed for
+
+    Attributes:
+        hits (int): requests answered from the cache
+        misses (int): requests that ran the flow
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        # flow -> (library revision, titles, {cache key: fetched_at})
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, flow, revision):
+        """
+        Return the cached titles of a flow if still valid
+
+        Args:
+            flow (str): flow name
+            revision (str): current library content hash
+
+        Returns:
+            list[Title] or None: copies of the cached titles
+        """
+        with self._lock:
+            entry = self._entries.get(flow)
+        if entry is None or entry[0] != revision:
+            self.misses += 1
+            return None
+        responses = get_response_cache()
+        if not all(
+            responses.is_current(key, fetched_at)
+            for key, fetched_at in entry[2].items()
+        ):
+            self.misses += 1
+            self.invalidate(flow)
+            return None
+        self.hits += 1
+        return [clone_title(title_obj) for title_obj in entry[1]]
+
+    def put(self, flow, revision, titles, dependencies):
+        """
+        Store the titles computed by a flow
+
+        Args:
+            flow (str): flow name
+            revision (str): library content hash the titles derive from
+            titles (Iterable[Title]): ranked titles
+            dependencies (dict): TMDb cache key -> fetch time
+        """
+        entry = (
+            revision,
+            [clone_title(title_obj) for title_obj in titles],
+            dict(dependencies)
+            )
+        with self._lock:
+            self._entries[flow] = entry
+
+    def invalidate(self, flow=None):
+        """
+        Drop one flow's entry, or all entries
+
+        Args:
+            flow (str, optional): flow name, all flows if None
+        """
+        with self._lock:
+            if flow is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(flow, None)
+
+
+recommendation_cache = ResultCache()
+# Precomputed results by spreadsheet id, read once per session
+_precomputed = {}
+
+
+# --- Precomputed results ---
+def precomputed_path(google_sheet):
+    """
+    Args:
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        str: path of the precomputed results file for that sheet
+    """
+    return cache_path(f'recommendations_{google_sheet.id}.json')
+
+
+def _title_to_dict(title_obj):
+    values = title_obj.to_sheet_dict()
+    values['in_library'] = title_obj.in_library
+    return values
+
+
+def _title_from_dict(values):
+    values = dict(values)
+    in_library = values.pop('in_library', None)
+    if not in_library:
+        # fresh user data, dated when the title is shown
+        for field in _USER_FIELDS:
+            values.pop(field, None)
+    title_obj = Title.from_sheet_dict(values)
+    title_obj.in_library = in_library
+    return title_obj
+
+
+def serialize_results(results, computed_at=None):
+    """
+    Convert flow results into their JSON serializable form
+
+    Args:
+        results (dict): flow -> (library revision, titles, dependencies)
+        computed_at (float, optional): timestamp, defaults to now
+
+    Returns:
+        dict: flow -> entry with revision, computed_at, dependencies
+        and titles as dicts
+    """
+    computed_at = time.time() if computed_at is None else computed_at
+    return {
+        flow: {
+            'revision': revision,
+            'computed_at': computed_at,
+            'dependencies': dict(dependencies),
+            'titles': [_title_to_dict(title) for title in titles],
+        }
+        for flow, (revision, titles, dependencies) in results.items()
+    }
+
+
+def save_precomputed(google_sheet, results, computed_at=None):
+    """
+    Write precomputed flow results, replacing the previous ones
+
+    Args:
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+        results (dict): flow -> (library revision, titles, dependencies)
+        computed_at (float, optional): timestamp, defaults to now
+
+    Returns:
+        bool: True if the file was written
+    """
+    return write_precomputed(
+        google_sheet, serialize_results(results, computed_at)
+        )
+
+
+def write_precomputed(google_sheet, flows):
+    """
+    Write serialized flow results (see serialize_results)
+
+    Args:
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+        flows (dict): flow -> serialized entry
+
+    Returns:
+        bool: True if the file was written
+    """
+    data = {'version': PRECOMPUTED_VERSION, 'flows': flows}
+    path = precomputed_path(google_sheet)
+    try:
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(f'{path}.tmp', path)
+    except OSError:
+        print("\n⚠️  Could not save precomputed recommendations.")
+        return False
+    _precomputed[google_sheet.id] = flows
+    return True
+
+
+def _read_precomputed(google_sheet):
+    """
+    Flow entries saved for a sheet, {} if none or unreadable
+    """
+    flows = _precomputed.get(google_sheet.id)
+    if flows is None:
+        path = precomputed_path(google_sheet)
+        try:
+            with open(path, encoding='utf-8') as file:
+                data = json.load(file)
+            flows = (
+                data['flows']
+                if data.get('version') == PRECOMPUTED_VERSION else {}
+                )
+        except (OSError, ValueError, KeyError):
+            flows = {}
+        _precomputed[google_sheet.id] = flows
+    return flows
+
+
+def load_precomputed(google_sheet, flow, revision, max_age=None, now=None):
+    """
+    Return a precomputed flow result if it is still fresh
+    It must have been computed for the same library contents, within
+    max_age, from TMDb responses that are still cached and unexpired
+
+    Args:
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+        flow (str): flow name
+        revision (str): current library content hash
+        max_age (float, optional): seconds, REELTRACKER_PRECOMPUTE_MAX_AGE
+            hours if None (default 12, also if it isn't a number)
+        now (float, optional): current time, defaults to time.time()
+
+    Returns:
+        tuple[list[Title], dict] or None: titles and their dependencies
+    """
+    if max_age is None:
+        try:
+            hours = float(os.getenv(
+                'REELTRACKER_PRECOMPUTE_MAX_AGE', DEFAULT_MAX_AGE_HOURS
+                ))
+        except ValueError:
+            hours = DEFAULT_MAX_AGE_HOURS
+        max_age = hours * 3600
+    now = time.time() if now is None else now
+    entry = _read_precomputed(google_sheet).get(flow)
+    if (
+        entry is None
+        or entry['revision'] != revision
+        or now - entry['computed_at'] > max_age
+    ):
+        return None
+    responses = get_response_cache()
+    if not all(
+        responses.is_current(key, fetched_at)
+        for key, fetched_at in entry['dependencies'].items()
+    ):
+        return None
+    titles = [_title_from_dict(values) for values in entry['titles']]
+    return titles, entry['dependencies']
+
+
+def cached_result(flow, google_sheet, compute):
+    """
+    Return a flow's ranked titles from the cache or from fresh
+    precomputed results, computing them if needed
+    Empty results (e.g. a failed request) are not cached
+
+    Args:
+        flow (str): flow name
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+        compute (callable): computes the ranked titles
+
+    Returns:
+        list[Title] or Sequence[Title]: ranked titles
+    """
+    revision = get_library_revision(google_sheet)
+    with trace_span('cache.lookup') as span:
+        if revision is not None:
+            titles = recommendation_cache.get(flow, revision)
+            if titles is not None:
+                span.set(items=len(titles), flow=flow, source='memory')
+                return titles
+            precomputed = load_precomputed(google_sheet, flow, revision)
+            if precomputed is not None:
+                titles, dependencies = precomputed
+                recommendation_cache.put(flow, revision, titles, dependencies)
+                span.set(items=len(titles), flow=flow, source='precomputed')
+                return titles
+        span.set(flow=flow, source='miss')
+    with get_response_cache().record() as used:
+        titles = compute()
+    if titles and revision is not None:
+        recommendation_cache.put(flow, revision, titles, used)
+    return titles
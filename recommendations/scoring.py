@@ -0,0 +1,203 @@
+"""
+Vectorized scoring engine for watchlist recommendations
+
+Builds a genre matrix for the candidate titles and a rating-weighted
+genre profile of all top-rated watched titles, then scores every
+candidate with one matrix-vector product blended with normalized
+popularity and media type preference. Content similarity scores from
+the similarity index can be blended in on top.
+"""
+import numpy as np
+from utils.tracing import traced
+
+GENRE_WEIGHT = 0.7
+POPULARITY_WEIGHT = 0.2
+MEDIA_TYPE_WEIGHT = 0.1
+# Share of the final score given to content similarity, when provided
+CONTENT_WEIGHT = 0.4
+
+
+def build_genre_index(titles, genre_scores):
+    """
+    Assign a column to every genre name found in the titles or profile
+
+    Args:
+        titles (list): Title objects
+        genre_scores (dict): genre name -> weight
+
+    Returns:
+        dict: genre name -> column index
+    """
+    genre_index = {genre: index for index, genre in enumerate(genre_scores)}
+    for title in titles:
+        for genre in title.metadata.genres:
+            genre_index.setdefault(genre, len(genre_index))
+    return genre_index
+
+
+def build_genre_matrix(titles, genre_index):
+    """
+    One-hot genre matrix, one row per title
+
+    Args:
+        titles (list): Title objects
+        genre_index (dict): genre name -> column index
+
+    Returns:
+        np.ndarray: (len(titles), len(genre_index)) float32 matrix
+    """
+    rows, cols = [], []
+    for row, title in enumerate(titles):
+        for genre in title.metadata.genres:
+            col = genre_index.get(genre)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    matrix = np.zeros((len(titles), len(genre_index)), dtype=np.float32)
+    matrix[rows, cols] = 1.0
+    return matrix
+
+
+def genre_scores_from_titles(top_rated_titles):
+    """
+    Rating-weighted genre totals of top-rated titles
+    (TasteProfile.genre_scores keeps the same totals incrementally)
+
+    Args:
+        top_rated_titles (list): Title objects rated 3 or above
+
+    Returns:
+        dict: genre name -> rating total
+    """
+    genre_scores = {}
+    for title in top_rated_titles:
+        for genre in title.metadata.genres:
+            genre_scores[genre] = (
+                genre_scores.get(genre, 0) + title.user_data.rating
+                )
+    return genre_scores
+
+
+def build_taste_vector(genre_scores, genre_index):
+    """
+    Genre profile vector, scaled so the favorite genre weighs 1
+
+    Args:
+        genre_scores (dict): genre name -> rating total
+        genre_index (dict): genre name -> column index
+
+    Returns:
+        np.ndarray: (len(genre_index),) float32 vector
+    """
+    profile = np.zeros(len(genre_index), dtype=np.float32)
+    for genre, score in genre_scores.items():
+        profile[genre_index[genre]] = score
+    return _normalize(profile)
+
+
+def get_preferred_media_type(top_rated_titles):
+    """
+    Media type with the highest rating total among top-rated titles
+
+    Args:
+        top_rated_titles (list): Title objects rated 3 or above
+
+    Returns:
+        str or None: 'movie' or 'tv'
+    """
+    totals = {}
+    for title in top_rated_titles:
+        media_type = title.metadata.media_type
+        totals[media_type] = totals.get(media_type, 0) + title.user_data.rating
+    return max(totals, key=totals.get) if totals else None
+
+
+def _normalize(values):
+    """
+    Scale values to [0, 1] by their maximum
+    """
+    peak = values.max() if values.size else 0
+    return values / peak if peak > 0 else values
+
+
+def score_titles(
+    candidates,
+    genre_scores,
+    preferred_media_type=None,
+    content_scores=None
+):
+    """
+    Score candidate titles against the user's taste
+
+    Args:
+        candidates (list): Title objects to score (e.g. the watchlist)
+        genre_scores (dict): genre name -> rating total of liked titles
+        preferred_media_type (str, optional): media type to boost
+        content_scores (Sequence[float], optional): similarity of each
+            candidate to the liked titles, in [0, 1]
+
+    Returns:
+        np.ndarray: one score per candidate, in candidate order
+    """
+    genre_index = build_genre_index(candidates, genre_scores)
+    taste_vector = build_taste_vector(genre_scores, genre_index)
+    genre_scores = _normalize(
+        build_genre_matrix(candidates, genre_index) @ taste_vector
+        )
+    popularity = _normalize(np.log1p(np.array(
+        [max(float(title.metadata.popularity or 0), 0.0)
+         for title in candidates],
+        dtype=np.float32
+        )))
+    media_match = np.array(
+        [title.metadata.media_type == preferred_media_type
+         for title in candidates],
+        dtype=np.float32
+        )
+    scores = (
+        GENRE_WEIGHT * genre_scores
+        + POPULARITY_WEIGHT * popularity
+        + MEDIA_TYPE_WEIGHT * media_match
+        )
+    if content_scores is not None:
+        scores = (
+            (1 - CONTENT_WEIGHT) * scores
+            + CONTENT_WEIGHT * np.asarray(content_scores, dtype=np.float32)
+            )
+    return scores
+
+
+@traced('sort.rank')
+def rank_titles(
+    candidates,
+    genre_scores,
+    top_k=None,
+    preferred_media_type=None,
+    content_scores=None
+):
+    """
+    Return the top k candidates by score, best first
+
+    Args:
+        candidates (list): Title objects to rank
+        genre_scores (dict): genre name -> rating total of liked titles
+        top_k (int, optional): number of titles to return, all if None
+        preferred_media_type (str, optional): media type to boost
+        content_scores (Sequence[float], optional): similarity of each
+            candidate to the liked titles, in [0, 1]
+
+    Returns:
+        list: ranked Title objects
+    """
+    if not candidates or (top_k is not None and top_k <= 0):
+        return []
+    scores = score_titles(
+        candidates, genre_scores, preferred_media_type, content_scores
+        )
+    count = len(candidates)
+    if top_k is None or top_k >= count:
+        order = np.argsort(-scores, kind='stable')
+    else:
+        selected = np.argpartition(-scores, top_k - 1)[:top_k]
+        order = selected[np.argsort(-scores[selected], kind='stable')]
+    return [candidates[i] for i in order]
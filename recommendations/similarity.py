@@ -0,0 +1,644 @@
+"""
+Content-based similarity index over genres and overviews
+
+Every title in the library, and every TMDb candidate seen while
+recommending, is indexed as a sparse TF-IDF vector of its overview words
+and genre names. The index answers "more like this" and re-ranks
+candidate lists with sparse dot products, without any network call.
+It is persisted in the cache directory and updated incrementally: a
+library is indexed once per session (only new or changed titles are
+tokenized), then every write to it reaches the index through the
+library's listener.
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from models.title import Title
+from sheets.library import get_library
+from storage.paths import cache_path
+from utils.tracing import traced
+from .scoring import CONTENT_WEIGHT
+
+INDEX_FILE = 'similarity_index.json'
+INDEX_VERSION = 1
+# Genre tokens count as this many overview words
+GENRE_TERM_WEIGHT = 3
+# Candidates (titles not in the library) kept, oldest dropped first
+MAX_CANDIDATES = 2000
+# Share the index size may change by before every norm is recomputed
+NORM_DRIFT = 0.05
+
+# Metadata kept per title to rebuild Title objects for "more like this"
+_META_FIELDS = (
+    'id', 'title', 'media_type', 'release_date',
+    'genre_ids', 'genres', 'weighted_popularity', 'overview'
+)
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOP_WORDS = frozenset("""
+    a about after again against all an and any are as at be because been
+    before being between both but by can could did do does doing down during
+    each few for from further had has have having he her here hers him his
+    how i if in into is it its itself just me more most my no nor not now of
+    off on once only or other our out over own same she should so some such
+    than that the their them then there these they this those through to
+    too under until up very was we were what when where which while who whom
+    why will with you your yours one two new find finds must who's it's
+    """.split())
+
+
+def tokenize(text):
+    """
+    Split text into lowercase index words, without stop words
+
+    Args:
+        text (str): overview or other free text
+
+    Returns:
+        list[str]: words of 3 characters or more
+    """
+    return [
+        word for word in _WORD.findall(str(text or '').lower())
+        if len(word) > 2 and word not in _STOP_WORDS
+        ]
+
+
+def document_terms(overview, genres):
+    """
+    Term frequencies of a title
+
+    Args:
+        overview (str): title overview
+        genres (Iterable[str]): genre names
+
+    Returns:
+        Counter: term -> frequency, genres as 'genre:<name>' terms
+    """
+    terms = Counter(tokenize(overview))
+    for genre in genres:
+        terms[f'genre:{genre.strip().lower()}'] += GENRE_TERM_WEIGHT
+    return terms
+
+
+def _title_meta(title_obj):
+    """
+    Metadata fields of a Title, as stored in the sheet
+    """
+    values = title_obj.to_sheet_dict()
+    return {field: values[field] for field in _META_FIELDS}
+
+
+def _record_meta(record):
+    """
+    Metadata fields of a library record, as strings
+    """
+    return {field: str(record.get(field, '')) for field in _META_FIELDS}
+
+
+def _split_genres(value):
+    return [genre.strip() for genre in str(value or '').split(',')
+            if genre.strip()]
+
+
+def _fingerprint(meta):
+    """
+    Text the terms of a title derive from
+    """
+    return f"{meta['genres']}|{meta['overview']}"
+
+
+class SimilarityIndex:
+    """
+    Incremental TF-IDF index of titles keyed by (media_type, id)
+
+    Attributes:
+        path (str or None): file the index is saved to
+        dirty (bool): True if the index changed since it was loaded or saved
+    """
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str, optional): file the index is saved to
+        """
+        self.path = path
+        self.dirty = False
+        self.lock = threading.RLock()
+        # key -> {'terms': {term: tf}, 'meta': dict, 'lib': bool, 'fp': str}
+        # ordered oldest first, so the oldest candidates are dropped first
+        self._docs = OrderedDict()
+        # term -> {key: tf}
+        self._postings = {}
+        # key -> vector norm, dropped when a term of the title changes
+        # document frequency, all dropped once the index size drifted
+        # NORM_DRIFT from _norm_size
+        self._norms = {}
+        self._norm_size = 0
+        # keys of the candidates (titles in no library), oldest first
+        self._candidates = OrderedDict()
+        # library owner (spreadsheet id) -> Counter of its title keys,
+        # and key -> number of owners having it, so sessions sharing
+        # the index don't unmark each other's titles
+        self._libraries = {}
+        self._owners = Counter()
+        # library owner -> Library the index follows (see attach_library)
+        self._attached = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, key):
+        return key in self._docs
+
+    # --- Updates ---
+    def add(self, key, meta, in_library=False):
+        """
+        Index a title, or re-index it if its genres or overview changed
+
+        Args:
+            key (tuple): (media_type, id as str)
+            meta (dict): metadata fields (see _META_FIELDS)
+            in_library (bool): True if the title is in the user's list
+
+        Returns:
+            bool: True if the title's terms were (re)computed
+        """
+        with self.lock:
+            fingerprint = _fingerprint(meta)
+            doc = self._docs.get(key)
+            if doc is not None and doc['fp'] == fingerprint:
+                if doc['meta'] != meta:
+                    doc['meta'] = meta
+                    self.dirty = True
+                self._set_lib(key, doc, in_library)
+                return False
+            if doc is not None:
+                self._unpost(key, doc['terms'])
+            terms = dict(document_terms(
+                meta['overview'], _split_genres(meta['genres'])
+                ))
+            self._docs[key] = {
+                'terms': terms, 'meta': meta, 'lib': None, 'fp': fingerprint
+                }
+            self._docs.move_to_end(key)
+            self._candidates.pop(key, None)
+            self._set_lib(key, self._docs[key], in_library)
+            self._post(key, terms)
+            self.dirty = True
+            if not in_library:
+                self._trim_candidates()
+            return True
+
+    def add_title(self, title_obj, in_library=False):
+        """
+        Index a Title object
+
+        Args:
+            title_obj (Title): title to index
+            in_library (bool): True if the title is in the user's list
+
+        Returns:
+            bool: True if the title's terms were (re)computed
+        """
+        key = (title_obj.metadata.media_type, str(title_obj.metadata.id))
+        return self.add(key, _title_meta(title_obj), in_library)
+
+    def attach_library(self, library, owner=None):
+        """
+        Follow a library: index its titles once, then take every later
+        write from the library's listener instead of rescanning it
+        Titles that leave the library stay indexed as candidates. A
+        title stays marked as in a library while any owner's library
+        has it.
+
+        Args:
+            library (Library): user's library
+            owner (str, optional): library owner, e.g. the spreadsheet id
+
+        Returns:
+            int: number of titles (re)indexed
+        """
+        # library lock first, as in the listener callbacks
+        with library.lock, self.lock:
+            if self._attached.get(owner) is library:
+                return 0
+            self._attached[owner] = library
+
+            def on_write(record, added):
+                if self._attached.get(owner) is not library:
+                    return
+                if record is None:
+                    self._sync(library, owner)
+                else:
+                    self._track(record, added, owner)
+
+            library.listen('similarity', on_write)
+            return self._sync(library, owner)
+
+    def _sync(self, library, owner):
+        """
+        Re-index a library from scratch, after attaching or a reload
+        """
+        with self.lock:
+            for key, count in self._libraries.pop(owner, {}).items():
+                self._owners[key] -= 1
+                if self._owners[key] <= 0:
+                    del self._owners[key]
+                    doc = self._docs.get(key)
+                    if doc is not None:
+                        self._set_lib(key, doc, False)
+            indexed = 0
+            for row in library.rows():
+                indexed += self._track(library.record(row), True, owner)
+            self._trim_candidates()
+            return indexed
+
+    def _track(self, record, added, owner):
+        """
+        Mirror a row added to or removed from an owner's library
+
+        Returns:
+            bool: True if the title's terms were (re)computed
+        """
+        with self.lock:
+            key = (record.get('media_type'), str(record.get('id')))
+            keys = self._libraries.setdefault(owner, Counter())
+            if added:
+                keys[key] += 1
+                if keys[key] == 1:
+                    self._owners[key] += 1
+                return self.add(key, _record_meta(record), True)
+            if keys[key] > 0:
+                keys[key] -= 1
+                if keys[key] == 0:
+                    del keys[key]
+                    self._owners[key] -= 1
+                    if self._owners[key] <= 0:
+                        del self._owners[key]
+                        doc = self._docs.get(key)
+                        if doc is not None:
+                            self._set_lib(key, doc, False)
+            return False
+
+    def _set_lib(self, key, doc, in_library):
+        """
+        Mark a title as in a library or a candidate
+        """
+        in_library = in_library or key in self._owners
+        if doc['lib'] == in_library:
+            return
+        doc['lib'] = in_library
+        if in_library:
+            self._candidates.pop(key, None)
+        else:
+            self._candidates[key] = None
+        self.dirty = True
+
+    def _post(self, key, terms):
+        for term, frequency in terms.items():
+            posting = self._postings.setdefault(term, {})
+            self._drop_norms(posting)
+            posting[key] = frequency
+
+    def _unpost(self, key, terms):
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(key, None)
+                self._drop_norms(posting)
+                if not posting:
+                    del self._postings[term]
+        self._norms.pop(key, None)
+
+    def _drop_norms(self, posting):
+        """
+        Forget the norms of titles whose term changed document frequency
+        """
+        if self._norms:
+            for key in posting:
+                self._norms.pop(key, None)
+
+    def _trim_candidates(self):
+        """
+        Drop the oldest candidates beyond MAX_CANDIDATES
+        """
+        while len(self._candidates) > MAX_CANDIDATES:
+            key, _ = self._candidates.popitem(last=False)
+            self._unpost(key, self._docs.pop(key)['terms'])
+
+    # --- Vectors ---
+    def _idf(self, term):
+        frequency = len(self._postings.get(term, ()))
+        return math.log((1 + len(self._docs)) / (1 + frequency)) + 1
+
+    def _vector(self, terms):
+        """
+        Unnormalized TF-IDF weights of a term frequency mapping
+        """
+        return {
+            term: (1 + math.log(frequency)) * self._idf(term)
+            for term, frequency in terms.items() if frequency > 0
+            }
+
+    def _norm(self, key):
+        # every norm depends on the index size through the idf
+        if abs(len(self._docs) - self._norm_size) > (
+            NORM_DRIFT * self._norm_size
+        ):
+            self._norms.clear()
+            self._norm_size = len(self._docs)
+        norm = self._norms.get(key)
+        if norm is None:
+            weights = self._vector(self._docs[key]['terms'])
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            self._norms[key] = norm
+        return norm
+
+    def query_vector(self, weighted_keys):
+        """
+        Normalized sum of indexed titles' vectors
+
+        Args:
+            weighted_keys (Iterable[tuple]): (key, weight) pairs, e.g.
+                liked titles weighted by rating; unknown keys are ignored
+
+        Returns:
+            dict: term -> weight
+        """
+        with self.lock:
+            query = Counter()
+            for key, weight in weighted_keys:
+                if key not in self._docs:
+                    continue
+                norm = self._norm(key)
+                vector = self._vector(self._docs[key]['terms'])
+                for term, value in vector.items():
+                    query[term] += weight * value / norm
+            length = math.sqrt(sum(w * w for w in query.values()))
+            return {
+                term: value / length for term, value in query.items()
+                } if length else {}
+
+    # --- Queries ---
+    def similar(self, query, count=10, exclude=None, in_library=None):
+        """
+        Titles most similar to a query vector (cosine similarity)
+        Only titles sharing at least one term with the query are scored
+
+        Args:
+            query (dict): term -> weight (see query_vector)
+            count (int): maximum number of results
+            exclude (Container, optional): keys to leave out
+            in_library (bool, optional): only titles in (True) or
+                out of (False) the library, all if None
+
+        Returns:
+            list[tuple[tuple, float]]: (key, score), best first
+        """
+        with self.lock:
+            scores = Counter()
+            for term, weight in query.items():
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                term_weight = weight * self._idf(term)
+                for key, frequency in posting.items():
+                    scores[key] += term_weight * (1 + math.log(frequency))
+            ranked = []
+            for key, score in scores.items():
+                if exclude is not None and key in exclude:
+                    continue
+                if in_library is not None and (
+                    self._docs[key]['lib'] != in_library
+                ):
+                    continue
+                ranked.append((key, score / self._norm(key)))
+            ranked.sort(key=lambda item: item[1], reverse=True)
+            return ranked[:count]
+
+    def more_like_this(self, key, count=10, membership=None):
+        """
+        Candidates (titles not in the library) most similar to a title
+
+        Args:
+            key (tuple): (media_type, id as str) of an indexed title
+            count (int): maximum number of results
+            membership (LibraryMembership, optional): the user's library,
+                when the index is shared with other users' libraries
+
+        Returns:
+            list[Title]: similar titles, best first
+        """
+        query = self.query_vector([(key, 1)])
+        if membership is None:
+            ranked = self.similar(
+                query, count, exclude={key}, in_library=False
+                )
+        else:
+            ranked = [
+                item for item in self.similar(
+                    query, len(self), exclude={key}
+                    )
+                if not membership.contains(item[0][1], item[0][0])
+                ][:count]
+        titles = [self.build_title(similar_key) for similar_key, _ in ranked]
+        if membership is not None:
+            for title_obj in titles:
+                title_obj.in_library = False
+        return titles
+
+    def score_titles(self, title_objs, query):
+        """
+        Cosine similarity of titles to a query vector
+        Titles are indexed as candidates if they aren't yet
+
+        Args:
+            title_objs (list[Title]): titles to score
+            query (dict): term -> weight (see query_vector)
+
+        Returns:
+            list[float]: one score in [0, 1] per title
+        """
+        with self.lock:
+            scores = []
+            for title_obj in title_objs:
+                key = (
+                    title_obj.metadata.media_type, str(title_obj.metadata.id)
+                    )
+                if key not in self._docs:
+                    self.add_title(title_obj)
+                terms = self._docs[key]['terms']
+                dot = sum(
+                    weight * (1 + math.log(terms[term])) * self._idf(term)
+                    for term, weight in query.items() if term in terms
+                    )
+                scores.append(dot / self._norm(key))
+            return scores
+
+    def build_title(self, key):
+        """
+        Rebuild a Title from the stored metadata of an indexed title
+
+        Args:
+            key (tuple): (media_type, id as str)
+
+        Returns:
+            Title: title without user data
+        """
+        doc = self._docs[key]
+        title_obj = Title.from_sheet_dict(doc['meta'])
+        title_obj.in_library = doc['lib']
+        return title_obj
+
+    # --- Persistence ---
+    def to_dict(self):
+        """
+        Returns:
+            dict: JSON serializable representation
+        """
+        with self.lock:
+            return {
+                'version': INDEX_VERSION,
+                'docs': [
+                    [key[0], key[1], doc['terms'], doc['meta'],
+                     doc['lib'], doc['fp']]
+                    for key, doc in self._docs.items()
+                    ],
+            }
+
+    @classmethod
+    def from_dict(cls, data, path=None):
+        """
+        Args:
+            data (dict): result of to_dict()
+            path (str, optional): file the index is saved to
+
+        Returns:
+            SimilarityIndex or None: None if the data is from another version
+        """
+        if data.get('version') != INDEX_VERSION:
+            return None
+        index = cls(path)
+        # titles are candidates until a library attached this session
+        # has them (see attach_library)
+        for media_type, title_id, terms, meta, _, fp in data['docs']:
+            key = (media_type, title_id)
+            index._docs[key] = {
+                'terms': terms, 'meta': meta, 'lib': False, 'fp': fp
+                }
+            index._candidates[key] = None
+            index._post(key, terms)
+        return index
+
+    def save(self):
+        """
+        Write the index to its file if it changed (atomic replace)
+
+        Returns:
+            bool: True if the index was written
+        """
+        with self.lock:
+            if self.path is None or not self.dirty:
+                return False
+            tmp_path = f'{self.path}.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    json.dump(self.to_dict(), file, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+            except OSError:
+                print("\n⚠️  Could not save the similarity index.")
+                return False
+            self.dirty = False
+            return True
+
+
+def load_similarity_index(path):
+    """
+    Read an index file
+
+    Args:
+        path (str): index file
+
+    Returns:
+        SimilarityIndex: the saved index, or an empty one if the file
+        is missing, unreadable or from another version
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            index = SimilarityIndex.from_dict(json.load(file), path)
+    except (OSError, ValueError, KeyError, TypeError):
+        index = None
+    return index if index is not None else SimilarityIndex(path)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+@traced('similarity.sync', count=None)
+def get_similarity_index(sheet=None):
+    """
+    Return the session's similarity index, loading it on first use
+
+    Args:
+        sheet (gspread.Spreadsheet, optional): when given, the index
+            follows the sheet's library (indexed on the first call,
+            updated by its writes afterwards)
+
+    Returns:
+        SimilarityIndex
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = load_similarity_index(cache_path(INDEX_FILE))
+    if sheet is not None:
+        library = get_library(sheet)
+        if library is not None:
+            _index.attach_library(library, sheet.id)
+    return _index
+
+
+def save_similarity_index():
+    """
+    Save the session's similarity index if it was loaded and changed
+    """
+    if _index is not None:
+        _index.save()
+
+
+def taste_query(index, profile):
+    """
+    Query vector of the user's liked titles, weighted by rating
+
+    Args:
+        index (SimilarityIndex): synced index
+        profile (TasteProfile): user's taste profile
+
+    Returns:
+        dict: term -> weight, empty if nothing is liked
+    """
+    return index.query_vector(
+        ((entry['media_type'], str(entry['id'])), entry['rating'])
+        for entry in profile.top_titles()
+        )
+
+
+def blend_scores(base_scores, content_scores, weight=CONTENT_WEIGHT):
+    """
+    Mix base scores, scaled to [0, 1], with content similarity
+
+    Args:
+        base_scores (Sequence[float]): scores of the original ranking
+        content_scores (Sequence[float]): cosine similarities
+        weight (float): share of the content similarity
+
+    Returns:
+        list[float]: blended scores
+    """
+    peak = max(base_scores, default=0) or 1
+    return [
+        (1 - weight) * base / peak + weight * content
+        for base, content in zip(base_scores, content_scores)
+        ]
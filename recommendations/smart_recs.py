@@ -8,89 +8,110 @@ from tmdb.tmdb_api import discover_titles_by_genre
 from models.title import (
     prepare_title_objects_from_tmdb
 )
+from sheets.query import get_titles_by_watch_status
+from sheets.library import get_library_membership
+from sheets.utils import build_title_objects_from_sheet
+from utils.tracing import traced
+from ui.progress import run_task
 from .display import display_and_select_title
-from .utils import (
-    get_top_title,
-    sort_titles_by_relevance
-)
-from .filters import (
-    get_top_rated_titles,
-    get_preferred_media_type_and_genre_ids,
-    partition_list_by_media_type,
-    filter_list_by_genre
-)
-from .genre_analysis import get_preferred_genre
+from .scoring import rank_titles
+from .similarity import get_similarity_index, taste_query
+from .result_cache import cached_result
 
+# Number of titles shown by the recommendation screens
+RECOMMENDATION_COUNT = 6
 
-def get_top_title_by_preferred_genre(title_objects):
+
+@traced('watchlist.load')
+def load_watchlist_titles(google_sheet):
     """
-    Get the most relevant top-rated title in the preferred genre
+    Read the watchlist as Title objects
 
     Args:
-        title_objects (list): List of Title objects
+        google_sheet (obj): Initialized Google Sheet
 
     Returns:
-        Title or None: Top title in the preferred genre, or None if unavailable
+        list: Title objects not marked as watched
     """
-    top_rated_titles = get_top_rated_titles(title_objects)
-    if not top_rated_titles:
-        return None
-
-    preferred_genre = get_preferred_genre(top_rated_titles)
-    titles_in_genre = filter_list_by_genre(top_rated_titles, preferred_genre)
-
-    if not titles_in_genre:
-        return None
-
-    return get_top_title(titles_in_genre)
+    return build_title_objects_from_sheet(
+        get_titles_by_watch_status(google_sheet, False)
+        )
 
 
-def get_personalized_recommendations(
-    watched_titles,
-    watchlist_titles,
-    google_sheet
-):
+def get_personalized_recommendations(profile, google_sheet):
     """
     Generate personalized recommendations from watchlist
 
-    Uses the user's top-rated watched titles to determine a preferred genre,
-    then sorts watchlist titles by genre and media type matches
+    Uses the user's taste profile to determine a preferred genre,
+    then ranks watchlist titles by genre and media type matches.
+    The ranking is cached until the library changes
 
     Args:
-        watched_titles (list): titles marked as watched
-        watchlist_titles (list): titles marked as watchlist
+        profile (TasteProfile): user's taste profile
+        google_sheet (obj): Initialized Google Sheet
 
     Returns:
         list: personalized and sorted recommendation list
     """
-    if len(watched_titles) <= 3:
+    if profile.watched_count <= 3:
         print("\n⚠️  Your viewing history is still quite limited.")
         print(
             "   The more you watch and rate, the better the recommendations!"
             )
-    if len(watchlist_titles) <= 3:
+    if profile.watchlist_count <= 3:
         print("\n⚠️  You only have a few titles in your watchlist.")
         print("   Recommendations may be limited. Consider adding more!")
-    top_rated_titles = get_top_rated_titles(watched_titles)
-
-    if not top_rated_titles:
-        title_list = watched_titles + watchlist_titles
-        return handle_no_top_rated(title_list, google_sheet)
-    else:
-        return generate_recommendations_from_history(
-            top_rated_titles,
-            watchlist_titles
-            )
 
+    if not profile.has_top_rated():
+        return handle_no_top_rated(profile, google_sheet)
 
-def handle_no_top_rated(title_list, google_sheet):
+    preferred_genre = profile.preferred_genre()
+    top_title = profile.top_title(preferred_genre)
+    if not preferred_genre or not top_title:
+        print("\n⚠️  Unable to generate personalized recommendations.")
+        return []
+
+    print(f"\nYou've been watching {preferred_genre.lower()} titles, "
+          f"such as '{top_title['title']}'!")
+    print("\n🔄  Generating recommendations based on genre similarity...")
+    return run_task(
+        'Generating recommendations',
+        cached_result,
+        'history',
+        google_sheet,
+        lambda: compute_history_recommendations(google_sheet, profile)
+        )
+
+
+@traced('recs.history')
+def compute_history_recommendations(google_sheet, profile):
+    """
+    Rank the watchlist against the user's taste (the 'history' flow)
+
+    Args:
+        google_sheet (obj): Initialized Google Sheet
+        profile (TasteProfile): user's taste profile
+
+    Returns:
+        list: ranked watchlist titles, [] without liked titles
+    """
+    if not profile.has_top_rated() or not profile.watchlist_count:
+        return []
+    return generate_recommendations_from_history(
+        profile,
+        load_watchlist_titles(google_sheet),
+        index=get_similarity_index(google_sheet)
+        )
+
+
+def handle_no_top_rated(profile, google_sheet):
     """
     Fallback recommendations when no top-rated titles exists
-    Analyze all titles in list to determine media_type and genre preference,
+    Uses the media_type and genre preference of all titles in list,
     then uses discover API to fetch recommendations
 
     Args:
-        title_list (list): Combined list of watched an watchlist
+        profile (TasteProfile): user's taste profile
         google_sheet (obj): Initialized Google Sheet
 
     Returns:
@@ -98,17 +119,22 @@ def handle_no_top_rated(title_list, google_sheet):
     """
     print("\nIt seems like you didn't find any title you liked yet.")
     print("\n🔄  Analyzing all titles in your list...")
-    media_type, genre_id = get_preferred_media_type_and_genre_ids(title_list)
+    preference = profile.preferred_media_type_and_genre_id()
+    if preference is None:
+        print("⚠️ No media types / genre_ids pairs found.")
+        return []
+    media_type, genre_id = preference
     print(f"\n🔄  Fetching discover titles based on {media_type} preference...")
-    discover_results = discover_titles_by_genre(media_type, genre_id)
-    if not discover_results:
+    discover_titles_objects = run_task(
+        'Fetching discover titles',
+        cached_result,
+        'no_top_rated',
+        google_sheet,
+        lambda: compute_discover_recommendations(google_sheet, profile)
+        )
+    if not discover_titles_objects:
         print("\n⚠️  Unable to fetch discover titles. Please try again later.")
         return []
-    discover_titles_objects = prepare_title_objects_from_tmdb(
-        discover_results,
-        True,
-        media_type
-        )
     return display_and_select_title(
         discover_titles_objects,
         'recommendation',
@@ -116,61 +142,63 @@ def handle_no_top_rated(title_list, google_sheet):
         )
 
 
-def generate_recommendations_from_history(top_rated_titles, watchlist_titles):
+@traced('recs.discover')
+def compute_discover_recommendations(google_sheet, profile):
     """
-    Recommed titles based on user's viewing history
-    Determine prgenre and preference and filters/sorts watchlist
-    based on similarity to user's top-rated content
+    Discover titles in the most frequent media type and genre of the
+    list, leaving out saved titles (the 'no_top_rated' flow)
 
     Args:
-        top_rated_titles (list): Titles user rated 3 or above
-        watchlist_titles (list): titles in user's watchlist
+        google_sheet (obj): Initialized Google Sheet
+        profile (TasteProfile): user's taste profile
 
     Returns:
-        list: Sorted list of recommended titles based on viewing history
+        list: discover titles, most popular first
     """
-    preferred_genre = get_preferred_genre(top_rated_titles)
-    top_title = get_top_title_by_preferred_genre(top_rated_titles)
-
-    if not top_title or not hasattr(top_title, "metadata"):
-        print("\n⚠️  Unable to generate personalized recommendations.")
+    preference = profile.preferred_media_type_and_genre_id()
+    if preference is None:
         return []
-
-    print(f"\nYou've been watching {preferred_genre.lower()} titles, "
-          f"such as '{top_title.metadata.title}'!")
-    print("\n🔄  Generating recommendations based on genre similarity...")
-
-    top_title_media_type = top_title.metadata.media_type
-    filtered_titles = filter_list_by_genre(watchlist_titles, preferred_genre)
-    if not filtered_titles:
-        relevance_sorted = sort_titles_by_relevance(
-            watchlist_titles,
-            "watchlist",
-            top_title
-            )
-    else:
-        relevance_sorted = sort_titles_by_relevance(
-            filtered_titles,
-            "watchlist",
-            top_title
-            )
-
-    return reorder_titles_by_media_type(relevance_sorted, top_title_media_type)
+    media_type, genre_id = preference
+    return prepare_title_objects_from_tmdb(
+        discover_titles_by_genre(media_type, genre_id),
+        True,
+        media_type,
+        membership=get_library_membership(google_sheet),
+        drop_saved=True
+        )
 
 
-def reorder_titles_by_media_type(titles, preferred_media_type):
+@traced('recs.rank_history')
+def generate_recommendations_from_history(
+    profile,
+    watchlist_titles,
+    top_k=RECOMMENDATION_COUNT,
+    index=None
+):
     """
-    Reorder titles by prioritizing the preferred_media_type
+    Recommed titles based on user's viewing history
+    Scores the whole watchlist against the rating-weighted genre profile
+    of all top-rated titles, blended with popularity and media type,
+    and with overview similarity to the liked titles if an index is given
 
     Args:
-        titles (list): List of title objects to order
-        preferred_media_type (str): preferred media type ('movie' or 'tv')
+        profile (TasteProfile): user's taste profile
+        watchlist_titles (list): titles in user's watchlist
+        top_k (int): number of recommendations to return
+        index (SimilarityIndex, optional): index synced with the library
 
     Returns:
-        list: Reordered list of titles with preferred media_type first
+        list: Top k recommended titles based on viewing history
     """
-    match, non_match = partition_list_by_media_type(
-        titles,
-        preferred_media_type
+    content_scores = None
+    if index is not None:
+        query = taste_query(index, profile)
+        if query:
+            content_scores = index.score_titles(watchlist_titles, query)
+    return rank_titles(
+        watchlist_titles,
+        profile.genre_scores,
+        top_k,
+        profile.preferred_media_type(),
+        content_scores
         )
-    return match + non_match
@@ -7,24 +7,39 @@ from tmdb.tmdb_api import fetch_trending_titles, TMDB_API_KEY
 from models.title import (
     prepare_title_objects_from_tmdb
 )
+from sheets.library import get_library_membership
+from ui.progress import run_tasks
 from .display import display_and_select_title
 
 
-def show_trending_titles(mode, google_sheet):
+def show_trending_titles(mode, google_sheet, drop_saved=False):
     """
     Fetch trending titles from TMDB and allow the user to explore or save one.
+    Titles already in the user's list are marked, or left out
 
     Args:
         google_sheet: Google Sheet object
         mode (str): 'search' or 'recommendation'
+        drop_saved (bool): leave out titles already in the list
 
     Returns:
         None
     """
     print("\n🔄  Fetching trending titles...")
-    trending_results = fetch_trending_titles(TMDB_API_KEY)
+    # the TMDb request and the library read run concurrently
+    trending_results, membership = run_tasks('Fetching trending titles', [
+        (fetch_trending_titles, TMDB_API_KEY),
+        (get_library_membership, google_sheet),
+        ])
     if not trending_results:
         print("\n⚠️  Unable to fetch trending titles. Please try again later.")
         return
-    trending_title_objects = prepare_title_objects_from_tmdb(trending_results)
+    trending_title_objects = prepare_title_objects_from_tmdb(
+        trending_results,
+        membership=membership,
+        drop_saved=drop_saved
+        )
+    if not trending_title_objects:
+        print("\n⚠️  Everything trending is already in your list!")
+        return
     display_and_select_title(trending_title_objects, mode, google_sheet)
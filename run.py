@@ -1,37 +1,574 @@
 """
 CLI Reel tracker orchestration
 """
+import argparse
+import importlib
+import os
+import sys
 from ui.menus import display_main_menu
-from ui.handlers import (
-    handle_search,
-    handle_watchlist_or_watched,
+from ui.progress import OperationCancelled
+from utils.tracing import enable_tracing, trace_run
+from utils.prefetch import PrefetchScheduler
+
+# The sheets, TMDb and recommendation layers (gspread, google-auth,
+# requests, numpy) are imported where they are used: the menu renders
+# right away while a background thread authorizes and imports them.
+# Modules imported ahead of the first menu action
+WARM_MODULES = (
+    'ui.handlers',
+    'recommendations.recs',
+    'recommendations.trending',
+    'recommendations.prefetch',
 )
-from sheets.auth import initialize_google_sheets
-from recommendations.recs import handle_recommendations
-from recommendations.trending import show_trending_titles
+# Written by a warm worker once it can start a session: an OSC "set
+# window title" sequence, which terminals display nothing for
+WORKER_READY = '\x1b]0;reeltracker\x07'
+
+SHEET_NAME = 'reeltracker_cli'
 
 
-def main():
+def parse_args(argv=None):
+    """
+    Parse command line arguments
+
+    Args:
+        argv (list[str], optional): arguments, defaults to sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description='Track and get recommendations for movies and TV shows.'
+        )
+    parser.add_argument(
+        'command',
+        nargs='?',
+        default='menu',
+        choices=[
+            'menu', 'precompute', 'batch', 'worker', 'serve', 'import',
+            'export', 'restore'
+            ],
+        help="'menu' (default) starts the interactive CLI, 'precompute' "
+             "computes recommendations ahead of time and exits, 'batch' "
+             "precomputes them for several spreadsheets in parallel, "
+             "'worker' warms up and waits for the web terminal to start "
+             "a session, 'serve' runs many sessions in one process "
+             "over TCP, 'import' adds the titles of a CSV file to your "
+             "list, 'export' backs your list up to a file and 'restore' "
+             "adds the rows of a backup back to it"
+        )
+    parser.add_argument(
+        'sheets',
+        nargs='*',
+        help="spreadsheet names or keys for 'batch' "
+             f"(defaults to {SHEET_NAME}), spreadsheets clients of 'serve' "
+             f"may open besides {SHEET_NAME}, or the file for 'import', "
+             "'export' and 'restore'"
+        )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help="worker processes for 'batch' (defaults to one per core), "
+             "or concurrent TMDb searches for 'import' (default 8)"
+        )
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help="interface 'serve' listens on (default 127.0.0.1)"
+        )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=None,
+        help="TCP port for 'serve' (default 8765)"
+        )
+    parser.add_argument(
+        '--max-sessions',
+        type=int,
+        default=None,
+        help="sessions 'serve' runs at once (default 64)"
+        )
+    status = parser.add_mutually_exclusive_group()
+    status.add_argument(
+        '--watched',
+        dest='watched',
+        action='store_true',
+        default=None,
+        help="'import' every title as watched, or 'export'/'restore' "
+             "only the watched titles"
+        )
+    status.add_argument(
+        '--watchlist',
+        dest='watched',
+        action='store_false',
+        help="'import' every title to the watchlist (by default, rows "
+             "with a rating or watched date are watched), or "
+             "'export'/'restore' only the watchlist"
+        )
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'jsonl', 'snap'],
+        default=None,
+        help="file format for 'export' and 'restore' (default: from the "
+             "file extension)"
+        )
+    parser.add_argument(
+        '--include-ambiguous',
+        action='store_true',
+        help="'import' ambiguous matches too, not just the confident ones"
+        )
+    parser.add_argument(
+        '--yes',
+        action='store_true',
+        help="'import' without asking for confirmation"
+        )
+    parser.add_argument(
+        '--trace',
+        nargs='?',
+        const='',
+        default=None,
+        metavar='FILE',
+        help="time the recommendation stages: print a summary after each "
+             "action and append spans to a JSONL file (default "
+             ".reeltracker/trace.jsonl)"
+        )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Main execution function for the CLI Reel Tracker.
+
+    The main menu is shown right away: the spreadsheet is opened and
+    the library saved by the previous session is loaded and revalidated
+    in the background, and the first menu action waits for them.
+    The library is saved again on exit, along with the similarity index.
+    Set REELTRACKER_STATS to print title cache usage on exit,
+    and REELTRACKER_TRACE (or pass --trace) to time every action.
+
+    Args:
+        argv (list[str], optional): arguments, defaults to sys.argv[1:]
     """
+    args = parse_args(argv)
+    if args.trace is not None:
+        enable_tracing(args.trace or None)
+    if args.command == 'precompute':
+        with trace_run('precompute'):
+            run_precompute()
+        return
+    if args.command == 'batch':
+        with trace_run('batch'):
+            run_batch(args.sheets or [SHEET_NAME], args.workers)
+        return
+    if args.command == 'worker':
+        run_worker()
+        return
+    if args.command == 'serve':
+        run_server(args.host, args.port, args.max_sessions, args.sheets)
+        return
+    if args.command == 'import':
+        if len(args.sheets) != 1:
+            print("\n❌  'import' takes one CSV file.")
+            return
+        with trace_run('import'):
+            run_import(
+                args.sheets[0], args.watched, args.include_ambiguous,
+                args.yes, args.workers
+                )
+        return
+    if args.command in ('export', 'restore'):
+        if len(args.sheets) != 1:
+            print(f"\n❌  '{args.command}' takes one file.")
+            return
+        job = run_export if args.command == 'export' else run_restore
+        with trace_run(args.command):
+            job(args.sheets[0], args.format, args.watched)
+        return
     print("\nInitiating ReelTracker...")
-    google_sheet = initialize_google_sheets('reeltracker_cli')
+    run_interactive(start_session(SHEET_NAME))
+
+
+def run_interactive(sheet_future, sheet_name=SHEET_NAME):
+    """
+    Run the main menu until the user exits, prefetching while it waits
+    for input, then save the session
+
+    Args:
+        sheet_future (concurrent.futures.Future): start_session() result
+        sheet_name (str): Name of the Google Sheet
+    """
+    prefetcher = PrefetchScheduler(prefetch_plan(sheet_future, sheet_name))
+    prefetcher.start()
+    google_sheet = None
+    try:
+        google_sheet = run_menu_loop(sheet_future, prefetcher, sheet_name)
+    finally:
+        prefetcher.cancel()
+        if google_sheet is not None:
+            end_session(google_sheet, sheet_name)
+
+
+def run_worker():
+    """
+    Warm worker of the web terminal pool (see controllers/default.js)
+
+    Imports the menu actions' modules and opens the spreadsheet before
+    any visitor connects, then writes WORKER_READY and waits for a line
+    from the controller, with echo off so the line never shows. The
+    library is revalidated when the session starts, since the worker
+    may have been idle for a while.
+    """
+    import termios
+
+    interactive = sys.stdin.isatty()
+    if interactive:
+        settings = termios.tcgetattr(sys.stdin)
+        quiet = list(settings)
+        quiet[3] &= ~termios.ECHO
+        termios.tcsetattr(sys.stdin, termios.TCSANOW, quiet)
+    try:
+        sheet_future = start_session(SHEET_NAME)
+        for module in WARM_MODULES:
+            importlib.import_module(module)
+        try:
+            sheet_future.result()
+        except Exception:  # reported by the first menu action
+            pass
+        print(WORKER_READY, end='', flush=True)
+        if not sys.stdin.readline():
+            return  # controller went away
+    finally:
+        if interactive:
+            termios.tcsetattr(sys.stdin, termios.TCSANOW, settings)
+    if sheet_future.exception() is None:
+        from sheets.library import refresh_library
+
+        refresh_library(sheet_future.result())
+    run_interactive(sheet_future)
+
+
+def run_server(host, port=None, max_sessions=None, sheet_names=None):
+    """
+    Serve interactive sessions over TCP from this process, sharing its
+    caches and Google client, until interrupted (see ui.sessions)
+
+    Args:
+        host (str): interface to listen on
+        port (int, optional): TCP port
+        max_sessions (int, optional): sessions served at once
+        sheet_names (list[str], optional): spreadsheets clients may open
+            besides SHEET_NAME
+    """
+    import asyncio
+    from ui.sessions import DEFAULT_PORT, MAX_SESSIONS, SessionManager
+
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+    manager = SessionManager(
+        serve_session, SHEET_NAME, max_sessions or MAX_SESSIONS,
+        allowed_sheets=sheet_names
+        )
+    try:
+        asyncio.run(manager.serve(host, port or DEFAULT_PORT))
+    except KeyboardInterrupt:
+        print('\n👋 Server stopped.')
+
+
+def serve_session(sheet_name, client):
+    """
+    One session of run_server(), on a thread of the server
+
+    Args:
+        sheet_name (str): Name of the Google Sheet
+        client (gspread.Client): the server's authorized client
+    """
+    print(f"\nInitiating ReelTracker for '{sheet_name}'...")
+    run_interactive(start_session(sheet_name, client), sheet_name)
+
+
+def start_session(sheet_name, client=None):
+    """
+    Open the spreadsheet on a background thread, then register the
+    library snapshot of the previous session, revalidate it against the
+    worksheet, and import the modules the menu actions need
+
+    Args:
+        sheet_name (str): Name of the Google Sheet
+        client (gspread.Client, optional): client already authorized
+
+    Returns:
+        concurrent.futures.Future: resolves to the gspread.Spreadsheet
+    """
+    from sheets.auth import initialize_google_sheets_in_background
+
+    def setup(google_sheet):
+        from sheets.library import load_library_snapshot, start_library_sync
+
+        start_library_sync(google_sheet, load_library_snapshot(sheet_name))
+        for module in WARM_MODULES:
+            importlib.import_module(module)
+
+    return initialize_google_sheets_in_background(
+        sheet_name, setup, client=client
+        )
+
+
+def prefetch_plan(sheet_future, sheet_name=SHEET_NAME):
+    """
+    Plan warming the caches while the user is at the main menu,
+    see recommendations.prefetch
+
+    Args:
+        sheet_future (concurrent.futures.Future): start_session() result
+        sheet_name (str): Name of the Google Sheet
+
+    Returns:
+        callable: plan for PrefetchScheduler, imported on its thread
+    """
+    plan = None
+
+    def run_plan():
+        nonlocal plan
+        if plan is None:
+            from recommendations.prefetch import LibraryPrefetch
+
+            plan = LibraryPrefetch(sheet_future, sheet_name)
+        return plan()
+
+    return run_plan
+
+
+def wait_for_session(sheet_future, sheet_name=SHEET_NAME):
+    """
+    Wait for the spreadsheet opened by start_session()
+
+    Args:
+        sheet_future (concurrent.futures.Future): start_session() result
+        sheet_name (str): Name of the Google Sheet
+
+    Returns:
+        gspread.Spreadsheet or None: None if it couldn't be opened
+    """
+    if not sheet_future.done():
+        print("\n🔄  Connecting to Google Sheets...")
+    try:
+        return sheet_future.result()
+    except Exception as e:  # raised on the background thread
+        print(f"\n❌  Could not open '{sheet_name}': {e}")
+        return None
+
+
+def end_session(google_sheet, sheet_name=SHEET_NAME):
+    """
+    Save the library snapshot and the similarity index for the next
+    launch. Set REELTRACKER_STATS to print title cache usage.
+
+    Args:
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+        sheet_name (str): Name of the Google Sheet
+    """
+    from sheets.library import save_library_snapshot
+    from recommendations.similarity import save_similarity_index
+    from models.identity_map import title_identity_map, format_stats
+
+    save_library_snapshot(google_sheet, sheet_name)
+    save_similarity_index()
+    if os.getenv('REELTRACKER_STATS'):
+        print(f"\n{format_stats(title_identity_map.stats())}")
+
+
+def run_precompute():
+    """
+    Non-interactive job: load the library once, precompute every
+    recommendation flow into the local cache, and exit
+    """
+    from sheets.auth import initialize_google_sheets
+    from sheets.library import save_library_snapshot
+    from recommendations.similarity import save_similarity_index
+    from recommendations.precompute import precompute_recommendations
+
+    print("\nPrecomputing ReelTracker recommendations...")
+    google_sheet = initialize_google_sheets(SHEET_NAME)
+    counts = precompute_recommendations(google_sheet)
+    if counts:
+        save_library_snapshot(google_sheet, SHEET_NAME)
+        save_similarity_index()
+        print(f"\n✅  Precomputed {sum(counts.values())} recommendations.")
+
+
+def run_batch(sheet_names, max_workers=None):
+    """
+    Non-interactive job: precompute recommendations for several
+    spreadsheets, scoring their libraries in parallel processes
+
+    Args:
+        sheet_names (list[str]): spreadsheet names or keys
+        max_workers (int, optional): number of worker processes
+    """
+    from sheets.auth import open_google_sheets
+    from recommendations.batch import batch_precompute
+
+    print(f"\nPrecomputing recommendations for {len(sheet_names)} "
+          "spreadsheets...")
+    google_sheets = open_google_sheets(sheet_names)
+    summary = batch_precompute(google_sheets, max_workers)
+    if summary:
+        print(f"\n✅  Precomputed {sum(summary.values())} recommendations "
+              f"for {len(summary)} spreadsheets.")
+
+
+def run_import(
+    path,
+    watched=None,
+    include_ambiguous=False,
+    assume_yes=False,
+    max_workers=None
+):
+    """
+    Non-interactive job: match the titles of a CSV file to TMDb and
+    add them to the list with one batched write
+
+    Args:
+        path (str): CSV file, e.g. a Letterboxd, IMDb or Netflix export
+        watched (bool, optional): import everything as watched (True)
+            or to the watchlist (False), decided per row if None
+        include_ambiguous (bool): import ambiguous matches too
+        assume_yes (bool): don't ask for confirmation
+        max_workers (int, optional): concurrent TMDb searches
+    """
+    from sheets.auth import initialize_google_sheets
+    from sheets.importer import MAX_WORKERS, import_titles
+
+    print(f"\nImporting '{path}' into ReelTracker...")
+    google_sheet = initialize_google_sheets(SHEET_NAME)
+    try:
+        count = import_titles(
+            google_sheet, path, watched, include_ambiguous, assume_yes,
+            max_workers or MAX_WORKERS
+            )
+    except (OperationCancelled, KeyboardInterrupt):
+        print("\n⏹️  Import cancelled, nothing was written.")
+        return
+    if count:
+        print(f"\n✅  Imported {count} titles.")
+
+
+def run_export(path, file_format=None, watched=None):
+    """
+    Non-interactive job: stream the list to a CSV, JSONL or snapshot
+    file, a chunk of rows at a time
+
+    Args:
+        path (str): destination file
+        file_format (str, optional): 'csv', 'jsonl' or 'snap', from the
+            extension if None
+        watched (bool, optional): only export the watched titles (True)
+            or the watchlist (False)
+    """
+    from sheets.auth import initialize_google_sheets
+    from sheets.backup import export_library
+
+    print(f"\nExporting ReelTracker list to '{path}'...")
+    google_sheet = initialize_google_sheets(SHEET_NAME)
+    count = export_library(google_sheet, path, file_format, watched)
+    if count is not None:
+        print(f"\n✅  Exported {count} titles.")
+
+
+def run_restore(path, file_format=None, watched=None):
+    """
+    Non-interactive job: append the rows of a backup file to the list
+    in batched writes, skipping titles already there
+
+    Args:
+        path (str): CSV, JSONL or snapshot file
+        file_format (str, optional): 'csv', 'jsonl' or 'snap', from the
+            extension if None
+        watched (bool, optional): only restore the watched titles (True)
+            or the watchlist (False)
+    """
+    from sheets.auth import initialize_google_sheets
+    from sheets.backup import restore_library
+
+    print(f"\nRestoring '{path}' into ReelTracker...")
+    google_sheet = initialize_google_sheets(SHEET_NAME)
+    counts = restore_library(google_sheet, path, file_format, watched)
+    if counts is not None:
+        written, skipped = counts
+        print(f"\n✅  Restored {written} titles ({skipped} already in "
+              "your list).")
+
+
+def run_menu_loop(sheet_future, prefetcher=None, sheet_name=SHEET_NAME):
+    """
+    Dispatch main menu choices until the user exits,
+    tracing each action as a run
+    Ctrl-C cancels the current action and returns to the main menu
+    (see ui.progress); at the main menu it exits
+
+    Args:
+        sheet_future (concurrent.futures.Future): start_session() result,
+            waited on by the first menu action
+        prefetcher (PrefetchScheduler, optional): resumed while the
+            main menu waits for input, paused during actions
+        sheet_name (str): Name of the Google Sheet
+
+    Returns:
+        gspread.Spreadsheet or None: the spreadsheet, if it was opened
+    """
+    google_sheet = None
     while True:
-        user_choice = display_main_menu()
+        if prefetcher is not None:
+            prefetcher.resume()
+        try:
+            user_choice = display_main_menu()
+        except KeyboardInterrupt:  # Ctrl-C at the main menu exits
+            user_choice = 'exit'
+        if prefetcher is not None:
+            prefetcher.pause()
         if user_choice == 'exit':
             print('\n👋 Goodbye!')
             break
-        if user_choice == 'search':
-            handle_search(user_choice, google_sheet)
-            continue
-        if user_choice in ['watched', 'watchlist']:
-            handle_watchlist_or_watched(user_choice, google_sheet)
-            continue
-        if user_choice == 'recommendation':
-            handle_recommendations(user_choice, google_sheet)
-        if user_choice == 'trending':
-            show_trending_titles(user_choice, google_sheet)
+        try:
+            if google_sheet is None:
+                google_sheet = wait_for_session(sheet_future, sheet_name)
+                if google_sheet is None:
+                    break
+            with trace_run(user_choice):
+                dispatch_menu_choice(user_choice, google_sheet)
+        except (OperationCancelled, KeyboardInterrupt):
+            # Ctrl-C during an action only cancels the action
+            print("\n\n⏹️  Cancelled. Returning to main menu...")
+    return google_sheet
+
+
+def dispatch_menu_choice(user_choice, google_sheet):
+    """
+    Run the handler of a main menu choice
+
+    Args:
+        user_choice (str): choice returned by display_main_menu()
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+    """
+    from ui.handlers import (
+        handle_find,
+        handle_search,
+        handle_watchlist_or_watched
+    )
+    from recommendations.recs import handle_recommendations
+    from recommendations.trending import show_trending_titles
+
+    if user_choice == 'search':
+        handle_search(user_choice, google_sheet)
+    elif user_choice in ['watched', 'watchlist']:
+        handle_watchlist_or_watched(user_choice, google_sheet)
+    elif user_choice == 'recommendation':
+        handle_recommendations(user_choice, google_sheet)
+    elif user_choice == 'trending':
+        show_trending_titles(user_choice, google_sheet)
+    elif user_choice == 'find':
+        handle_find(user_choice, google_sheet)
 
 
 if __name__ == "__main__":
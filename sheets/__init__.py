@@ -4,10 +4,16 @@ Exposes sheet-related functions and constants for external use.
 Includes CRUD utilities and sheet initialization helpers.
 """
 
-from .auth import initialize_google_sheets
+from .auth import (
+    initialize_google_sheets,
+    initialize_google_sheets_in_background,
+    open_google_sheets
+)
 from .crud import (
     get_or_create_worksheet,
     save_item_to_list,
+    save_items_to_list,
+    get_worksheet_codec,
     delete_item_in_list,
     update_item_in_list
 )
@@ -19,12 +25,46 @@ from .query import (
     has_watched,
     has_watchlist
 )
+from .library import (
+    Library,
+    get_library,
+    get_cached_library,
+    register_library,
+    get_library_revision,
+    get_library_membership,
+    load_library_snapshot,
+    save_library_snapshot,
+    start_library_sync
+)
+from .importer import (
+    read_import_rows,
+    match_rows,
+    plan_import,
+    import_titles
+)
+from .backup import (
+    iter_sheet_records,
+    iter_backup_records,
+    export_library,
+    restore_library
+)
+from .codec import RowCodec, get_row_codec
 from .utils import build_title_objects_from_sheet
+from .worksheets import (
+    open_spreadsheet,
+    get_worksheet,
+    forget_worksheet,
+    with_worksheet
+)
 
 __all__ = [
     "initialize_google_sheets",
+    "initialize_google_sheets_in_background",
+    "open_google_sheets",
     "get_or_create_worksheet",
     "save_item_to_list",
+    "save_items_to_list",
+    "get_worksheet_codec",
     "delete_item_in_list",
     "update_item_in_list",
     "check_for_duplicate",
@@ -33,5 +73,28 @@ __all__ = [
     "has_items",
     "has_watched",
     "has_watchlist",
+    "Library",
+    "get_library",
+    "get_cached_library",
+    "register_library",
+    "get_library_revision",
+    "get_library_membership",
+    "load_library_snapshot",
+    "save_library_snapshot",
+    "start_library_sync",
+    "read_import_rows",
+    "match_rows",
+    "plan_import",
+    "import_titles",
+    "iter_sheet_records",
+    "iter_backup_records",
+    "export_library",
+    "restore_library",
+    "RowCodec",
+    "get_row_codec",
     "build_title_objects_from_sheet",
+    "open_spreadsheet",
+    "get_worksheet",
+    "forget_worksheet",
+    "with_worksheet",
 ]
@@ -2,9 +2,12 @@
 Manages Google Sheets API authentication and client setup.
 
 Loads credentials and returns authorized access to the target spreadsheet.
+gspread and google-auth are imported on first use, so the CLI can show
+its menu while a background thread authorizes.
 """
-import gspread
-from google.oauth2.service_account import Credentials
+import contextvars
+import threading
+from concurrent.futures import Future
 
 # Google API authentication
 GOOGLE_SHEETS_SCOPE = [
@@ -17,19 +20,115 @@ CREDS = 'creds.json'
 
 def initialize_google_sheets(
     sheet_name='reeltracker_cli',
-    credentials_file=CREDS
+    credentials_file=CREDS,
+    client=None
 ):
     """
     Initializes and returns a Google Sheets
+    Opened by the key remembered from a previous session if possible,
+    which avoids a Drive search by name
 
     Args:
         sheet_name (str): Name of the Google Sheet to open
         credentials_file (str): Path to credentials JSON file
+        client (gspread.Client, optional): client already authorized,
+            e.g. shared by the sessions of a server
 
     Returns:
         gspread.Spreadsheet: An authorized Google Sheets object
     """
+    from .worksheets import open_spreadsheet
+
+    if client is None:
+        client = authorize_client(credentials_file)
+    return open_spreadsheet(client, sheet_name)
+
+
+def authorize_client(credentials_file=CREDS):
+    """
+    Loads the service account and returns an authorized client
+
+    Args:
+        credentials_file (str): Path to credentials JSON file
+
+    Returns:
+        gspread.Client: authorized client
+    """
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     creds = Credentials.from_service_account_file(credentials_file)
     scoped_creds = creds.with_scopes(GOOGLE_SHEETS_SCOPE)
-    client = gspread.authorize(scoped_creds)
-    return client.open(sheet_name)
+    return gspread.authorize(scoped_creds)
+
+
+def initialize_google_sheets_in_background(
+    sheet_name='reeltracker_cli',
+    setup=None,
+    credentials_file=CREDS,
+    client=None
+):
+    """
+    Opens a Google Sheet on a daemon thread
+    The thread runs in a copy of the caller's context (e.g. its session)
+
+    Args:
+        sheet_name (str): Name of the Google Sheet to open
+        setup (callable, optional): setup(sheet), run on the same thread
+            once the sheet is open and before the future resolves
+        credentials_file (str): Path to credentials JSON file
+        client (gspread.Client, optional): client already authorized
+
+    Returns:
+        concurrent.futures.Future: resolves to the gspread.Spreadsheet,
+        or to the exception raised while opening it
+    """
+    future = Future()
+
+    def open_sheet():
+        try:
+            sheet = initialize_google_sheets(
+                sheet_name, credentials_file, client
+                )
+            if setup is not None:
+                setup(sheet)
+        except Exception as e:  # surfaced by future.result()
+            future.set_exception(e)
+        else:
+            future.set_result(sheet)
+
+    threading.Thread(
+        target=contextvars.copy_context().run, args=(open_sheet,), daemon=True
+        ).start()
+    return future
+
+
+def open_google_sheets(sheet_names, credentials_file=CREDS):
+    """
+    Authorizes once and opens several spreadsheets
+    Each entry is tried as a spreadsheet name, then as a key
+
+    Args:
+        sheet_names (list[str]): names or keys of the Google Sheets
+        credentials_file (str): Path to credentials JSON file
+
+    Returns:
+        list[gspread.Spreadsheet]: the spreadsheets that could be opened
+    """
+    import gspread
+    from .worksheets import open_spreadsheet
+
+    client = authorize_client(credentials_file)
+    sheets = []
+    for name in sheet_names:
+        try:
+            sheets.append(open_spreadsheet(client, name))
+        except gspread.exceptions.SpreadsheetNotFound:
+            try:
+                sheets.append(client.open_by_key(name))
+            except (
+                gspread.exceptions.SpreadsheetNotFound,
+                gspread.exceptions.APIError
+            ):
+                print(f"\n❌  Spreadsheet '{name}' not found.")
+    return sheets
@@ -0,0 +1,302 @@
+"""
+Streams the user's list to and from backup files.
+
+Rows are read from the worksheet in ranges of CHUNK_SIZE rows and
+decoded with the row codec of the live header row, then written as
+they arrive to CSV, JSONL or the binary snapshot format, so an export
+holds one chunk in memory whatever the size of the list. A restore
+reads any of these files row by row and appends them back to the
+worksheet in batches of CHUNK_SIZE rows, skipping titles already there.
+"""
+import csv
+import json
+import os
+from gspread.utils import rowcol_to_a1
+from storage.snapshot import SnapshotWriter, read_snapshot
+from tmdb.utils import get_genre_tables
+from ui.progress import uninterruptible
+from utils.quota import acquire_quota
+from .codec import get_row_codec
+from .crud import get_or_create_worksheet, get_worksheet_codec
+from .library import (
+    WORKSHEET_TITLE,
+    get_library_membership,
+    wait_for_library
+)
+from .worksheets import with_worksheet
+
+# Rows per range read and per append call
+CHUNK_SIZE = 500
+FORMATS = ('csv', 'jsonl', 'snap')
+
+
+def detect_format(path, file_format=None):
+    """
+    Format of a backup file, from its extension unless given
+
+    Args:
+        path (str): backup file
+        file_format (str, optional): 'csv', 'jsonl' or 'snap'
+
+    Returns:
+        str or None: the format, None if it can't be told
+    """
+    if file_format:
+        return file_format if file_format in FORMATS else None
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('json', 'ndjson'):
+        extension = 'jsonl'
+    return extension if extension in FORMATS else None
+
+
+def _matches(record, watched):
+    return watched is None or (
+        str(record.get('is_watched', '')).lower() == str(watched).lower()
+        )
+
+
+# --- Reading ---
+def _grid_row_count(sheet):
+    """
+    Rows in the worksheet grid, from fresh spreadsheet metadata
+    The handle's row count is remembered across sessions and misses
+    rows appended since
+    """
+    acquire_quota('sheets')
+    for entry in sheet.fetch_sheet_metadata().get('sheets', []):
+        properties = entry.get('properties', {})
+        if properties.get('title') == WORKSHEET_TITLE:
+            return properties.get('gridProperties', {}).get('rowCount', 0)
+    return 0
+
+
+def iter_sheet_records(sheet, watched=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream the rows of the list, one range read per chunk
+    Reads up to the last row of the grid: the API leaves out trailing
+    empty rows of a range, so a short or empty chunk isn't the end
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        watched (bool, optional): only yield rows with this watch status
+        chunk_size (int): rows per read
+
+    Yields:
+        tuple[RowCodec, dict]: codec of the header row, decoded row
+    """
+    get_or_create_worksheet(sheet, WORKSHEET_TITLE)
+    headers = with_worksheet(sheet, lambda handle: handle.row_values(1))
+    codec = get_row_codec(headers)
+    last_row = _grid_row_count(sheet)
+    start = 2
+    while start <= last_row:
+        end = min(start + chunk_size - 1, last_row)
+        cells = (
+            f'{rowcol_to_a1(start, 1)}:{rowcol_to_a1(end, codec.width)}'
+            )
+        rows = with_worksheet(sheet, lambda handle: handle.get(cells))
+        for row in rows:
+            if not any(row):
+                continue
+            record = codec.decode(row)
+            if _matches(record, watched):
+                yield codec, record
+        start = end + 1
+
+
+def iter_backup_records(path, file_format=None, watched=None):
+    """
+    Stream the rows of a backup file
+
+    Args:
+        path (str): CSV, JSONL or snapshot file
+        file_format (str, optional): format, from the extension if None
+        watched (bool, optional): only yield rows with this watch status
+
+    Yields:
+        dict: header -> cell value
+
+    Raises:
+        OSError: if the file can't be read
+        ValueError: if the format is unknown or the file is invalid
+    """
+    file_format = detect_format(path, file_format)
+    if file_format == 'csv':
+        with open(path, newline='', encoding='utf-8') as file:
+            for record in csv.DictReader(file):
+                if _matches(record, watched):
+                    yield record
+    elif file_format == 'jsonl':
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f'not a row object: {line[:40]}')
+                if _matches(record, watched):
+                    yield record
+    elif file_format == 'snap':
+        snapshot = read_snapshot(path)
+        if snapshot is None:
+            raise ValueError('not a valid library snapshot')
+        for index in range(snapshot.row_count):
+            record = {
+                header: column[index]
+                for header, column in zip(snapshot.headers, snapshot.columns)
+                }
+            if _matches(record, watched):
+                yield record
+    else:
+        raise ValueError(f"unknown backup format for '{path}'")
+
+
+# --- Export ---
+def _write_snapshot(records, path, sheet):
+    writer = None
+    try:
+        for codec, record in records:
+            if writer is None:
+                writer = SnapshotWriter(
+                    path, codec.headers, get_genre_tables(),
+                    {'sheet_id': sheet.id}
+                    )
+            writer.append(codec.encode_record(record))
+        if writer is None:
+            writer = SnapshotWriter(path, [])
+        writer.close()
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+    return writer.rows
+
+
+def _write_text(records, path, file_format):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        for codec, record in records:
+            if file_format == 'jsonl':
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                if not count:
+                    writer.writerow(codec.headers)
+                writer.writerow(codec.encode_record(record))
+            count += 1
+    return count
+
+
+def export_library(
+    sheet,
+    path,
+    file_format=None,
+    watched=None,
+    chunk_size=CHUNK_SIZE
+):
+    """
+    Export the list to a backup file, streaming it chunk by chunk
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        path (str): destination file
+        file_format (str, optional): 'csv', 'jsonl' or 'snap', from
+            the extension if None
+        watched (bool, optional): only export rows with this watch status
+        chunk_size (int): rows per range read
+
+    Returns:
+        int or None: rows exported, None if the export failed
+    """
+    file_format = detect_format(path, file_format)
+    if file_format is None:
+        print(f"\n❌  Can't tell the format of '{path}', use one of: "
+              f"{', '.join(FORMATS)}.")
+        return None
+    records = iter_sheet_records(sheet, watched, chunk_size)
+    # written next to the destination and moved in place when complete
+    tmp_path = f'{path}.tmp'
+    try:
+        if file_format == 'snap':
+            count = _write_snapshot(records, tmp_path, sheet)
+        else:
+            count = _write_text(records, tmp_path, file_format)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"\n❌  Could not write '{path}': {e}")
+        count = None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+# --- Restore ---
+def _append_chunk(sheet, library, rows):
+    with uninterruptible():
+        with_worksheet(sheet, lambda handle: handle.append_rows(rows))
+        if library is not None:
+            library.append_rows(rows)
+
+
+def restore_library(
+    sheet,
+    path,
+    file_format=None,
+    watched=None,
+    chunk_size=CHUNK_SIZE
+):
+    """
+    Append the rows of a backup file to the list, in batched writes
+    Rows of titles already in the list (or earlier in the file) are
+    skipped, so restoring the same file twice adds nothing
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        path (str): CSV, JSONL or snapshot file
+        file_format (str, optional): format, from the extension if None
+        watched (bool, optional): only restore rows with this watch status
+        chunk_size (int): rows per append call
+
+    Returns:
+        tuple[int, int] or None: rows written and rows skipped, None if
+        the file couldn't be read
+    """
+    file_format = detect_format(path, file_format)
+    if file_format is None:
+        print(f"\n❌  Can't tell the format of '{path}', use one of: "
+              f"{', '.join(FORMATS)}.")
+        return None
+    membership = get_library_membership(sheet)
+    library = wait_for_library(sheet)
+    worksheet = get_or_create_worksheet(sheet, WORKSHEET_TITLE)
+    codec = get_worksheet_codec(sheet, worksheet)
+    seen = set()
+    written = skipped = 0
+    chunk = []
+    try:
+        for record in iter_backup_records(path, file_format, watched):
+            key = (
+                str(record.get('media_type', '')), str(record.get('id', ''))
+                )
+            if key in seen or (
+                membership is not None and membership.contains(key[1], key[0])
+            ):
+                skipped += 1
+                continue
+            seen.add(key)
+            chunk.append(codec.encode_record(record))
+            if len(chunk) == chunk_size:
+                _append_chunk(sheet, library, chunk)
+                written += len(chunk)
+                chunk = []
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"\n❌  Could not read '{path}': {e}")
+        if not written and not chunk:
+            return None
+        print(f"⚠️  Restoring the {written + len(chunk)} rows read "
+              "before the error.")
+    if chunk:
+        _append_chunk(sheet, library, chunk)
+        written += len(chunk)
+    return written, skipped
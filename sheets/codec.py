@@ -0,0 +1,121 @@
+"""
+Encodes Title objects into worksheet rows following the live header row.
+
+The codec is compiled once per header layout, so reordered or extra
+columns in the sheet are handled, and many titles can be encoded
+into a single 2-D values payload for `append_rows` or `batch_update`.
+"""
+from functools import lru_cache
+from models.title import SHEET_HEADERS
+
+
+class RowCodec:
+    """
+    Column mapping between Title fields and a worksheet header row
+
+    Attributes:
+        headers (tuple[str]): header row the codec was compiled from
+        width (int): number of columns in an encoded row
+    """
+    def __init__(self, headers):
+        """
+        Args:
+            headers (Sequence[str]): live header row of the worksheet
+        """
+        self.headers = tuple(headers)
+        self.width = len(self.headers)
+        known = set(SHEET_HEADERS)
+        # (column index, field name) for every column the app writes
+        self._fields = [
+            (index, header) for index, header in enumerate(self.headers)
+            if header in known
+            ]
+
+    def is_known(self, col_index):
+        """
+        Check if a column is written by the app (not a user-added column)
+
+        Args:
+            col_index (int): 0-based column index
+
+        Returns:
+            bool
+        """
+        return 0 <= col_index < self.width and (
+            self.headers[col_index] in SHEET_HEADERS
+            )
+
+    def encode(self, title_obj, base_row=None):
+        """
+        Encode one Title as a row in header order
+
+        Args:
+            title_obj (Title): title to encode
+            base_row (list, optional): existing row whose values are kept
+                in columns the app doesn't manage
+
+        Returns:
+            list[str]: row values
+        """
+        row = list(base_row or [])
+        row = (row + [''] * self.width)[:self.width]
+        values = title_obj.to_sheet_dict()
+        for index, header in self._fields:
+            row[index] = values[header]
+        return row
+
+    def encode_many(self, title_objs):
+        """
+        Encode many Titles into a 2-D values payload
+
+        Args:
+            title_objs (Iterable[Title]): titles to encode
+
+        Returns:
+            list[list[str]]: one row per title
+        """
+        return [self.encode(title_obj) for title_obj in title_objs]
+
+    def encode_record(self, record):
+        """
+        Encode a decoded row, e.g. from another sheet's header layout
+
+        Args:
+            record (dict): header -> cell value
+
+        Returns:
+            list[str]: row values, '' for headers the record lacks
+        """
+        return [str(record.get(header, '')) for header in self.headers]
+
+    def decode(self, row):
+        """
+        Map a worksheet row back to header names
+
+        Args:
+            row (list[str]): row values
+
+        Returns:
+            dict: header -> cell value ('' for missing cells)
+        """
+        padded = (list(row) + [''] * self.width)[:self.width]
+        return dict(zip(self.headers, padded))
+
+
+@lru_cache(maxsize=8)
+def _compile(headers):
+    return RowCodec(headers)
+
+
+def get_row_codec(headers):
+    """
+    Return a (cached) codec for a header row
+    Falls back to SHEET_HEADERS for a worksheet without headers
+
+    Args:
+        headers (Sequence[str]): live header row
+
+    Returns:
+        RowCodec
+    """
+    return _compile(tuple(headers) if headers else tuple(SHEET_HEADERS))
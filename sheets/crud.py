@@ -4,14 +4,29 @@ Provides functions for saving, updating, and deleting rows in a Google Sheet.
 Handles low-level data manipulation for title objects in the user's list.
 """
 import gspread
-from gspread.exceptions import WorksheetNotFound
+from gspread.exceptions import APIError, WorksheetNotFound
+from models.title import SHEET_HEADERS
+from ui.progress import uninterruptible
 from ui.user_input import confirm_action
 from .query import find_existing_row_info
+from .library import (
+    get_library,
+    wait_for_library,
+    forget_library,
+    reload_library
+    )
+from .codec import get_row_codec
+from .worksheets import (
+    get_worksheet,
+    is_stale_handle,
+    remember_worksheet,
+    with_worksheet
+    )
 
 
 def get_or_create_worksheet(sheet, title='My_List'):
     """
-    Safely retrieve the worksheet
+    Safely retrieve the worksheet, from the session's handle if known
     If missing, create it and optionally set headers
 
     Args:
@@ -22,19 +37,17 @@ def get_or_create_worksheet(sheet, title='My_List'):
     Returns:
         gspread.Worksheet or None
     """
-    headers = [
-            "id", "title", "media_type", "release_date",
-            "genre_ids", "genres", "weighted_popularity", "overview",
-            "is_watched", "added_date", "watched_date", "rating"
-        ]
+    headers = SHEET_HEADERS
 
     try:
-        return sheet.worksheet(title)
+        return get_worksheet(sheet, title)
     except WorksheetNotFound:
         print(f"\n⚠️  Worksheet '{title}' not found. Creating a new one...")
         worksheet = sheet.add_worksheet(title=title, rows='100', cols='20')
         if headers:
             worksheet.append_row(headers)
+        remember_worksheet(sheet, worksheet)
+        forget_library(sheet)  # reloaded with the new headers on next read
         return worksheet
 
 
@@ -51,11 +64,93 @@ def save_item_to_list(sheet, title_obj):
         print("\n❌  Action cancelled.")
         return
 
+    library = wait_for_library(sheet)
     worksheet = get_or_create_worksheet(sheet, 'My_List')
-    worksheet.append_row(title_obj.to_sheet_row())
+    codec = get_worksheet_codec(sheet, worksheet)
+    row = codec.encode(title_obj)
+    with uninterruptible():
+        with_worksheet(sheet, lambda handle: handle.append_row(row))
+        if library is not None:
+            library.append_row(row)
     print(f"\n✅  '{title_obj.metadata.title}' successfully saved.")
 
 
+def save_items_to_list(sheet, title_objs):
+    """
+    Saves many items to worksheet with a single append call
+    No confirmation is asked, callers confirm the whole batch
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        title_objs (list[Title]): Title objects to save
+
+    Returns:
+        int: number of rows written
+    """
+    if not title_objs:
+        return 0
+    library = wait_for_library(sheet)
+    worksheet = get_or_create_worksheet(sheet, 'My_List')
+    rows = get_worksheet_codec(sheet, worksheet).encode_many(title_objs)
+    with uninterruptible():
+        with_worksheet(sheet, lambda handle: handle.append_rows(rows))
+        if library is not None:
+            library.append_rows(rows)
+    return len(rows)
+
+
+def get_worksheet_codec(sheet, worksheet):
+    """
+    Row codec for the live header row of the worksheet
+    Uses the library's header map, only reading row 1 if there's none
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        worksheet (gspread.Worksheet): My_List worksheet
+
+    Returns:
+        RowCodec
+    """
+    library = get_library(sheet)
+    if library is not None and library.headers:
+        return get_row_codec(library.headers)
+    return get_row_codec(worksheet.row_values(1))
+
+
+def _write_title_row(sheet, title_obj, write):
+    """
+    Find the title's row and run a write addressed by its index
+    If the worksheet handle was stale (renamed or recreated elsewhere),
+    the index may hold another title on the new worksheet: the library
+    is reloaded, the row found again by (media_type, id) and the write
+    rebuilt from it, once
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        title_obj (Title): title whose row is written
+        write (callable): write(row_index, existing_row, library), which
+            must call with_worksheet(..., retry=False)
+
+    Returns:
+        tuple[bool, any]: whether the title was found, the write's result
+    """
+    wait_for_library(sheet)
+    for attempt in range(2):
+        found, row_index, existing_row = find_existing_row_info(
+            title_obj, sheet
+            )
+        if not found:
+            return False, None
+        library = get_library(sheet)
+        try:
+            return True, write(row_index, existing_row, library)
+        except APIError as e:
+            if attempt or not is_stale_handle(e):
+                raise
+            reload_library(sheet)
+    return False, None
+
+
 def delete_item_in_list(sheet, title_obj):
     """
     Finds existing row and delete it from sheet
@@ -71,7 +166,7 @@ def delete_item_in_list(sheet, title_obj):
         print("\n❌  Deletion cancelled.")
         return False
     try:
-        worksheet = sheet.worksheet('My_List')
+        get_worksheet(sheet, 'My_List')
     except WorksheetNotFound:
         print(
             "\n❌  Could not access your sheet. "
@@ -79,10 +174,18 @@ def delete_item_in_list(sheet, title_obj):
             )
         return False
 
-    found, row_index, _ = find_existing_row_info(title_obj, sheet)
+    def delete(row_index, _, library):
+        with uninterruptible():
+            with_worksheet(
+                sheet, lambda handle: handle.delete_rows(row_index),
+                retry=False
+                )
+            if library is not None:
+                library.delete_row(row_index - 2)
+        return True
 
+    found, _ = _write_title_row(sheet, title_obj, delete)
     if found:
-        worksheet.delete_rows(row_index)
         return True
     print("\n⚠️  Item not found. Nothing was deleted.")
     return False
@@ -91,7 +194,7 @@ def delete_item_in_list(sheet, title_obj):
 def update_item_in_list(sheet, title_obj):
     """
     Finds title in Google Sheet
-    and replace cells with updated values
+    and replace changed cells with a single batch update
 
     Args:
         sheet (gspread.Spreadsheet): Initialized Google Sheet
@@ -107,33 +210,44 @@ def update_item_in_list(sheet, title_obj):
         print("\n❌  Could not access your sheet.")
         return 'skipped'
 
-    found, row_index, existing_row = find_existing_row_info(title_obj, sheet)
-    new_row = title_obj.to_sheet_row()
-    headers = worksheet.row_values(1)
     timestamp_fields = ["added_date"]
 
-    if found:
-        existing_row = existing_row + [""] * (len(new_row) - len(existing_row))
+    def update(row_index, existing_row, library):
+        # the header row of a reloaded worksheet may differ
+        codec = get_worksheet_codec(sheet, worksheet)
+        existing_row = (list(existing_row) + [""] * codec.width)[:codec.width]
+        new_row = codec.encode(title_obj, existing_row)
+        merged_row = list(existing_row)
         updates = []
-        for col_index, header in enumerate(headers):
-            if header in timestamp_fields:
+        for col_index, header in enumerate(codec.headers):
+            if header in timestamp_fields or not codec.is_known(col_index):
                 continue
             old_value = existing_row[col_index]
             new_value = new_row[col_index]
             if old_value != new_value:
                 cell = gspread.utils.rowcol_to_a1(row_index, col_index + 1)
-                updates.append((cell, new_value))
+                updates.append({'range': cell, 'values': [[new_value]]})
+                merged_row[col_index] = new_value
         if not updates:
             print(f"\n❌  No updates found for '{title_obj.metadata.title}'.")
             return 'skipped'
 
         print(f"\n🔄  Updating '{title_obj.metadata.title}'...")
-        for cell, value in updates:
-            worksheet.update(cell, [[value]])
+        with uninterruptible():
+            with_worksheet(
+                sheet, lambda handle: handle.batch_update(updates),
+                retry=False
+                )
+            if library is not None:
+                library.update_row(row_index - 2, merged_row)
 
         print(f"\n✅  '{title_obj.metadata.title}' updated successfully.")
         return 'updated'
 
+    found, result = _write_title_row(sheet, title_obj, update)
+    if found:
+        return result
+
     # If not found, just add it
     save_item_to_list(sheet, title_obj)
     return 'added'
@@ -0,0 +1,455 @@
+"""
+Bulk import of titles from CSV files, e.g. watch-history exports.
+
+Rows are read with flexible column names (a generic title/year/type/
+rating file, or the Letterboxd, IMDb and Netflix exports), matched to
+TMDb concurrently through the cached search endpoint, and scored by how
+well the name and year agree. Confident matches are written with one
+batched append; ambiguous ones are listed for review and only imported
+on request. Rows whose search failed (network error or rate limit) are
+listed apart from the titles TMDb doesn't know, to be retried by
+running the import again.
+"""
+import contextvars
+import csv
+import difflib
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+from tmdb.tmdb_api import TMDB_API_KEY, search_titles
+from models.title import Title
+from models.title_search import normalize
+from utils.utils import calculate_weighted_popularity, extract_year
+from ui.progress import run_task
+from ui.user_input import confirm_action
+from .library import get_library_membership
+from .crud import save_items_to_list
+
+# Concurrent TMDb searches
+MAX_WORKERS = 8
+# Matches scoring at least this are imported without review
+ACCEPT_SCORE = 0.85
+# Matches scoring below this are reported as not found
+MIN_SCORE = 0.5
+# A runner-up this close to the best match makes the row ambiguous
+AMBIGUITY_MARGIN = 0.05
+
+# Accepted column names (lowercase) for each field
+COLUMNS = {
+    'title': ('title', 'name', 'original title', 'film', 'movie'),
+    'year': ('year', 'release year', 'release_year', 'release date'),
+    'media_type': ('media_type', 'media type', 'type', 'title type'),
+    'rating': ('rating', 'your rating', 'my rating', 'stars'),
+    'watched_date': (
+        'watched date', 'watched_date', 'date watched', 'date rated',
+        'date'
+        ),
+    'watched': ('watched', 'is_watched', 'status'),
+}
+# IMDb 'Title Type' values and other spellings -> media type
+MEDIA_TYPES = {
+    'movie': 'movie', 'film': 'movie', 'tvmovie': 'movie',
+    'tv movie': 'movie', 'video': 'movie',
+    'tv': 'tv', 'tvseries': 'tv', 'tv series': 'tv', 'series': 'tv',
+    'tvminiseries': 'tv', 'tv mini series': 'tv', 'show': 'tv',
+}
+DATE_FORMATS = (
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S',
+    '%m/%d/%y', '%m/%d/%Y', '%d.%m.%Y',
+)
+# Netflix history titles like 'Show: Season 1: Episode'
+_EPISODE_SUFFIX = re.compile(r':\s*(season|series|part|chapter)\b.*$', re.I)
+
+ImportRow = namedtuple(
+    'ImportRow',
+    ['line', 'title', 'year', 'media_type', 'watched', 'rating',
+     'watched_date']
+    )
+ImportMatch = namedtuple(
+    'ImportMatch',
+    ['row', 'result', 'media_type', 'score', 'runner_up', 'error'],
+    defaults=(None,)
+    )
+
+
+# --- Reading ---
+def _year(date):
+    """
+    Year of a date or year string, or None if there's none
+    """
+    year = extract_year(date)
+    return None if year == 'Unknown' else year
+
+
+def _find_columns(headers):
+    """
+    Map each field to the index of its column, if present
+    """
+    lowered = [header.strip().lower() for header in headers]
+    columns = {}
+    for field, names in COLUMNS.items():
+        for name in names:
+            if name in lowered:
+                columns[field] = lowered.index(name)
+                break
+    return columns
+
+
+def _parse_rating(value, scale):
+    """
+    Rating on the sheet's 1-5 scale, or 'N/A'
+    """
+    try:
+        rating = float(value)
+    except (TypeError, ValueError):
+        return 'N/A'
+    if rating <= 0:
+        return 'N/A'
+    if scale > 5:
+        rating /= 2
+    return min(5, max(1, round(rating + 0.01)))
+
+
+def _parse_date(value):
+    """
+    Timestamp in the sheet's format, or '' if unreadable
+    """
+    value = (value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    return ''
+
+
+def read_import_rows(path, watched=None):
+    """
+    Read the titles of a CSV file
+
+    Args:
+        path (str): CSV file with a header row
+        watched (bool, optional): import every row as watched (True) or
+            as watchlist (False); if None, rows with a rating, a watched
+            date or a truthy watched column are watched
+
+    Returns:
+        list[ImportRow]: one entry per row with a title
+
+    Raises:
+        OSError: if the file can't be read
+        ValueError: if no title column is found
+    """
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        reader = csv.reader(file)
+        headers = next(reader, [])
+        columns = _find_columns(headers)
+        if 'title' not in columns:
+            raise ValueError(
+                f"no title column in {path} (expected one of: "
+                f"{', '.join(COLUMNS['title'])})"
+                )
+        rows = list(reader)
+
+    def cell(row, field):
+        index = columns.get(field)
+        return row[index].strip() if index is not None and (
+            index < len(row)) else ''
+
+    # IMDb ratings go up to 10
+    ratings = [cell(row, 'rating') for row in rows]
+    scale = max(
+        (float(value) for value in ratings
+         if value.replace('.', '', 1).isdigit()),
+        default=5
+        )
+    import_rows = []
+    for line, row in enumerate(rows, start=2):
+        title = _EPISODE_SUFFIX.sub('', cell(row, 'title')).strip()
+        if not title:
+            continue
+        rating = _parse_rating(cell(row, 'rating'), scale)
+        watched_date = _parse_date(cell(row, 'watched_date'))
+        is_watched = watched
+        if is_watched is None:
+            is_watched = (
+                rating != 'N/A' or bool(watched_date)
+                or cell(row, 'watched').lower() in ('true', 'yes', 'watched')
+                )
+        import_rows.append(ImportRow(
+            line=line,
+            title=title,
+            year=_year(cell(row, 'year')),
+            media_type=MEDIA_TYPES.get(cell(row, 'media_type').lower()),
+            watched=is_watched,
+            rating=rating if is_watched else 'N/A',
+            watched_date=watched_date,
+            ))
+    return import_rows
+
+
+# --- Matching ---
+def score_result(row, result, media_type):
+    """
+    How well a TMDb result matches an imported row, from 0 to 1
+
+    The name similarity (of the normalized names, the best of the
+    localized and original name) is lowered when the year is off or
+    missing, or when the row's media type differs.
+
+    Args:
+        row (ImportRow): imported row
+        result (dict): TMDb search result
+        media_type (str): the result's media type
+
+    Returns:
+        float: match score
+    """
+    wanted = normalize(row.title)
+    names = {
+        result.get('title') or result.get('name') or '',
+        result.get('original_title') or result.get('original_name') or '',
+        }
+    similarity = max(
+        difflib.SequenceMatcher(None, wanted, normalize(name)).ratio()
+        for name in names
+        )
+    year = _year(
+        result.get('release_date') or result.get('first_air_date')
+        )
+    if row.year and year:
+        gap = abs(int(row.year) - int(year))
+        similarity *= 1.0 if gap == 0 else 0.9 if gap == 1 else 0.6
+    elif row.year:
+        similarity *= 0.85
+    if row.media_type and row.media_type != media_type:
+        similarity *= 0.5
+    return similarity
+
+
+def match_row(row):
+    """
+    Search TMDb for an imported row and score the results
+
+    Args:
+        row (ImportRow): imported row
+
+    Returns:
+        ImportMatch: best result (None if nothing scored MIN_SCORE),
+        its score and the runner-up's score; error holds the reason if
+        the search failed
+    """
+    try:
+        results = search_titles(row.title, TMDB_API_KEY)
+    except requests.RequestException as e:
+        return ImportMatch(row, None, None, 0, 0, str(e) or type(e).__name__)
+    scored = sorted((
+        (score_result(row, result, result.get('media_type')), index)
+        for index, result in enumerate(results)
+        if result.get('media_type') in ('movie', 'tv')
+        ), reverse=True)
+    if not scored or scored[0][0] < MIN_SCORE:
+        return ImportMatch(row, None, None, scored[0][0] if scored else 0, 0)
+    score, index = scored[0]
+    result = results[index]
+    runner_up = next((
+        other_score for other_score, other in scored[1:]
+        if results[other].get('id') != result.get('id')
+        ), 0)
+    return ImportMatch(row, result, result['media_type'], score, runner_up)
+
+
+def match_rows(rows, max_workers=MAX_WORKERS):
+    """
+    Match imported rows to TMDb concurrently
+    Every search runs in a copy of the caller's context (quota tenant)
+
+    Args:
+        rows (list[ImportRow]): imported rows
+        max_workers (int): concurrent searches
+
+    Returns:
+        list[ImportMatch]: aligned with rows
+    """
+    if not rows:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(rows))
+    ) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, match_row, row)
+            for row in rows
+            ]
+        return [future.result() for future in futures]
+
+
+def is_ambiguous(match):
+    """
+    Args:
+        match (ImportMatch): scored match
+
+    Returns:
+        bool: True if the match needs review before importing
+    """
+    return match.result is not None and (
+        match.score < ACCEPT_SCORE
+        or match.score - match.runner_up < AMBIGUITY_MARGIN
+        )
+
+
+def build_import_title(match):
+    """
+    Title of a match, with the imported watch status, date and rating
+
+    Args:
+        match (ImportMatch): match with a result
+
+    Returns:
+        Title
+    """
+    title = Title(
+        match.result,
+        calculate_weighted_popularity(match.result),
+        match.media_type
+        )
+    row = match.row
+    if row.watched:
+        title.user_data.watched = True
+        title.user_data.watched_date = (
+            row.watched_date or title.user_data.added_date
+            )
+        title.user_data.rating = row.rating
+    return title
+
+
+# --- Import ---
+def plan_import(matches, membership=None, include_ambiguous=False):
+    """
+    Sort matches into what will be imported and what won't
+
+    Args:
+        matches (list[ImportMatch]): match_rows() result
+        membership (LibraryMembership, optional): titles already saved
+        include_ambiguous (bool): import ambiguous matches too
+
+    Returns:
+        dict: 'accepted', 'ambiguous', 'not_found', 'errors' (rows whose
+        search failed) and 'duplicates' (matches already in the list or
+        earlier in the file)
+    """
+    plan = {'accepted': [], 'ambiguous': [], 'not_found': [],
+            'errors': [], 'duplicates': []}
+    seen = set()
+    for match in matches:
+        if match.error is not None:
+            plan['errors'].append(match)
+            continue
+        if match.result is None:
+            plan['not_found'].append(match)
+            continue
+        key = (match.media_type, str(match.result.get('id')))
+        if key in seen or (
+            membership is not None and membership.contains(key[1], key[0])
+        ):
+            plan['duplicates'].append(match)
+            continue
+        if is_ambiguous(match):
+            plan['ambiguous'].append(match)
+            if not include_ambiguous:
+                continue
+        seen.add(key)
+        plan['accepted'].append(match)
+    return plan
+
+
+def _describe(match):
+    result = match.result or {}
+    name = result.get('title') or result.get('name') or '?'
+    year = _year(result.get('release_date') or result.get('first_air_date'))
+    row = match.row
+    wanted = f"{row.title} ({row.year})" if row.year else row.title
+    return (f"  line {row.line}: '{wanted}' -> '{name}' ({year or '?'}, "
+            f"{match.media_type}) score {match.score:.2f}, next best "
+            f"{match.runner_up:.2f}")
+
+
+def print_import_summary(plan, include_ambiguous=False):
+    """
+    Print what an import will do, listing the ambiguous matches
+
+    Args:
+        plan (dict): plan_import() result
+        include_ambiguous (bool): ambiguous matches are imported
+    """
+    print(f"\n✅  {len(plan['accepted'])} titles ready to import.")
+    if plan['duplicates']:
+        print(f"ℹ️  {len(plan['duplicates'])} already in your list "
+              "(or repeated in the file), skipped.")
+    if plan['ambiguous']:
+        verb = 'included' if include_ambiguous else (
+            'skipped, use --include-ambiguous to import them'
+            )
+        print(f"\n⚠️  {len(plan['ambiguous'])} ambiguous matches, {verb}:")
+        for match in plan['ambiguous']:
+            print(_describe(match))
+    if plan['not_found']:
+        print(f"\n❌  {len(plan['not_found'])} rows not found on TMDb:")
+        for match in plan['not_found']:
+            print(f"  line {match.row.line}: '{match.row.title}'")
+    if plan['errors']:
+        print(f"\n⚠️  {len(plan['errors'])} rows couldn't be looked up on "
+              "TMDb, run the import again to retry them:")
+        for match in plan['errors']:
+            print(f"  line {match.row.line}: '{match.row.title}' "
+                  f"({match.error})")
+
+
+def import_titles(
+    google_sheet,
+    path,
+    watched=None,
+    include_ambiguous=False,
+    assume_yes=False,
+    max_workers=MAX_WORKERS
+):
+    """
+    Import the titles of a CSV file into the user's list
+
+    Args:
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+        path (str): CSV file
+        watched (bool, optional): see read_import_rows()
+        include_ambiguous (bool): import ambiguous matches too
+        assume_yes (bool): don't ask for confirmation
+        max_workers (int): concurrent TMDb searches
+
+    Returns:
+        int: number of titles written
+    """
+    try:
+        rows = read_import_rows(path, watched)
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"\n❌  Could not read '{path}': {e}")
+        return 0
+    if not rows:
+        print(f"\n⚠️  No titles found in '{path}'.")
+        return 0
+    matches = run_task(
+        f'Matching {len(rows)} titles on TMDb', match_rows, rows, max_workers
+        )
+    plan = plan_import(
+        matches, get_library_membership(google_sheet), include_ambiguous
+        )
+    print_import_summary(plan, include_ambiguous)
+    if not plan['accepted']:
+        return 0
+    if not assume_yes and not confirm_action(
+        f"\nImport {len(plan['accepted'])} titles? (y/n): "
+    ):
+        print("\n❌  Import cancelled.")
+        return 0
+    titles = [build_import_title(match) for match in plan['accepted']]
+    return save_items_to_list(google_sheet, titles)
@@ -0,0 +1,782 @@
+"""
+Keeps a local, in-memory copy of the user's list.
+
+The library is loaded from the binary snapshot when one exists, so the
+first action doesn't wait for a full Sheets download, and it is
+revalidated against the worksheet in the background. Reads are served
+from the library; writes go to the worksheet and are mirrored locally.
+"""
+import contextvars
+import hashlib
+import json
+import threading
+import requests
+import gspread
+from gspread.utils import numericise_all, to_records
+from storage.paths import cache_path
+from storage.snapshot import PROFILE, read_snapshot, write_snapshot
+from tmdb.utils import get_genre_tables, set_genre_tables
+from models.taste_profile import TasteProfile
+from models.membership import LibraryMembership
+from models.title_search import TitleSearchIndex
+from utils.tracing import trace_span, traced
+from .worksheets import with_worksheet
+
+WORKSHEET_TITLE = 'My_List'
+
+# Libraries by spreadsheet id
+_libraries = {}
+
+
+class Library:
+    """
+    Column-oriented copy of the My_List worksheet
+
+    Attributes:
+        headers (list[str]): header row
+        header_map (dict): header name to column index
+        revision (int): incremented on every local change
+        ready (threading.Event): set once the library matches the sheet
+        lock (threading.RLock): guards reads and writes across threads
+        profile (TasteProfile or None): kept in step with every write
+            once built (see get_profile)
+    """
+    def __init__(self, headers, columns):
+        """
+        Args:
+            headers (list[str]): header row
+            columns (list[Sequence[str]]): one sequence of cells per header
+        """
+        self.lock = threading.RLock()
+        self.ready = threading.Event()
+        self.ready.set()
+        self.revision = 0
+        self.profile = None
+        # (revision, digest) of the last content_hash() call
+        self._hash = None
+        # name -> callback(record, added), see listen()
+        self._listeners = {}
+        self._set_contents(headers, columns)
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Build a library from worksheet values (header row first)
+
+        Args:
+            values (list[list[str]]): result of worksheet.get_all_values()
+
+        Returns:
+            Library: populated library
+        """
+        headers, columns = _values_to_columns(values)
+        return cls(headers, columns)
+
+    def _set_contents(self, headers, columns):
+        """
+        Replace headers and columns and reset derived indexes
+        """
+        self.headers = list(headers)
+        self.header_map = {
+            header: index for index, header in enumerate(self.headers)
+            }
+        self._columns = list(columns)
+        self._materialized = all(
+            isinstance(column, list) for column in self._columns
+            )
+        self._keys = None
+        self._membership = None
+        self._search_index = None
+        # writes made during each search index build in progress
+        self._search_pending = []
+
+    def __len__(self):
+        return len(self._columns[0]) if self._columns else 0
+
+    # --- Reads ---
+    def row(self, index):
+        """
+        Args:
+            index (int): 0-based data row index
+
+        Returns:
+            list[str]: cell values of the row
+        """
+        with self.lock:
+            return [column[index] for column in self._columns]
+
+    def rows(self):
+        """
+        Returns:
+            list[list[str]]: all data rows
+        """
+        with self.lock:
+            return [list(row) for row in zip(*self._columns)]
+
+    def values(self):
+        """
+        Returns:
+            list[list[str]]: header row followed by data rows,
+            the same shape as worksheet.get_all_values()
+        """
+        with self.lock:
+            return [list(self.headers)] + self.rows() if self.headers else []
+
+    def columns(self):
+        """
+        Returns:
+            list[list[str]]: a copy of every column
+        """
+        with self.lock:
+            return [list(column) for column in self._columns]
+
+    def column(self, header):
+        """
+        Args:
+            header (str): header name
+
+        Returns:
+            Sequence[str] or None: cells in that column
+        """
+        index = self.header_map.get(header)
+        return None if index is None else self._columns[index]
+
+    def records(self, watched=None):
+        """
+        Rows as dictionaries, numericised like worksheet.get_all_records()
+
+        Args:
+            watched (bool, optional): only keep rows with this watch status
+
+        Returns:
+            list[dict]: one dictionary per row
+        """
+        with self.lock:
+            return self.records_at(self.row_indexes(watched))
+
+    def row_indexes(self, watched=None):
+        """
+        Indexes of the rows with a watch status, from one column scan
+
+        Args:
+            watched (bool, optional): watch status, all rows if None
+
+        Returns:
+            list[int]: 0-based data row indexes, in sheet order
+        """
+        with self.lock:
+            if watched is None:
+                return list(range(len(self)))
+            watched_column = self.column('is_watched') or []
+            wanted = str(watched).lower()
+            return [
+                i for i, value in enumerate(watched_column)
+                if value.lower() == wanted
+                ]
+
+    def records_at(self, indexes):
+        """
+        Some rows as dictionaries, see records()
+
+        Args:
+            indexes (Iterable[int]): 0-based data row indexes
+
+        Returns:
+            list[dict]: one dictionary per index
+        """
+        with self.lock:
+            rows = [numericise_all(self.row(i)) for i in indexes]
+        return to_records(self.headers, rows)
+
+    def record(self, row):
+        """
+        Args:
+            row (list[str]): cell values in header order
+
+        Returns:
+            dict: raw (string) cell values keyed by header
+        """
+        return dict(zip(self.headers, row))
+
+    def content_hash(self):
+        """
+        Digest of the headers and every cell, stable across sessions
+        Recomputed only when the revision changed since the last call
+
+        Returns:
+            str: hex digest
+        """
+        with self.lock:
+            if self._hash is None or self._hash[0] != self.revision:
+                digest = hashlib.blake2b(digest_size=16)
+                digest.update('\x1f'.join(self.headers).encode())
+                for row in zip(*self._columns):
+                    digest.update(b'\x1e')
+                    digest.update('\x1f'.join(row).encode())
+                self._hash = (self.revision, digest.hexdigest())
+            return self._hash[1]
+
+    def get_profile(self):
+        """
+        Return the taste profile, building it on first use
+        Later writes update it incrementally
+
+        Returns:
+            TasteProfile
+        """
+        with self.lock:
+            if self.profile is None:
+                self.profile = TasteProfile.from_records(
+                    self.record(row) for row in zip(*self._columns)
+                    )
+            return self.profile
+
+    def find(self, title_id, media_type):
+        """
+        Locate a title by id and media_type
+
+        Args:
+            title_id (int | str): TMDb id
+            media_type (str): 'movie' or 'tv'
+
+        Returns:
+            int or None: 0-based data row index
+        """
+        with self.lock:
+            return self._key_index().get((str(title_id), media_type))
+
+    def contains(self, title_id, media_type):
+        """
+        Args:
+            title_id (int | str): TMDb id
+            media_type (str): 'movie' or 'tv'
+
+        Returns:
+            bool: True if the title is already in the list
+        """
+        return self.membership().contains(title_id, media_type)
+
+    def membership(self):
+        """
+        Return the membership filter, building it on first use
+        Later writes update it incrementally
+
+        Returns:
+            LibraryMembership
+        """
+        with self.lock:
+            if self._membership is None:
+                self._membership = LibraryMembership(zip(
+                    self.column('media_type') or [],
+                    self.column('id') or []
+                    ))
+            return self._membership
+
+    def search_index(self):
+        """
+        Return the title search index, building it on first use
+        It's built outside the library lock from a copy of the titles,
+        so other reads and writes go on meanwhile; writes made during
+        the build are replayed on it before it's swapped in. Later
+        writes update it incrementally
+
+        Returns:
+            TitleSearchIndex
+        """
+        while True:
+            with self.lock:
+                if self._search_index is not None:
+                    return self._search_index
+                entries = list(zip(
+                    self.column('media_type') or [],
+                    self.column('id') or [],
+                    self.column('title') or []
+                    ))
+                pending = []
+                self._search_pending.append(pending)
+            index = TitleSearchIndex(entries)
+            with self.lock:
+                if not any(log is pending for log in self._search_pending):
+                    continue  # the contents were replaced meanwhile
+                self._search_pending = [
+                    log for log in self._search_pending if log is not pending
+                    ]
+                if self._search_index is None:
+                    for title_id, media_type, title, added in pending:
+                        if added:
+                            index.add(title_id, media_type, title)
+                        else:
+                            index.remove(title_id, media_type)
+                    self._search_index = index
+                return self._search_index
+
+    def search(self, query, limit=10):
+        """
+        Fuzzy find titles by name, see TitleSearchIndex.search
+
+        Args:
+            query (str): text typed by the user
+            limit (int): maximum number of matches
+
+        Returns:
+            list[int]: 0-based data row indexes, best match first
+        """
+        index = self.search_index()
+        with self.lock:
+            matches = index.search(query, limit)
+            rows = (self.find(title_id, media_type)
+                    for (media_type, title_id), _ in matches)
+            return [row for row in rows if row is not None]
+
+    def listen(self, name, callback):
+        """
+        Feed an index kept outside the library with every write
+        callback(record, added) is called, under the library lock, for
+        every row added or removed (an edit is a removal and an
+        addition), and callback(None, False) once the whole contents
+        were replaced. A later callback with the same name replaces it.
+
+        Args:
+            name (str): name of the listener
+            callback (callable): callback(record, added)
+        """
+        with self.lock:
+            self._listeners[name] = callback
+
+    def _track_membership(self, row, added):
+        """
+        Mirror a row added or removed into the membership filter,
+        the search index (or the builds in progress) and the listeners
+        """
+        if self._membership is None and self._search_index is None and (
+            not self._listeners and not self._search_pending
+        ):
+            return
+        record = self.record(row)
+        for callback in list(self._listeners.values()):
+            callback(record, added)
+        title_id, media_type = record.get('id'), record.get('media_type')
+        if self._membership is not None:
+            if added:
+                self._membership.add(title_id, media_type)
+            else:
+                self._membership.remove(title_id, media_type)
+        if self._search_index is not None:
+            if added:
+                self._search_index.add(
+                    title_id, media_type, record.get('title', '')
+                    )
+            else:
+                self._search_index.remove(title_id, media_type)
+        for pending in self._search_pending:
+            pending.append(
+                (title_id, media_type, record.get('title', ''), added)
+                )
+
+    def _key_index(self):
+        """
+        Build (id, media_type) -> row index on demand
+        """
+        if self._keys is None:
+            ids = self.column('id') or []
+            media_types = self.column('media_type') or []
+            self._keys = {}
+            for index, key in enumerate(zip(ids, media_types)):
+                self._keys.setdefault(key, index)
+        return self._keys
+
+    # --- Writes ---
+    def _materialize(self):
+        """
+        Copy snapshot-backed columns into lists before mutating them
+        """
+        if not self._materialized:
+            self._columns = [list(column) for column in self._columns]
+            self._materialized = True
+
+    def _normalize(self, row):
+        """
+        Pad/trim a row to the header width, as strings
+        """
+        cells = ['' if value is None else str(value) for value in row]
+        width = len(self.headers)
+        return (cells + [''] * width)[:width]
+
+    def append_row(self, row):
+        """
+        Args:
+            row (list): cell values in header order
+        """
+        with self.lock:
+            self._materialize()
+            row = self._normalize(row)
+            for column, value in zip(self._columns, row):
+                column.append(value)
+            if self.profile is not None:
+                self.profile.add(self.record(row))
+            self._track_membership(row, True)
+            self._keys = None
+            self.revision += 1
+
+    def append_rows(self, rows):
+        """
+        Args:
+            rows (list[list]): rows of cell values in header order
+        """
+        with self.lock:
+            self._materialize()
+            for row in rows:
+                row = self._normalize(row)
+                for column, value in zip(self._columns, row):
+                    column.append(value)
+                if self.profile is not None:
+                    self.profile.add(self.record(row))
+                self._track_membership(row, True)
+            self._keys = None
+            self.revision += 1
+
+    def update_row(self, index, row):
+        """
+        Args:
+            index (int): 0-based data row index
+            row (list): cell values in header order
+        """
+        with self.lock:
+            self._materialize()
+            old_row = self.row(index)
+            row = self._normalize(row)
+            for column, value in zip(self._columns, row):
+                column[index] = value
+            if self.profile is not None:
+                self.profile.replace(self.record(old_row), self.record(row))
+            self._track_membership(old_row, False)
+            self._track_membership(row, True)
+            self._keys = None
+            self.revision += 1
+
+    def delete_row(self, index):
+        """
+        Args:
+            index (int): 0-based data row index
+        """
+        with self.lock:
+            self._materialize()
+            if self.profile is not None:
+                self.profile.remove(self.record(self.row(index)))
+            self._track_membership(self.row(index), False)
+            for column in self._columns:
+                del column[index]
+            self._keys = None
+            self.revision += 1
+
+    def replace(self, values):
+        """
+        Replace the whole contents with fresh worksheet values
+
+        Args:
+            values (list[list[str]]): result of worksheet.get_all_values()
+        """
+        with self.lock:
+            self._set_contents(*_values_to_columns(values))
+            self.profile = None  # rebuilt from the new rows on next use
+            self.revision += 1
+            for callback in list(self._listeners.values()):
+                callback(None, False)
+
+
+def _values_to_columns(values):
+    """
+    Transpose worksheet values into (headers, columns)
+    """
+    if not values or not values[0]:
+        return [], []
+    headers = values[0]
+    width = len(headers)
+    columns = [[] for _ in headers]
+    for row in values[1:]:
+        padded = (list(row) + [''] * width)[:width]
+        for column, value in zip(columns, padded):
+            column.append(value)
+    return headers, columns
+
+
+def _get_all_values(worksheet):
+    return worksheet.get_all_values()
+
+
+# --- Registry ---
+def get_cached_library(sheet):
+    """
+    Return the library registered for a spreadsheet, without loading it
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        Library or None
+    """
+    return _libraries.get(sheet.id)
+
+
+def register_library(sheet, library):
+    """
+    Register an already loaded library for a spreadsheet
+
+    Args:
+        sheet (gspread.Spreadsheet): spreadsheet, or any object with its id
+        library (Library): library holding the worksheet contents
+    """
+    _libraries[sheet.id] = library
+
+
+def get_library(sheet):
+    """
+    Return the library for a spreadsheet,
+    downloading the worksheet on first use
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        Library or None: None if the worksheet doesn't exist
+    """
+    library = _libraries.get(sheet.id)
+    if library is None:
+        with trace_span('sheet.read') as span:
+            try:
+                values = with_worksheet(
+                    sheet, _get_all_values, WORKSHEET_TITLE
+                    )
+            except gspread.exceptions.WorksheetNotFound:
+                return None
+            span.set(items=max(len(values) - 1, 0))
+        library = Library.from_values(values)
+        _libraries[sheet.id] = library
+    return library
+
+
+@traced('sheet.profile', count=None)
+def get_taste_profile(sheet):
+    """
+    Return the taste profile of the user's library
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        TasteProfile or None: None if the worksheet doesn't exist
+    """
+    library = get_library(sheet)
+    return None if library is None else library.get_profile()
+
+
+def get_library_membership(sheet):
+    """
+    Return the membership filter of the user's library
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        LibraryMembership or None: None if the worksheet doesn't exist
+    """
+    library = get_library(sheet)
+    return None if library is None else library.membership()
+
+
+def get_library_revision(sheet):
+    """
+    Return a hash identifying the current contents of the user's library
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        str or None: None if the worksheet doesn't exist
+    """
+    library = get_library(sheet)
+    return None if library is None else library.content_hash()
+
+
+def wait_for_library(sheet):
+    """
+    Block until a background revalidation of the library has finished
+    Called before writes, which address rows by index
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        Library or None: the registered library, if any
+    """
+    library = get_cached_library(sheet)
+    if library is not None:
+        library.ready.wait()
+    return get_cached_library(sheet)
+
+
+def forget_library(sheet):
+    """
+    Drop the library registered for a spreadsheet
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+    """
+    _libraries.pop(sheet.id, None)
+
+
+def reload_library(sheet):
+    """
+    Reload the registered library from the worksheet now, keeping its
+    listeners, e.g. when its row indexes may no longer match the sheet
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        Library or None: None if the worksheet doesn't exist
+    """
+    library = get_cached_library(sheet)
+    if library is None:
+        return get_library(sheet)
+    try:
+        values = with_worksheet(sheet, _get_all_values, WORKSHEET_TITLE)
+    except gspread.exceptions.WorksheetNotFound:
+        forget_library(sheet)
+        return None
+    library.replace(values)
+    return library
+
+
+# --- Snapshot ---
+def snapshot_path(sheet_name):
+    """
+    Args:
+        sheet_name (str): Name of the Google Sheet
+
+    Returns:
+        str: path of the snapshot file for that sheet
+    """
+    return cache_path(f'library_{sheet_name}.snap')
+
+
+def load_library_snapshot(sheet_name):
+    """
+    Load the library and genre tables saved by the last session
+
+    Args:
+        sheet_name (str): Name of the Google Sheet
+
+    Returns:
+        tuple[Library, str] or None: library and the spreadsheet id
+        it was saved from, None if there is no usable snapshot
+    """
+    snapshot = read_snapshot(snapshot_path(sheet_name))
+    if snapshot is None:
+        return None
+    set_genre_tables(snapshot.genre_tables)
+    library = Library(snapshot.headers, snapshot.columns)
+    if PROFILE in snapshot.extras:
+        try:
+            library.profile = TasteProfile.from_dict(
+                json.loads(snapshot.extras[PROFILE][0])
+                )
+        except (ValueError, KeyError, IndexError, TypeError):
+            library.profile = None
+    return library, snapshot.meta.get('sheet_id')
+
+
+def save_library_snapshot(sheet, sheet_name):
+    """
+    Persist the library, genre tables, header map and taste profile
+    for the next launch
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        sheet_name (str): Name of the Google Sheet
+    """
+    library = get_cached_library(sheet)
+    if library is None:
+        return
+    with library.lock:
+        headers, columns = list(library.headers), library.columns()
+        profile = library.get_profile().to_dict()
+    try:
+        write_snapshot(
+            snapshot_path(sheet_name),
+            headers,
+            columns,
+            get_genre_tables(),
+            {'sheet_id': sheet.id},
+            {PROFILE: [json.dumps(profile)]}
+            )
+    except OSError as e:
+        print(f"\n⚠️  Could not save local library snapshot: {e}")
+
+
+def start_library_sync(sheet, snapshot):
+    """
+    Register a snapshot library for the spreadsheet
+    and revalidate it against the worksheet in the background
+
+    Writes wait on `library.ready` so rows are never addressed
+    by indexes from an outdated snapshot.
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        snapshot (tuple[Library, str] or None): load_library_snapshot result
+
+    Returns:
+        threading.Thread or None: the revalidation thread
+    """
+    if snapshot is None:
+        return None
+    library, sheet_id = snapshot
+    if sheet_id != sheet.id:
+        return None
+    library.ready.clear()
+    _libraries[sheet.id] = library
+    thread = threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(_revalidate_library, sheet, library),
+        daemon=True
+        )
+    thread.start()
+    return thread
+
+
+def refresh_library(sheet):
+    """
+    Revalidate the registered library against the worksheet in the
+    background, e.g. when a session starts long after it was loaded
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+
+    Returns:
+        threading.Thread or None: the revalidation thread
+    """
+    library = get_cached_library(sheet)
+    if library is None or not library.ready.is_set():
+        return None  # missing, or being revalidated already
+    return start_library_sync(sheet, (library, sheet.id))
+
+
+def _revalidate_library(sheet, library):
+    """
+    Refresh the library from the worksheet if it changed elsewhere
+    """
+    try:
+        revision = library.revision
+        values = with_worksheet(sheet, _get_all_values, WORKSHEET_TITLE)
+        with library.lock:
+            # a local change meanwhile is newer than what was fetched
+            if library.revision == revision and values != library.values():
+                library.replace(values)
+    except gspread.exceptions.WorksheetNotFound:
+        forget_library(sheet)
+    except (gspread.exceptions.GSpreadException, requests.RequestException):
+        # keep serving the snapshot, the sheet is unreachable
+        pass
+    finally:
+        library.ready.set()
@@ -2,15 +2,16 @@
 Provides lookup and filtering functions for titles in the Google Sheet.
 
 Includes utilities to detect duplicates and retrieve rows by watch status.
+Lookups are served from the local library (see sheets.library).
 """
-import gspread
+from .library import get_library
 
 
 # --- Content ---
 def check_for_duplicate(title_obj, sheet):
     """
     Checks if the given Title object is already in the Google Sheet
-    by searching combination of id and media_type match
+    by looking up the combination of id and media_type
 
     Args:
         title_obj (Title): The Title instance to check
@@ -18,30 +19,18 @@ def check_for_duplicate(title_obj, sheet):
     Returns:
         (bool): True (already in list) / False (new item)
     """
-    try:
-        worksheet = sheet.worksheet('My_List')
-        all_values = worksheet.get_all_values()
-
-        # Get headers and indexes
-        headers = all_values[0]
-        id_index = headers.index("id")
-        type_index = headers.index("media_type")
-        watched_index = headers.index("is_watched")
-
-        for row in all_values[1:]:
-            if len(row) > max(id_index, type_index):
-                if (
-                    row[id_index] == str(title_obj.metadata.id) and
-                    row[type_index] == title_obj.metadata.media_type
-                ):
-                    is_watched = row[watched_index] == "True"
-                    watch_status = 'watched' if is_watched else 'watchlist'
-                    print(f"\n'{title_obj.metadata.title}' already in list, "
-                          f"marked as {watch_status}.")
-                    return True, watch_status
+    library = get_library(sheet)
+    if library is None:
         return False, False
-    except gspread.exceptions.WorksheetNotFound:
+    index = library.find(title_obj.metadata.id, title_obj.metadata.media_type)
+    if index is None:
         return False, False
+    watched_column = library.column('is_watched')
+    is_watched = watched_column is not None and watched_column[index] == "True"
+    watch_status = 'watched' if is_watched else 'watchlist'
+    print(f"\n'{title_obj.metadata.title}' already in list, "
+          f"marked as {watch_status}.")
+    return True, watch_status
 
 
 def get_titles_by_watch_status(sheet, watched):
@@ -54,20 +43,13 @@ def get_titles_by_watch_status(sheet, watched):
     Returns:
         list[dict]: filtered title rows as dict
     """
-    try:
-        worksheet = sheet.worksheet('My_List')
-        all_values = worksheet.get_all_records()
-
-        filtered = [
-            row for row in all_values
-            if str(row.get("is_watched", "")).lower() == str(watched).lower()
-        ]
-        return filtered
-    except gspread.exceptions.WorksheetNotFound:
+    library = get_library(sheet)
+    if library is None:
         print(
             "\n❌  No worksheet found."
             )
         return []
+    return library.records(watched=watched)
 
 
 def find_existing_row_info(title_obj, sheet):
@@ -80,32 +62,21 @@ def find_existing_row_info(title_obj, sheet):
 
     Returns:
         found (bol): True/False - item found in list
-        index (int): row index number
+        index (int): sheet row index number (header is row 1)
         row (list): row list data
     """
     print(f"\n🔎  Looking for '{title_obj.metadata.title}' in sheet...")
-    try:
-        worksheet = sheet.worksheet('My_List')
-        all_values = worksheet.get_all_values()
-        # Get headers and indexes
-        headers = all_values[0]
-        id_index = headers.index("id")
-        type_index = headers.index("media_type")
-
-        for i, row in enumerate(all_values[1:], start=2):
-            if len(row) > max(id_index, type_index):
-                if (
-                    row[id_index] == str(title_obj.metadata.id) and
-                    row[type_index] == title_obj.metadata.media_type
-                ):
-                    return True, i, row
-        print(f"\n❌ '{title_obj.metadata.title} not found in sheet.")
-        return False, None, None
-    except gspread.exceptions.WorksheetNotFound:
+    library = get_library(sheet)
+    if library is None:
         print(
             "\n❌  No worksheet found."
             )
         return False, None, None
+    index = library.find(title_obj.metadata.id, title_obj.metadata.media_type)
+    if index is None:
+        print(f"\n❌ '{title_obj.metadata.title} not found in sheet.")
+        return False, None, None
+    return True, index + 2, library.row(index)
 
 
 # --- Status ---
@@ -119,15 +90,13 @@ def has_items(sheet):
     Returns:
         _bool_: True for list with items
     """
-    try:
-        worksheet = sheet.worksheet('My_List')
-        all_values = worksheet.get_all_values()
-        return len(all_values) > 1  # >1 because the first row is headers
-    except gspread.exceptions.WorksheetNotFound:
+    library = get_library(sheet)
+    if library is None:
         print(
             "\n❌  No worksheet found."
             )
         return False
+    return len(library) > 0
 
 
 def has_watchlist(sheet):
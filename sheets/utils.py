@@ -5,8 +5,10 @@ Provides a utility to format sheet rows into usable model instances.
 """
 
 from models import Title
+from utils.tracing import traced
 
 
+@traced('titles.from_sheet')
 def build_title_objects_from_sheet(sheet_rows):
     """
     Takes raw rows from a Google Sheet and transforms each into a Title
@@ -0,0 +1,235 @@
+"""
+Resolves and remembers spreadsheet keys and worksheet handles.
+
+Opening a spreadsheet by name is a Drive search, and
+`Spreadsheet.worksheet(title)` fetches the spreadsheet metadata on every
+call. The key of each spreadsheet and the properties of its worksheets
+are kept in `sheets.json` in the cache directory, so later sessions open
+by key (one metadata request, which also validates access) and build
+Worksheet objects without any request. Handles are refreshed only when
+a lookup or an operation on them fails.
+"""
+import json
+import os
+import threading
+import gspread
+from gspread.exceptions import APIError, SpreadsheetNotFound
+from storage.paths import cache_path
+from utils.quota import acquire_quota
+
+HANDLES_FILE = 'sheets.json'
+# API errors meaning a worksheet handle no longer matches the spreadsheet
+STALE_HANDLE_STATUSES = (400, 404)
+
+# (spreadsheet id, worksheet title) -> gspread.Worksheet
+_worksheets = {}
+_lock = threading.RLock()
+
+
+# --- Persistence ---
+def _read_handles():
+    try:
+        with open(cache_path(HANDLES_FILE), encoding='utf-8') as file:
+            handles = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return handles if isinstance(handles, dict) else {}
+
+
+def _write_handles(handles):
+    path = cache_path(HANDLES_FILE)
+    tmp_path = f'{path}.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(handles, file, indent=1)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # only costs a lookup next session
+
+
+def _update_handles(update):
+    """
+    Apply update(handles) to the stored handles and save them
+    """
+    with _lock:
+        handles = _read_handles()
+        update(handles)
+        _write_handles(handles)
+
+
+# --- Spreadsheets ---
+def open_spreadsheet(client, sheet_name):
+    """
+    Open a spreadsheet by its remembered key, searching Drive by name
+    only the first time or if the key no longer opens a spreadsheet
+    with that name
+
+    Args:
+        client (gspread.Client): authorized client
+        sheet_name (str): spreadsheet name
+
+    Returns:
+        gspread.Spreadsheet
+
+    Raises:
+        gspread.exceptions.SpreadsheetNotFound: if no spreadsheet has
+            that name
+    """
+    key = _read_handles().get(sheet_name, {}).get('key')
+    if key is not None:
+        try:
+            sheet = client.open_by_key(key)
+            if sheet.title == sheet_name:
+                return sheet
+        except (SpreadsheetNotFound, PermissionError, APIError):
+            pass
+    sheet = client.open(sheet_name)
+
+    def remember(handles):
+        handles[sheet_name] = {'key': sheet.id, 'worksheets': {}}
+
+    _update_handles(remember)
+    return sheet
+
+
+def _sheet_entry(handles, sheet):
+    """
+    Stored entry of an opened spreadsheet, if it was opened by name
+    """
+    for entry in handles.values():
+        if isinstance(entry, dict) and entry.get('key') == sheet.id:
+            return entry
+    return None
+
+
+# --- Worksheets ---
+def get_worksheet(sheet, title='My_List'):
+    """
+    Return the session's handle of a worksheet, built from remembered
+    properties or looked up once
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        title (str): worksheet title
+
+    Returns:
+        gspread.Worksheet
+
+    Raises:
+        gspread.exceptions.WorksheetNotFound: if the lookup fails
+    """
+    with _lock:
+        worksheet = _worksheets.get((sheet.id, title))
+        if worksheet is not None:
+            return worksheet
+        entry = _sheet_entry(_read_handles(), sheet) or {}
+        properties = entry.get('worksheets', {}).get(title)
+    if properties is None:
+        worksheet = sheet.worksheet(title)
+        remember_worksheet(sheet, worksheet)
+        return worksheet
+    worksheet = gspread.Worksheet(sheet, properties, sheet.id, sheet.client)
+    with _lock:
+        _worksheets[(sheet.id, title)] = worksheet
+    return worksheet
+
+
+def remember_worksheet(sheet, worksheet):
+    """
+    Keep a worksheet handle for this and later sessions
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        worksheet (gspread.Worksheet): worksheet of the spreadsheet
+    """
+    with _lock:
+        _worksheets[(sheet.id, worksheet.title)] = worksheet
+
+    def remember(handles):
+        entry = _sheet_entry(handles, sheet)
+        if entry is not None:
+            entry.setdefault('worksheets', {})[worksheet.title] = {
+                'sheetId': worksheet.id,
+                'title': worksheet.title,
+                'index': worksheet.index,
+                'gridProperties': {
+                    'rowCount': worksheet.row_count,
+                    'columnCount': worksheet.col_count,
+                    },
+                }
+
+    _update_handles(remember)
+
+
+def forget_worksheet(sheet, title='My_List'):
+    """
+    Drop a worksheet handle, so the next access looks it up again
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        title (str): worksheet title
+    """
+    with _lock:
+        _worksheets.pop((sheet.id, title), None)
+
+    def forget(handles):
+        entry = _sheet_entry(handles, sheet)
+        if entry is not None:
+            entry.get('worksheets', {}).pop(title, None)
+
+    _update_handles(forget)
+
+
+def is_stale_handle(error):
+    """
+    Args:
+        error (gspread.exceptions.APIError): error of a worksheet call
+
+    Returns:
+        bool: True if the API rejected the worksheet handle itself
+    """
+    return error.response.status_code in STALE_HANDLE_STATUSES
+
+
+def with_worksheet(sheet, operation, title='My_List', retry=True):
+    """
+    Run an operation on a worksheet handle; if the API rejects the
+    handle (e.g. the worksheet was renamed or recreated elsewhere),
+    look the worksheet up again and retry once
+    Waits for the session's share of the Sheets quota (see utils.quota)
+    before every request
+
+    Operations that address rows by index must pass retry=False: on a
+    recreated worksheet the same index may hold another title, so the
+    caller has to find the row again before writing (see sheets.crud)
+
+    Args:
+        sheet (gspread.Spreadsheet): Initialized Google Sheet
+        operation (callable): operation(worksheet)
+        title (str): worksheet title
+        retry (bool): retry on a fresh handle; if False the stale handle
+            is dropped and the APIError re-raised
+
+    Returns:
+        the operation's result
+
+    Raises:
+        gspread.exceptions.WorksheetNotFound: if the worksheet is gone
+        gspread.exceptions.APIError: on any other API error, or on a
+            stale handle when retry is False
+    """
+    acquire_quota('sheets')
+    try:
+        return operation(get_worksheet(sheet, title))
+    except APIError as e:
+        # only a stale handle is retried, not e.g. rate limiting
+        if not is_stale_handle(e):
+            raise
+        forget_worksheet(sheet, title)
+        if not retry:
+            raise
+    acquire_quota('sheets')
+    worksheet = sheet.worksheet(title)
+    remember_worksheet(sheet, worksheet)
+    acquire_quota('sheets')
+    return operation(worksheet)
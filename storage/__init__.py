@@ -0,0 +1,24 @@
+"""
+Exposes local persistence helpers.
+
+Includes the cache directory resolution and the binary library snapshot.
+"""
+
+from .paths import CACHE_DIR, cache_path
+from .snapshot import (
+    Snapshot,
+    SnapshotError,
+    SnapshotWriter,
+    read_snapshot,
+    write_snapshot
+)
+
+__all__ = [
+    "CACHE_DIR",
+    "cache_path",
+    "Snapshot",
+    "SnapshotError",
+    "SnapshotWriter",
+    "read_snapshot",
+    "write_snapshot",
+]
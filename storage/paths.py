@@ -0,0 +1,24 @@
+"""
+Resolves where local cache files are stored.
+
+The directory defaults to `.reeltracker` in the working directory
+and can be moved with the REELTRACKER_CACHE_DIR environment variable.
+"""
+import os
+
+CACHE_DIR = os.getenv('REELTRACKER_CACHE_DIR', '.reeltracker')
+
+
+def cache_path(filename):
+    """
+    Build the path of a file inside the cache directory,
+    creating the directory if needed
+
+    Args:
+        filename (str): file name inside the cache directory
+
+    Returns:
+        str: path to the file
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, filename)
@@ -0,0 +1,420 @@
+"""
+Reads and writes the compact binary library snapshot.
+
+The snapshot is a versioned, little-endian file made of tagged sections.
+Every section is a string column: a row count, an offsets table and a
+UTF-8 blob. Files are memory-mapped on load and cells are only decoded
+when read, so opening a snapshot costs the same for any library size.
+
+Layout:
+    header   magic, version, section count, row count, column count, saved_at
+    section  tag (4 bytes), payload length, payload (padded to 4 bytes)
+    payload  count (u32), count + 1 offsets (u32), UTF-8 blob
+
+SnapshotWriter writes the same file row by row, spooling every column
+to temporary files, for exports larger than what should be held in
+memory.
+"""
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+
+MAGIC = b'RTSN'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIIQ')
+_SECTION = struct.Struct('<4sI')
+_COUNT = struct.Struct('<I')
+
+# Section tags
+META = b'META'
+HEADERS = b'HEAD'
+COLUMN = b'COL_'
+GENRE_MEDIA_TYPES = b'GMED'
+GENRE_IDS = b'GIDS'
+GENRE_NAMES = b'GNAM'
+PROFILE = b'PROF'
+
+
+class SnapshotError(ValueError):
+    """
+    Raised when a snapshot file is truncated, corrupt or from another version
+    """
+
+
+class StringColumn(Sequence):
+    """
+    Read-only sequence of strings backed by a snapshot buffer
+    Cells are decoded from UTF-8 on access
+    """
+    def __init__(self, buffer, offset):
+        """
+        Args:
+            buffer (memoryview): snapshot contents
+            offset (int): start of the column payload
+        """
+        (count,) = _COUNT.unpack_from(buffer, offset)
+        offsets_start = offset + _COUNT.size
+        offsets_end = offsets_start + (count + 1) * 4
+        if offsets_end > len(buffer):
+            # as struct.unpack_from would on a short buffer
+            raise struct.error(f'{count} string offsets past end of buffer')
+        if sys.byteorder == 'little':
+            self._offsets = buffer[offsets_start:offsets_end].cast('I')
+        else:
+            self._offsets = struct.unpack_from(
+                f'<{count + 1}I', buffer, offsets_start
+                )
+        self._blob = buffer[offsets_end:]
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('StringColumn index out of range')
+        start = self._offsets[index]
+        end = self._offsets[index + 1]
+        return str(self._blob[start:end], 'utf-8')
+
+    def release(self):
+        """
+        Drop the views into the snapshot buffer
+        """
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._blob.release()
+
+
+class Snapshot:
+    """
+    Memory-mapped library snapshot
+
+    Attributes:
+        version (int): file format version
+        saved_at (int): epoch seconds when the snapshot was written
+        meta (dict): free-form string metadata (sheet id, ...)
+        headers (list[str]): worksheet header row
+        columns (list[StringColumn]): one column per header
+        genre_tables (dict): {media_type: {genre_id: name}}
+        extras (dict): any other section, tag -> list of strings
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): snapshot file to open
+
+        Raises:
+            OSError: file cannot be opened
+            SnapshotError: file is not a valid snapshot
+        """
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        # every section read, so a failed parse can release its views
+        self._sections = []
+        try:
+            self._parse()
+        except (
+                struct.error, IndexError, TypeError, UnicodeDecodeError
+                ) as e:
+            self._release()
+            raise SnapshotError(f'Corrupt snapshot: {e}') from e
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self):
+        """
+        Unmap the file after a failed parse
+        """
+        for column in self._sections:
+            column.release()
+        self._sections = []
+        self.columns = []
+        self._buffer.release()
+        self._mmap.close()
+
+    def _parse(self):
+        """
+        Validate the header and index the sections
+        """
+        magic, version, sections, rows, cols, saved_at = (
+            _HEADER.unpack_from(self._buffer, 0)
+            )
+        if magic != MAGIC:
+            raise SnapshotError('Not a library snapshot')
+        if version != VERSION:
+            raise SnapshotError(f'Unsupported snapshot version {version}')
+        self.version = version
+        self.saved_at = saved_at
+        self.columns = []
+        by_tag = {}
+        offset = _HEADER.size
+        for _ in range(sections):
+            tag, length = _SECTION.unpack_from(self._buffer, offset)
+            offset += _SECTION.size
+            if offset + length > len(self._buffer):
+                raise SnapshotError('Truncated snapshot')
+            column = StringColumn(self._buffer, offset)
+            self._sections.append(column)
+            if tag == COLUMN:
+                self.columns.append(column)
+            else:
+                by_tag[tag] = column
+            offset += length
+        if len(self.columns) != cols or any(
+            len(column) != rows for column in self.columns
+        ):
+            raise SnapshotError('Column sizes do not match the header')
+        meta = list(by_tag.get(META, []))
+        self.meta = dict(zip(meta[::2], meta[1::2]))
+        self.headers = list(by_tag.get(HEADERS, []))
+        self.genre_tables = {}
+        for media_type, genre_id, name in zip(
+            by_tag.get(GENRE_MEDIA_TYPES, []),
+            by_tag.get(GENRE_IDS, []),
+            by_tag.get(GENRE_NAMES, []),
+        ):
+            self.genre_tables.setdefault(media_type, {})[int(genre_id)] = name
+        known = (META, HEADERS, GENRE_MEDIA_TYPES, GENRE_IDS, GENRE_NAMES)
+        self.extras = {
+            tag: list(column) for tag, column in by_tag.items()
+            if tag not in known
+            }
+
+    @property
+    def row_count(self):
+        """
+        int: number of rows in the snapshot
+        """
+        return len(self.columns[0]) if self.columns else 0
+
+
+def _pack_strings(values):
+    """
+    Encode a list of strings as a section payload
+
+    Args:
+        values (list[str]): cell values
+
+    Returns:
+        bytes: payload padded to a multiple of 4 bytes
+    """
+    encoded = [str(value).encode('utf-8') for value in values]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    payload = b''.join([
+        _COUNT.pack(len(encoded)),
+        struct.pack(f'<{len(offsets)}I', *offsets),
+        *encoded,
+        ])
+    return payload + b'\0' * (-len(payload) % 4)
+
+
+def write_snapshot(
+    path,
+    headers,
+    columns,
+    genre_tables=None,
+    meta=None,
+    extras=None
+):
+    """
+    Write a snapshot atomically (temporary file + rename)
+
+    Args:
+        path (str): destination file
+        headers (list[str]): worksheet header row
+        columns (list[list[str]]): one list of cells per header
+        genre_tables (dict, optional): {media_type: {genre_id: name}}
+        meta (dict, optional): string metadata to store
+        extras (dict, optional): additional sections, tag -> list of str
+    """
+    rows = len(columns[0]) if columns else 0
+    genre_rows = [
+        (media_type, str(genre_id), name)
+        for media_type, table in (genre_tables or {}).items()
+        for genre_id, name in table.items()
+        ]
+    meta_values = [item for pair in (meta or {}).items() for item in pair]
+    sections = [(META, meta_values), (HEADERS, headers)]
+    sections += [(COLUMN, column) for column in columns]
+    sections += [
+        (GENRE_MEDIA_TYPES, [row[0] for row in genre_rows]),
+        (GENRE_IDS, [row[1] for row in genre_rows]),
+        (GENRE_NAMES, [row[2] for row in genre_rows]),
+        ]
+    sections += list((extras or {}).items())
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(_HEADER.pack(
+            MAGIC, VERSION, len(sections), rows, len(columns),
+            int(time.time())
+            ))
+        for tag, values in sections:
+            _write_section(file, tag, _pack_strings(values))
+    os.replace(tmp_path, path)
+
+
+class SnapshotWriter:
+    """
+    Writes a snapshot one row at a time
+    Each column's offsets and UTF-8 blob are spooled to temporary files
+    and copied into place on close(), so memory use doesn't grow with
+    the row count. Used as a context manager, the file is only written
+    if the block completes.
+
+    Attributes:
+        rows (int): rows appended so far
+    """
+    def __init__(
+        self,
+        path,
+        headers,
+        genre_tables=None,
+        meta=None,
+        extras=None
+    ):
+        """
+        Args:
+            path (str): destination file
+            headers (list[str]): worksheet header row
+            genre_tables (dict, optional): {media_type: {genre_id: name}}
+            meta (dict, optional): string metadata to store
+            extras (dict, optional): additional sections, tag -> list of str
+        """
+        self.path = path
+        self.headers = list(headers)
+        self.genre_tables = genre_tables
+        self.meta = meta
+        self.extras = extras
+        self.rows = 0
+        # per column: [offsets file, blob file, blob length]
+        self._spools = [
+            [tempfile.TemporaryFile(), tempfile.TemporaryFile(), 0]
+            for _ in self.headers
+            ]
+        for offsets, _, _ in self._spools:
+            offsets.write(_COUNT.pack(0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def append(self, row):
+        """
+        Args:
+            row (Sequence[str]): cells in header order, padded or cut to
+                the header width
+        """
+        row = list(row)[:len(self.headers)]
+        row += [''] * (len(self.headers) - len(row))
+        for spool, value in zip(self._spools, row):
+            encoded = str(value).encode('utf-8')
+            spool[1].write(encoded)
+            spool[2] += len(encoded)
+            spool[0].write(_COUNT.pack(spool[2]))
+        self.rows += 1
+
+    def close(self):
+        """
+        Write the snapshot atomically and release the spools
+        """
+        genre_rows = [
+            (media_type, str(genre_id), name)
+            for media_type, table in (self.genre_tables or {}).items()
+            for genre_id, name in table.items()
+            ]
+        meta_values = [
+            item for pair in (self.meta or {}).items() for item in pair
+            ]
+        sections = [(META, meta_values), (HEADERS, self.headers)]
+        tail = [
+            (GENRE_MEDIA_TYPES, [row[0] for row in genre_rows]),
+            (GENRE_IDS, [row[1] for row in genre_rows]),
+            (GENRE_NAMES, [row[2] for row in genre_rows]),
+            ]
+        tail += list((self.extras or {}).items())
+
+        tmp_path = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'wb') as file:
+                file.write(_HEADER.pack(
+                    MAGIC, VERSION, len(sections) + len(self._spools)
+                    + len(tail), self.rows, len(self._spools),
+                    int(time.time())
+                    ))
+                for tag, values in sections:
+                    _write_section(file, tag, _pack_strings(values))
+                for offsets, blob, length in self._spools:
+                    self._write_column(file, offsets, blob, length)
+                for tag, values in tail:
+                    _write_section(file, tag, _pack_strings(values))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            self.discard()
+
+    def _write_column(self, file, offsets, blob, length):
+        padding = -(length + (self.rows + 2) * 4) % 4
+        file.write(_SECTION.pack(
+            COLUMN, _COUNT.size + (self.rows + 1) * 4 + length + padding
+            ))
+        file.write(_COUNT.pack(self.rows))
+        for spool in (offsets, blob):
+            spool.seek(0)
+            shutil.copyfileobj(spool, file)
+        file.write(b'\0' * padding)
+
+    def discard(self):
+        """
+        Release the spools without writing the snapshot
+        """
+        for offsets, blob, _ in self._spools:
+            offsets.close()
+            blob.close()
+        self._spools = []
+
+
+def _write_section(file, tag, payload):
+    file.write(_SECTION.pack(tag, len(payload)))
+    file.write(payload)
+
+
+def read_snapshot(path):
+    """
+    Open a snapshot if one exists and is valid
+
+    Args:
+        path (str): snapshot file
+
+    Returns:
+        Snapshot or None: None if missing, unreadable or outdated
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return Snapshot(path)
+    except (OSError, SnapshotError, ValueError):
+        return None
@@ -1,27 +1,50 @@
 """
 Exposes TMDb-related functions for use throughout the app.
 
-Includes search, recommendation, and genre utilities.
+Includes search, recommendation, and genre utilities,
+and the cache of API responses.
 """
 
+from .cache import (
+    ResponseCache,
+    get_response_cache,
+    set_response_cache,
+    make_cache_key
+)
 from .tmdb_api import (
+    search_titles,
     fetch_tmdb_results,
     fetch_trending_titles,
     fetch_title_base_recommendation,
     discover_titles_by_genre,
-    get_genre_mapping
+    get_genre_mapping,
+    count_requests,
+    quiet_errors
 )
 from .utils import (
+    get_genre_table,
+    get_genre_tables,
+    set_genre_tables,
     get_genre_names_from_ids,
     filter_results_by_media_type
 )
 
 __all__ = [
+    "ResponseCache",
+    "get_response_cache",
+    "set_response_cache",
+    "make_cache_key",
+    "search_titles",
     "fetch_tmdb_results",
     "fetch_trending_titles",
     "fetch_title_base_recommendation",
     "discover_titles_by_genre",
     "get_genre_mapping",
+    "count_requests",
+    "quiet_errors",
+    "get_genre_table",
+    "get_genre_tables",
+    "set_genre_tables",
     "get_genre_names_from_ids",
     "filter_results_by_media_type",
 ]
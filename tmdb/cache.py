@@ -0,0 +1,277 @@
+"""
+Caches TMDb API responses on disk.
+
+Responses are stored in a small SQLite database in the cache directory,
+keyed by endpoint and query parameters (without the API key), and expire
+after a time-to-live that depends on how fast the endpoint changes.
+Reads can be recorded, so results computed from cached responses can be
+invalidated when one of those responses expires or is refreshed.
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from storage.paths import cache_path
+
+CACHE_FILE = 'tmdb_cache.sqlite'
+
+# Seconds a response stays fresh, by the first segment of its path
+HOUR = 60 * 60
+TTL_BY_ENDPOINT = {
+    'search': HOUR,
+    'trending': 6 * HOUR,
+    'discover': 12 * HOUR,
+    'movie': 24 * HOUR,
+    'tv': 24 * HOUR,
+    'genre': 7 * 24 * HOUR,
+}
+DEFAULT_TTL = HOUR
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+def make_cache_key(path, params):
+    """
+    Build the cache key of a request
+
+    Args:
+        path (str): endpoint path, e.g. 'trending/all/week'
+        params (dict): query parameters; 'api_key' is left out
+
+    Returns:
+        str: path followed by the sorted parameters
+    """
+    query = '&'.join(
+        f'{name}={params[name]}' for name in sorted(params)
+        if name != 'api_key'
+        )
+    return f'{path}?{query}'
+
+
+def ttl_for(path):
+    """
+    Args:
+        path (str): endpoint path
+
+    Returns:
+        int: time-to-live in seconds
+    """
+    return TTL_BY_ENDPOINT.get(path.split('/', 1)[0], DEFAULT_TTL)
+
+
+class ResponseCache:
+    """
+    SQLite-backed store of TMDb response bodies
+
+    Attributes:
+        path (str): database file
+        read_only (bool): True if the cache never writes
+        hits (int): lookups answered from the cache
+        misses (int): lookups that required a request
+    """
+    def __init__(self, path, read_only=False):
+        """
+        Args:
+            path (str): database file
+            read_only (bool): open the database read-only, e.g. from
+                worker processes sharing the cache of the main process
+        """
+        self.path = path
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._recorders = []
+        self._connection = None
+
+    def _connect(self):
+        """
+        Open the database on first use
+        Returns None if it can't be opened (e.g. read-only and missing)
+        """
+        if self._connection is None:
+            try:
+                if self.read_only:
+                    connection = sqlite3.connect(
+                        f'file:{self.path}?mode=ro', uri=True,
+                        check_same_thread=False
+                        )
+                else:
+                    connection = sqlite3.connect(
+                        self.path, check_same_thread=False
+                        )
+                    connection.execute(_SCHEMA)
+                    connection.commit()
+            except sqlite3.Error:
+                return None
+            self._connection = connection
+        return self._connection
+
+    def get(self, key, now=None):
+        """
+        Return a fresh cached body
+
+        Args:
+            key (str): cache key (see make_cache_key)
+            now (float, optional): current time, defaults to time.time()
+
+        Returns:
+            dict or None: decoded body, None if missing or expired
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            connection = self._connect()
+            row = None
+            if connection is not None:
+                try:
+                    row = connection.execute(
+                        'SELECT body, fetched_at, expires_at '
+                        'FROM responses WHERE key = ?', (key,)
+                        ).fetchone()
+                except sqlite3.Error:
+                    row = None
+            if row is None or row[2] <= now:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._record(key, row[1])
+            return json.loads(row[0])
+
+    def put(self, key, body, ttl, now=None):
+        """
+        Store a response body
+
+        Args:
+            key (str): cache key (see make_cache_key)
+            body (dict): decoded JSON body
+            ttl (int): time-to-live in seconds
+            now (float, optional): current time, defaults to time.time()
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._record(key, now)
+            connection = None if self.read_only else self._connect()
+            if connection is None:
+                return
+            try:
+                connection.execute(
+                    'INSERT OR REPLACE INTO responses '
+                    'VALUES (?, ?, ?, ?)',
+                    (key, json.dumps(body), now, now + ttl)
+                    )
+                connection.commit()
+            except sqlite3.Error:
+                pass  # caching is best effort
+
+    def is_current(self, key, fetched_at, now=None):
+        """
+        Check that an entry is still the one that was read, and fresh
+
+        Args:
+            key (str): cache key
+            fetched_at (float): fetch time recorded when it was read
+            now (float, optional): current time, defaults to time.time()
+
+        Returns:
+            bool
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            connection = self._connect()
+            if connection is None:
+                return False
+            try:
+                row = connection.execute(
+                    'SELECT fetched_at, expires_at FROM responses '
+                    'WHERE key = ?', (key,)
+                    ).fetchone()
+            except sqlite3.Error:
+                return False
+        return row is not None and row[0] == fetched_at and row[1] > now
+
+    def purge_expired(self, now=None):
+        """
+        Delete expired entries
+
+        Returns:
+            int: number of entries deleted
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            connection = None if self.read_only else self._connect()
+            if connection is None:
+                return 0
+            try:
+                deleted = connection.execute(
+                    'DELETE FROM responses WHERE expires_at <= ?', (now,)
+                    ).rowcount
+                connection.commit()
+            except sqlite3.Error:
+                return 0
+            return deleted
+
+    def _record(self, key, fetched_at):
+        for used in self._recorders:
+            used[key] = fetched_at
+
+    @contextmanager
+    def record(self):
+        """
+        Collect the entries read or stored inside the block,
+        from any thread
+
+        Yields:
+            dict: cache key -> fetch time
+        """
+        used = {}
+        with self._lock:
+            self._recorders.append(used)
+        try:
+            yield used
+        finally:
+            with self._lock:
+                self._recorders.remove(used)
+
+    def close(self):
+        """
+        Close the database connection
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_cache = None
+
+
+def get_response_cache():
+    """
+    Return the session's response cache, creating it on first use
+
+    Returns:
+        ResponseCache
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(cache_path(CACHE_FILE))
+    return _cache
+
+
+def set_response_cache(cache):
+    """
+    Replace the session's response cache (e.g. with a read-only one)
+
+    Args:
+        cache (ResponseCache): cache to use
+    """
+    global _cache
+    _cache = cache
@@ -2,14 +2,24 @@
 Handles communication with the TMDb API for search and recommendations.
 
 Provides functions for fetching titles, trending content, and genre data.
+Responses are served from the on-disk response cache while fresh.
 """
 
 import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 import requests
+from tmdb.cache import get_response_cache, make_cache_key, ttl_for
+from utils.tracing import trace_span
+from utils.quota import QuotaExceeded, acquire_quota
 
 # Constants
 DEFAULT_LANGUAGE = 'en-US'
+# Longest wait for the session's share of the request quota, in seconds
+QUOTA_WAIT = 10
+CONNECTION_ERROR = "\n⚠️  Could not connect to TMDb. Please try again later."
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,17 +31,120 @@ if TMDB_API_KEY is None:
     raise EnvironmentError("TMDB_API_KEY not found! Check your .env file.")
 
 
+# Request counters of the current thread, see count_requests()
+_local = threading.local()
+# True while failed requests go unreported, see quiet_errors()
+_quiet = ContextVar('tmdb_quiet', default=False)
+
+
+class RequestCounter:
+    """
+    Number of TMDb requests sent (cache misses)
+
+    Attributes:
+        count (int): requests sent inside the count_requests() block
+    """
+    def __init__(self):
+        self.count = 0
+
+
+@contextmanager
+def count_requests():
+    """
+    Count the requests the current thread sends to TMDb inside the block
+    Responses served from the cache are not counted
+
+    Yields:
+        RequestCounter: counter updated as requests are sent
+    """
+    counter = RequestCounter()
+    counters = getattr(_local, 'counters', None)
+    if counters is None:
+        counters = _local.counters = []
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+@contextmanager
+def quiet_errors():
+    """
+    Don't report failed requests inside the block, e.g. in background
+    work the user didn't ask for; the fetch functions still return []
+    """
+    token = _quiet.set(True)
+    try:
+        yield
+    finally:
+        _quiet.reset(token)
+
+
+def _report_error(message):
+    """
+    Print a request failure, unless inside quiet_errors()
+    """
+    if not _quiet.get():
+        print(message)
+
+
+def _get_json(path, params):
+    """
+    GET a TMDb endpoint, answered from the response cache while fresh
+
+    Args:
+        path (str): endpoint path after TMDB_URL
+        params (dict): query parameters
+
+    Returns:
+        dict: decoded JSON body
+
+    Raises:
+        requests.RequestException: if the request fails, or the
+            session's request quota stays used up (see utils.quota)
+    """
+    cache = get_response_cache()
+    key = make_cache_key(path, params)
+    with trace_span('tmdb.cache') as span:
+        data = cache.get(key)
+        span.set(endpoint=path, hit=data is not None)
+    if data is None:
+        try:
+            acquire_quota('tmdb', QUOTA_WAIT)
+        except QuotaExceeded as e:
+            raise requests.RequestException(str(e)) from e
+        for counter in getattr(_local, 'counters', ()):
+            counter.count += 1
+        with trace_span('tmdb.request') as span:
+            response = requests.get(
+                f'{TMDB_URL}/{path}', params=params, timeout=10
+            )
+            response.raise_for_status()
+            data = response.json()
+            span.set(items=len(data.get('results', [])), endpoint=path)
+        cache.put(key, data, ttl_for(path))
+    return data
+
+
 # --- Fetching title lists ---
-def fetch_tmdb_results(
+def search_titles(
     search_key,
     api_key=TMDB_API_KEY,
     page=1,
     language=DEFAULT_LANGUAGE
 ):
     """
-    Fetches a list of titles from TMDB based on user's query
+    Search TMDb movies and shows by name, for callers that tell a
+    failed request apart from an empty result
+
+    Returns:
+        list[dict]: raw results
+
+    Raises:
+        requests.RequestException: if the request fails
     """
-    url = f'{TMDB_URL}/search/multi'
+    path = 'search/multi'
     params = {
         'query': search_key,
         'api_key': api_key,
@@ -39,15 +152,22 @@ def fetch_tmdb_results(
         'page': page,
         'include_adult': False,
     }
+    return _get_json(path, params).get('results', [])
+
+
+def fetch_tmdb_results(
+    search_key,
+    api_key=TMDB_API_KEY,
+    page=1,
+    language=DEFAULT_LANGUAGE
+):
+    """
+    Fetches a list of titles from TMDB based on user's query
+    """
     try:
-        response = requests.get(
-            url, params=params, timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data.get('results', [])
+        return search_titles(search_key, api_key, page, language)
     except requests.RequestException:
-        print("\n⚠️  Could not connect to TMDb. Please try again later.")
+        _report_error(CONNECTION_ERROR)
         return []
 
 
@@ -59,7 +179,7 @@ def fetch_trending_titles(
     """
     Fetches a list of popular movies from TMDb API
     """
-    url = f'{TMDB_URL}/trending/all/week'
+    path = 'trending/all/week'
     params = {
         'api_key': api_key,
         'language': language,
@@ -67,14 +187,10 @@ def fetch_trending_titles(
         'include_adult': False,
     }
     try:
-        response = requests.get(
-            url, params=params, timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = _get_json(path, params)
         return data.get('results', [])
     except requests.RequestException:
-        print("\n⚠️  Could not connect to TMDb. Please try again later.")
+        _report_error(CONNECTION_ERROR)
         return []
 
 
@@ -88,21 +204,17 @@ def fetch_title_base_recommendation(
     """
     Fetches title-based recommendations from TMDB
     """
-    url = f'{TMDB_URL}/{media_type}/{title_id}/recommendations'
+    path = f'{media_type}/{title_id}/recommendations'
     params = {
         'api_key': api_key,
         'language': language,
         'page': page,
     }
     try:
-        response = requests.get(
-            url, params=params, timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = _get_json(path, params)
         return data.get('results', [])
     except requests.RequestException:
-        print("\n⚠️  Could not connect to TMDb. Please try again later.")
+        _report_error(CONNECTION_ERROR)
         return []
 
 
@@ -116,7 +228,7 @@ def discover_titles_by_genre(
     """
     Fetches titles that match genre and media type on TMDB
     """
-    url = f'{TMDB_URL}/discover/{media_type}'
+    path = f'discover/{media_type}'
     params = {
         "api_key": api_key,
         'language': language,
@@ -124,14 +236,10 @@ def discover_titles_by_genre(
         'with_genres': genres,
     }
     try:
-        response = requests.get(
-            url, params=params, timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = _get_json(path, params)
         return data.get('results', [])
     except requests.RequestException as e:
-        print(f"\n⚠️  Could not connect to TMDb: {e}")
+        _report_error(f"\n⚠️  Could not connect to TMDb: {e}")
         return []
 
 
@@ -140,17 +248,13 @@ def get_genre_mapping(media_type, api_key):
     """
     Request genre name from API
     """
-    url = f'{TMDB_URL}/genre/{media_type}/list'
+    path = f'genre/{media_type}/list'
     params = {
         'api_key': api_key,
     }
     try:
-        response = requests.get(
-            url, params=params, timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = _get_json(path, params)
         return data.get('genres', [])
     except requests.RequestException:
-        print("⚠️  Could not connect to TMDb. Please try again later.")
+        _report_error("⚠️  Could not connect to TMDb. Please try again later.")
         return []
@@ -7,11 +7,58 @@ from tmdb.tmdb_api import (
     TMDB_API_KEY,
     get_genre_mapping
     )
+from utils.tracing import traced
 
+# Genre tables by media type, fetched once per session
+_genre_tables = {}
 
+
+def get_genre_table(media_type):
+    """
+    Return the {genre_id: name} table for a media type
+    Fetched from TMDb on first use and kept for the session
+
+    Args:
+        media_type (str): Media type of the Title (tv/movie)
+    Returns:
+        dict: genre id to genre name
+    """
+    table = _genre_tables.get(media_type)
+    if table is None:
+        genre_list = get_genre_mapping(media_type, TMDB_API_KEY)
+        table = {genre['id']: genre['name'] for genre in genre_list}
+        if table:  # don't keep a failed request around
+            _genre_tables[media_type] = table
+    return table
+
+
+def get_genre_tables():
+    """
+    Return a copy of the genre tables loaded so far
+
+    Returns:
+        dict: {media_type: {genre_id: name}}
+    """
+    return {media_type: dict(table)
+            for media_type, table in _genre_tables.items()}
+
+
+def set_genre_tables(tables):
+    """
+    Preload genre tables, e.g. from a library snapshot
+
+    Args:
+        tables (dict): {media_type: {genre_id: name}}
+    """
+    for media_type, table in tables.items():
+        if table:
+            _genre_tables[media_type] = dict(table)
+
+
+@traced('genres.lookup')
 def get_genre_names_from_ids(genre_ids, media_type):
     """
-    Fetch genre list of dictionaries, convert to dictionary
+    Look up the genre table for the media type
     and match with Title's genres_ids
 
     Args:
@@ -22,8 +69,7 @@ def get_genre_names_from_ids(genre_ids, media_type):
     """
     if not isinstance(genre_ids, list):
         raise TypeError("genre_ids must be a list of integers")
-    genre_list = get_genre_mapping(media_type, TMDB_API_KEY)
-    genre_dict = {genre['id']: genre['name'] for genre in genre_list}
+    genre_dict = get_genre_table(media_type)
     matched_genres = [
         genre_dict.get(genre_id)
         for genre_id in genre_ids
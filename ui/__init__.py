@@ -2,16 +2,17 @@
 Initializes the UI layer by exposing menus, input handlers, and display logic.
 
 Combines user interaction features from various modules for easy import.
+The handlers, which pull in the sheets, TMDb and recommendation layers,
+are imported on first access so the main menu can render without them.
 """
+import importlib
 
-from .display import display_title_entries
-from .handlers import (
-    handle_search,
-    handle_title_selection,
-    handle_watchlist_or_watched,
-    handle_toggle_watched,
-    handle_change_rating,
-    handle_delete
+from .display import display_title_entries, format_title_entries
+from .progress import (
+    OperationCancelled,
+    run_task,
+    run_tasks,
+    uninterruptible
 )
 from .user_input import (
     get_user_search_input,
@@ -30,9 +31,17 @@ from .menus import (
 
 __all__ = [
     "display_title_entries",
+    "format_title_entries",
+    "ListView",
+    "OperationCancelled",
+    "run_task",
+    "run_tasks",
+    "uninterruptible",
     "handle_search",
     "handle_title_selection",
     "handle_watchlist_or_watched",
+    "handle_find",
+    "handle_list_action",
     "handle_toggle_watched",
     "handle_change_rating",
     "handle_delete",
@@ -47,3 +56,25 @@ __all__ = [
     "handle_action_with_index",
     "get_menu_choice",
 ]
+
+# Lazily imported names -> submodule
+_LAZY_IMPORTS = {
+    name: '.handlers' for name in (
+        "handle_search",
+        "handle_title_selection",
+        "handle_watchlist_or_watched",
+        "handle_find",
+        "handle_list_action",
+        "handle_toggle_watched",
+        "handle_change_rating",
+        "handle_delete",
+    )
+}
+_LAZY_IMPORTS["ListView"] = '.list_view'
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -16,19 +16,38 @@ def display_title_entries(title_objects, mode, max_results=None):
     Returns:
         (list[Title]): Title objects list slice [:max_results]
     """
+    lines = format_title_entries(title_objects[:max_results], mode)
+    print('\n'.join(lines))
+    return title_objects[:max_results]
+
+
+def format_title_entries(title_objects, mode, start=1):
+    """
+    Lines of the title table, so a page can be written at once
+
+    Args:
+        title_objects (list): Title objects to show
+        mode (str): list or results type, selects header and columns
+        start (int): number shown for the first title
+
+    Returns:
+        list[str]: lines without line breaks
+    """
     headers = {
         'search': 'Search results',
         'watchlist': 'Your watchlist',
         'watched': 'Your watched titles',
         'recommendation': 'Recommended titles',
         'trending': '🔥 Trending titles',
+        'find': 'Matches in your list',
     }
 
-    print(f"\n{headers.get(mode, 'Titles')}:\n")
+    lines = ['', f"{headers.get(mode, 'Titles')}:", '']
     is_watched = mode == 'watched'
-    for index, title in enumerate(title_objects[:max_results], start=1):
+    is_found = mode == 'find'
+    for index, title in enumerate(title_objects, start=start):
         if not hasattr(title, "metadata"):
-            print(f"⚠️  Skipping item without metadata: {title}")
+            lines.append(f"⚠️  Skipping item without metadata: {title}")
             continue  # Skip invalid entry
         title_str = title.metadata.title
         if len(str(title_str)) > 30:
@@ -40,10 +59,15 @@ def display_title_entries(title_objects, mode, max_results=None):
         line = f"{index:>2} | {title_str:<30} | {media_type:<6} | {release:<4}"
         if is_watched:
             line += f" | Rating: {rating:<4}"
-        print(line)
-        if not is_watched:
+        elif is_found:
+            line += (f" | Watched, rating: {rating}"
+                     if title.user_data.watched else " | Watchlist")
+        elif mode != 'watchlist' and getattr(title, 'in_library', None):
+            line += " | ✓ In your list"
+        lines.append(line)
+        if not is_watched and not is_found:
             if len(overview) > 100:
                 overview = overview[:97].rstrip() + "..."
-            print(f'     {overview}')
-            print()
-    return title_objects[:max_results]
+            lines.append(f'     {overview}')
+            lines.append('')
+    return lines
@@ -8,16 +8,15 @@ from models.title import (
     prepare_title_objects_from_tmdb
 )
 from sheets.utils import build_title_objects_from_sheet
-from sheets.query import (
-    check_for_duplicate,
-    get_titles_by_watch_status
-    )
+from sheets.query import check_for_duplicate
+from sheets.library import get_library, get_library_membership
 from sheets.crud import (
     save_item_to_list,
     update_item_in_list,
     delete_item_in_list
     )
 from ui.menus import handle_list_menu
+from ui.list_view import ListView
 from ui.user_input import (
     get_user_search_input,
     get_watch_status,
@@ -25,6 +24,10 @@ from ui.user_input import (
     select_item_from_results
 )
 from ui.display import display_title_entries
+from ui.progress import run_tasks
+
+# Matches shown by "Find a title in my list"
+FIND_RESULTS = 10
 
 
 def handle_search(mode, google_sheet):
@@ -39,9 +42,16 @@ def handle_search(mode, google_sheet):
         search_query = get_user_search_input()
         print(f'\n🔎 Searching for {search_query}...')
         # 2. Use the query to fetch API results
-        search_results = fetch_tmdb_results(search_query, TMDB_API_KEY)
+        #    while the library is read for the membership check
+        search_results, membership = run_tasks('Searching TMDb', [
+            (fetch_tmdb_results, search_query, TMDB_API_KEY),
+            (get_library_membership, google_sheet),
+            ])
         # 3. Format TMDB titles
-        results_title_objects = prepare_title_objects_from_tmdb(search_results)
+        results_title_objects = prepare_title_objects_from_tmdb(
+            search_results,
+            membership=membership
+            )
         if not results_title_objects:
             print("\n❌  No results found. Try another search.")
             continue
@@ -72,14 +82,17 @@ def handle_title_selection(selected_title, google_sheet):
     Check for duplicates, verify if item is_watched,
     get rating, if applicable
     and save item to Google Sheets
+    The duplicate check is skipped for titles the membership
+    filter already found to be new
 
     Args:
         selected_title (obj): selected Title object
         google_sheet (gspread.Spreadsheet): Initialized google sheet
     """
-    is_duplicate, _ = check_for_duplicate(selected_title, google_sheet)
-    if is_duplicate:
-        return
+    if selected_title.in_library is not False:
+        is_duplicate, _ = check_for_duplicate(selected_title, google_sheet)
+        if is_duplicate:
+            return
     if get_watch_status(selected_title):
         get_title_rating(selected_title)
     else:
@@ -90,30 +103,81 @@ def handle_title_selection(selected_title, google_sheet):
 def handle_watchlist_or_watched(list_type, google_sheet):
     """
     Handle manage list action options
+    The list is shown a page at a time (see ui.list_view)
 
     Args:
         list_type (_str_): list of items to be managed (watched/watchlist)
         google_sheet (gspread.Spreadsheet) : Initialized Google Sheet
     """
     print(f'\nLoading {list_type} menu...')
-    # Set watch_flag to True if choice is watched
-    watched_flag = list_type == 'watched'
-    titles_data = get_titles_by_watch_status(google_sheet, watched_flag)
-    if not titles_data:
+    library = get_library(google_sheet)
+    if library is None:
+        print("\n❌  No worksheet found.")
+        return
+    # one page at a time, Titles are built for the visible rows only
+    view = ListView(library, list_type)
+    if not len(view):
         print(f"\n❌  No {list_type} title found.")
         return
-    titles = build_title_objects_from_sheet(titles_data)
-    display_title_entries(titles, list_type)
-    action, index = handle_list_menu(titles, list_type)
+    action, selected_title = view.select()
+    if action is None:
+        return
+    handle_list_action(action, selected_title, google_sheet)
+
+
+def handle_find(mode, google_sheet):
+    """
+    Fuzzy find titles in the user's list by name, without TMDb
+    requests, and act on one of the matches
+
+    Args:
+        mode (str): 'find'
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+    """
+    library = get_library(google_sheet)
+    if library is None:
+        print("\n❌  No worksheet found.")
+        return
+    if not len(library):
+        print("\n❌  Your list is empty. Search and add a title first!")
+        return
+    query = get_user_search_input("\nWhich title are you looking for? ")
+    rows = library.search(query, FIND_RESULTS)
+    if not rows:
+        print(f"\n❌  No title like '{query}' in your list.")
+        return
+    titles = build_title_objects_from_sheet(library.records_at(rows))
+    display_title_entries(titles, mode)
+    action, index = handle_list_menu(titles, mode)
     if action is None:
         return
     selected_title = titles[index]
+    if action == 'r' and not selected_title.user_data.watched:
+        print("\n⚠️  Only watched titles have a rating. "
+              "Use 'w' to mark it as watched.")
+        return
+    handle_list_action(action, selected_title, google_sheet)
+
+
+def handle_list_action(action, selected_title, google_sheet):
+    """
+    Run a list menu action on a title
+
+    Args:
+        action (str): 'w', 'r', 'd' or 's'
+        selected_title (Title): title from the user's list
+        google_sheet (gspread.Spreadsheet): Initialized Google Sheet
+    """
     if action == 'w':
         handle_toggle_watched(selected_title, google_sheet)
     elif action == 'r':
         handle_change_rating(selected_title, google_sheet)
     elif action == 'd':
         handle_delete(selected_title, google_sheet)
+    elif action == 's':
+        # imported here: recommendations depends on this module
+        from recommendations.handlers import handle_more_like_this
+        handle_more_like_this(selected_title, google_sheet)
 
 
 def handle_toggle_watched(title, google_sheet):
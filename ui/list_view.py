@@ -0,0 +1,178 @@
+"""
+Paged view of the watchlist or the watched titles.
+
+Shows one screen of titles at a time. The view keeps only the row
+positions of its list, from one scan of the library's watch status
+column; Title objects are built for the rows on the current page (and
+for the row an action picks), and every page is written at once.
+Numbers are positions in the whole list, so 'd 57' acts on the 57th
+title whichever page is shown.
+"""
+import math
+import os
+import shutil
+import sys
+from sheets.utils import build_title_objects_from_sheet
+from ui.display import format_title_entries
+from ui.menus import handle_list_menu
+
+# Terminal lines taken by the list header, page line and list menu
+MENU_LINES = 16
+# Fewest titles shown per page, however small the terminal
+MIN_PAGE_SIZE = 5
+
+
+def fit_page_size(list_type):
+    """
+    Titles that fit on one screen with the list menu
+    REELTRACKER_PAGE_SIZE overrides it, unless it isn't a number
+
+    Args:
+        list_type (str): 'watched' (one line per title) or 'watchlist'
+            (title, overview and a blank line)
+
+    Returns:
+        int: titles per page
+    """
+    page_size = os.getenv('REELTRACKER_PAGE_SIZE')
+    if page_size:
+        try:
+            return max(1, int(page_size))
+        except ValueError:
+            pass
+    lines = shutil.get_terminal_size().lines
+    lines_per_title = 1 if list_type == 'watched' else 3
+    return max(MIN_PAGE_SIZE, (lines - MENU_LINES) // lines_per_title)
+
+
+class ListView:
+    """
+    One page of a user's list at a time
+
+    Attributes:
+        library (Library): the user's library
+        list_type (str): 'watched' or 'watchlist'
+        page_size (int): titles per page
+        page (int): 0-based current page
+    """
+    def __init__(self, library, list_type, page_size=None):
+        """
+        Args:
+            library (Library): the user's library
+            list_type (str): 'watched' or 'watchlist'
+            page_size (int, optional): titles per page, fit to the
+                terminal if None
+        """
+        self.library = library
+        self.list_type = list_type
+        self.page_size = page_size or fit_page_size(list_type)
+        self.page = 0
+        self._revision = None
+        # list position -> library row index
+        self._positions = []
+        # list position -> Title, for the page shown
+        self._titles = {}
+        self.refresh()
+
+    def __len__(self):
+        return len(self._positions)
+
+    @property
+    def page_count(self):
+        return max(1, math.ceil(len(self) / self.page_size))
+
+    def refresh(self):
+        """
+        Read the list's row positions again if the library changed
+
+        Returns:
+            bool: True if it changed since the last call
+        """
+        with self.library.lock:
+            if self.library.revision == self._revision:
+                return False
+            self._revision = self.library.revision
+            self._positions = self.library.row_indexes(
+                self.list_type == 'watched'
+                )
+        self._titles = {}
+        self.go_to(self.page)
+        return True
+
+    def go_to(self, page):
+        """
+        Args:
+            page (int): 0-based page, clamped to the existing pages
+        """
+        self.page = max(0, min(page, self.page_count - 1))
+
+    def page_titles(self):
+        """
+        Build the Titles of the current page
+
+        Returns:
+            list[Title]: titles of the page, in list order
+        """
+        start = self.page * self.page_size
+        rows = self._positions[start:start + self.page_size]
+        titles = build_title_objects_from_sheet(self.library.records_at(rows))
+        self._titles = dict(enumerate(titles, start=start))
+        return titles
+
+    def title_at(self, position):
+        """
+        Args:
+            position (int): 0-based position in the whole list
+
+        Returns:
+            Title: the title at that position
+        """
+        title = self._titles.get(position)
+        if title is None:
+            title = build_title_objects_from_sheet(
+                self.library.records_at([self._positions[position]])
+                )[0]
+        return title
+
+    def render(self):
+        """
+        Returns:
+            str: the current page, ready to be written at once
+        """
+        start = self.page * self.page_size
+        titles = self.page_titles()
+        lines = format_title_entries(titles, self.list_type, start + 1)
+        if self.page_count > 1:
+            lines.append(
+                f"Page {self.page + 1} of {self.page_count} "
+                f"(titles {start + 1}-{start + len(titles)} of {len(self)})"
+                )
+        return '\n'.join(lines) + '\n'
+
+    def select(self):
+        """
+        Show pages until the user picks an action on a title
+
+        Returns:
+            tuple[str, Title] or tuple[None, None]: action and title,
+            or None, None if the user went back to the main menu
+        """
+        while True:
+            self.refresh()
+            sys.stdout.write(self.render())
+            sys.stdout.flush()
+            action, index = handle_list_menu(
+                self, self.list_type, self.page_count
+                )
+            if action is None:
+                return None, None
+            if action in ('n', 'p'):
+                self.go_to(self.page + (1 if action == 'n' else -1))
+                continue
+            if action == 'g':
+                self.go_to(index)
+                continue
+            if self.refresh():
+                print("\n⚠️  Your list has changed. Here it is again.")
+                continue
+            return action, self.title_at(index)
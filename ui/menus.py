@@ -13,6 +13,7 @@ menus = {
             "3": "Manage watched titles",
             "4": "Get recommendation",
             "5": "See what's trending",
+            "6": "Find a title in my list",
             "e": "Exit"
         },
         "valid_choices": {
@@ -21,6 +22,7 @@ menus = {
             "3": "watched",
             "4": "recommendation",
             "5": "trending",
+            "6": "find",
             "e": "exit"
         }
     },
@@ -37,6 +39,7 @@ menus = {
         "title": "Manage Watchlist:",
         "options": {
             "w <number>": "Mark as watched and rate",
+            "s <number>": "More like this",
             "d <number>": "Delete title",
             "m": "Return to main menu"
         }
@@ -46,6 +49,17 @@ menus = {
         "options": {
             "r <number>": "Change rating",
             "w <number>": "Move to watchlist",
+            "s <number>": "More like this",
+            "d <number>": "Delete title",
+            "m": "Return to main menu"
+        }
+    },
+    "find": {
+        "title": "Matching titles options:",
+        "options": {
+            "w <number>": "Mark as watched / move to watchlist",
+            "r <number>": "Change rating (watched titles)",
+            "s <number>": "More like this",
             "d <number>": "Delete title",
             "m": "Return to main menu"
         }
@@ -69,6 +83,10 @@ menus = {
 }
 
 
+# Shown below the list menus when the list has more than one page
+PAGING_HINT = "n → Next page | p → Previous page | g <page> → Go to page"
+
+
 def display_menu(menu_key):
     """
     Dynamically display menu data from menu.py based on given menu_key
@@ -79,15 +97,18 @@ def display_menu(menu_key):
         print(f"{key} → {label}")
 
 
-def handle_list_menu(title_list, list_type):
+def handle_list_menu(title_list, list_type, page_count=1):
     """
      Display the menu with CRUD actions for watched / watchlist
      Args:
-        title_list (list): list with title objects from Sheets
+        title_list (Sized): titles from Sheets, or a ListView of them
         list_type (str): identifier of list (watched/watchlist)
+        page_count (int): pages of the list view, adds the paging
+            commands if more than one
      Returns:
-        command (str): user action
-        title (obj): selected title, or None if user exits.
+        command (str): user action, or 'n', 'p', 'g' to page
+        index (int): 0-based index of the selected title (of the page
+            for 'g'), or None if user exits.
     """
     valid_actions = {
         key.split()[0] for key in menus[list_type]['options'].keys()
@@ -96,12 +117,24 @@ def handle_list_menu(title_list, list_type):
 
     while True:
         display_menu(list_type)
+        if page_count > 1:
+            print(PAGING_HINT)
         print("\nEnter a command like 'd 2' or 'w 1'")
         print("You can also type 'm' to go back to main menu.")
         command = input("> ").strip().lower()
 
         if command == 'm':
             return None, None
+        if page_count > 1 and command in ('n', 'p'):
+            return command, None
+        if page_count > 1 and command.startswith('g '):
+            _, page, error = handle_action_with_index(
+                command, {'g'}, page_count
+                )
+            if error:
+                print(error)
+                continue
+            return 'g', page
         action, index, error = handle_action_with_index(
             command,
             valid_actions,
@@ -0,0 +1,177 @@
+"""
+Runs long operations behind a spinner and lets Ctrl-C cancel them.
+
+The operation runs on a worker thread while the calling thread draws a
+spinner with the elapsed time. Ctrl-C (KeyboardInterrupt, delivered to
+the main thread) abandons the operation and raises OperationCancelled,
+which the main menu loop reports before showing the menu again. An
+abandoned operation finishes in the background, bounded by the request
+timeouts, and its result is dropped; responses it fetched still land in
+the caches. Independent operations can run concurrently behind one
+spinner with run_tasks(). Writes that must not be cut in half run
+inside uninterruptible(), which holds Ctrl-C back until they finish.
+"""
+import contextvars
+import itertools
+import signal
+import sys
+import threading
+import time
+
+SPINNER_FRAMES = '⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏'
+# Seconds between frames
+FRAME_INTERVAL = 0.1
+# Operations faster than this finish without drawing a spinner
+SPINNER_DELAY = 0.2
+
+
+class OperationCancelled(Exception):
+    """
+    Raised when the user cancels an operation with Ctrl-C
+    """
+
+
+class _DeferredInterrupt:
+    """
+    Context manager deferring Ctrl-C until the block has run
+    Used around a Sheets write and the matching library update, so a
+    Ctrl-C can't leave the local copy out of step with the sheet. A
+    Ctrl-C received meanwhile is raised once the block completes.
+    Outside the main thread, where SIGINT isn't delivered, it does
+    nothing.
+    """
+    def __init__(self):
+        self._previous = None
+        self._received = False
+
+    def __enter__(self):
+        if threading.current_thread() is threading.main_thread():
+            self._previous = signal.signal(signal.SIGINT, self._defer)
+        return self
+
+    def _defer(self, signum, frame):
+        self._received = True
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._previous is None:
+            return
+        signal.signal(signal.SIGINT, self._previous)
+        if self._received and exc_type is None and callable(self._previous):
+            self._previous(signal.SIGINT, None)
+
+
+def uninterruptible():
+    """
+    Hold Ctrl-C back while a block runs, see _DeferredInterrupt
+
+    Returns:
+        context manager
+    """
+    return _DeferredInterrupt()
+
+
+def _is_terminal():
+    isatty = getattr(sys.stdout, 'isatty', None)
+    try:
+        return bool(isatty and isatty())
+    except ValueError:  # closed stream
+        return False
+
+
+def run_tasks(label, calls):
+    """
+    Run operations concurrently behind a spinner until all finished
+
+    Every call runs on its own daemon thread, in a copy of the caller's
+    context. If a call raises, the exception is re-raised here once all
+    calls finished.
+
+    Args:
+        label (str): what is being done, e.g. 'Searching TMDb'
+        calls (list[tuple]): (func, *args) tuples
+
+    Returns:
+        list: the results, aligned with calls
+
+    Raises:
+        OperationCancelled: if the user pressed Ctrl-C
+    """
+    results = [None] * len(calls)
+    errors = [None] * len(calls)
+    remaining = [len(calls)]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def run(index, func, args):
+        try:
+            results[index] = func(*args)
+        except BaseException as e:  # re-raised on the calling thread
+            errors[index] = e
+        finally:
+            with lock:
+                remaining[0] -= 1
+                if not remaining[0]:
+                    done.set()
+
+    for index, (func, *args) in enumerate(calls):
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(run, index, func, args),
+            daemon=True
+            ).start()
+    if not calls:
+        done.set()
+    _wait(label, done)
+    for error in errors:
+        if error is not None:
+            raise error
+    return results
+
+
+def run_task(label, func, *args):
+    """
+    Run one operation behind a spinner, see run_tasks()
+
+    Args:
+        label (str): what is being done, e.g. 'Searching TMDb'
+        func (callable): operation
+        *args: its arguments
+
+    Returns:
+        the operation's result
+
+    Raises:
+        OperationCancelled: if the user pressed Ctrl-C
+    """
+    return run_tasks(label, [(func, *args)])[0]
+
+
+def _wait(label, done):
+    """
+    Wait for done, drawing the spinner on a terminal once the wait
+    takes longer than SPINNER_DELAY
+    """
+    started = time.perf_counter()
+    drawn = False
+    frames = itertools.cycle(SPINNER_FRAMES)
+    try:
+        if done.wait(SPINNER_DELAY):
+            return
+        terminal = _is_terminal()
+        while not done.wait(0 if not drawn else FRAME_INTERVAL):
+            elapsed = time.perf_counter() - started
+            if terminal:
+                sys.stdout.write(
+                    f"\r{next(frames)} {label}... {elapsed:.1f}s "
+                    "(Ctrl-C to cancel)"
+                    )
+                sys.stdout.flush()
+            elif not drawn:
+                print(f"\n⏳ {label}...", flush=True)
+            drawn = True
+    except KeyboardInterrupt:
+        raise OperationCancelled(label) from None
+    finally:
+        if drawn and terminal:
+            sys.stdout.write('\r\033[K')
+            sys.stdout.flush()
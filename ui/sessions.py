@@ -0,0 +1,302 @@
+"""
+Serves many interactive sessions from one process.
+
+A terminal session per process gives every user cold caches, a fresh
+interpreter and a Google client of their own. The SessionManager accepts
+connections on a TCP socket with asyncio and runs each session's menu
+loop on a thread of a shared pool, so the TMDb response cache, the genre
+tables, the title identity map, the item graph and the Google client are
+loaded once and shared. What belongs to a session is small: its
+spreadsheet handle and library, its console and its context variables.
+
+The menus are plain input() and print() calls. While serving, sys.stdin
+and sys.stdout are replaced by routers that forward to the console of
+the session the calling thread works for (the `current_console` context
+variable), so the UI layer runs unchanged. Every connection is a quota
+tenant of its own (peer address and session number), drawing on its
+share of the API quotas (see utils.quota), so one busy user can't
+starve the others even when they all use the same spreadsheet.
+
+Protocol: the client sends the spreadsheet name on the first line (an
+empty line opens the default one), then talks to the menu line by line,
+e.g. `nc localhost 8765`. Only the spreadsheets the server was started
+with can be opened; any other name closes the connection.
+"""
+import asyncio
+import contextvars
+import itertools
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.quota import QuotaGovernor, current_tenant, set_quota_governor
+
+DEFAULT_PORT = 8765
+# Concurrent sessions; further connections are turned away
+MAX_SESSIONS = 64
+# Stack size of the session threads, well above what the menus need
+SESSION_STACK_SIZE = 512 * 1024
+# Longest line accepted from a client
+MAX_LINE = 4096
+
+# Console of the session the current context works for
+current_console = contextvars.ContextVar('current_console', default=None)
+
+
+class SessionConsole:
+    """
+    Text stream connecting a session thread to its client
+
+    Written from the session thread, sent by the event loop; lines
+    received by the event loop are queued for readline().
+    """
+    def __init__(self, loop, writer):
+        """
+        Args:
+            loop (asyncio.AbstractEventLoop): loop serving the client
+            writer (asyncio.StreamWriter): client connection
+        """
+        self._loop = loop
+        self._writer = writer
+        self._lines = queue.SimpleQueue()
+
+    def write(self, text):
+        if text:
+            self._loop.call_soon_threadsafe(
+                self._send, text.replace('\n', '\r\n').encode()
+                )
+        return len(text)
+
+    def _send(self, data):
+        if not self._writer.is_closing():
+            self._writer.write(data)
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        """
+        Returns:
+            str: next line from the client, '' once it disconnected
+        """
+        return self._lines.get()
+
+    def feed(self, line):
+        """
+        Queue a line from the client, '' for end of input
+        """
+        self._lines.put(line)
+
+
+class ConsoleRouter:
+    """
+    Stand-in for sys.stdin or sys.stdout that forwards to the current
+    session's console, or to the process's stream outside a session
+    """
+    def __init__(self, stream):
+        self._stream = stream
+
+    def _target(self):
+        return current_console.get() or self._stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def readline(self, *args):
+        return self._target().readline(*args)
+
+    def __getattr__(self, name):
+        # e.g. fileno, which a session console doesn't have, so input()
+        # falls back to write() and readline() inside sessions
+        return getattr(self._target(), name)
+
+
+class Session:
+    """
+    State of one connected user
+
+    Attributes:
+        sheet_name (str): spreadsheet the session works on
+        tenant (str): quota tenant, unique to the connection
+        console (SessionConsole): the session's input and output
+    """
+    def __init__(self, sheet_name, tenant, console):
+        self.sheet_name = sheet_name
+        self.tenant = tenant
+        self.console = console
+
+    def run(self, session_main, client):
+        """
+        Run the session on the current thread, in a context of its own
+
+        Args:
+            session_main (callable): session_main(sheet_name, client)
+            client (gspread.Client): shared authorized client
+        """
+        contextvars.Context().run(self._run, session_main, client)
+
+    def _run(self, session_main, client):
+        current_console.set(self.console)
+        current_tenant.set(self.tenant)
+        try:
+            session_main(self.sheet_name, client)
+        except EOFError:
+            pass  # client disconnected at a prompt
+
+
+class SessionManager:
+    """
+    asyncio server running interactive sessions on a thread pool
+
+    Attributes:
+        sessions (set[Session]): connected sessions
+        max_sessions (int): sessions served at once
+        allowed_sheets (frozenset[str]): spreadsheets clients may open
+    """
+    def __init__(
+        self,
+        session_main,
+        default_sheet,
+        max_sessions=MAX_SESSIONS,
+        governor=None,
+        allowed_sheets=None
+    ):
+        """
+        Args:
+            session_main (callable): session_main(sheet_name, client),
+                runs one session's menu loop until the user exits
+            default_sheet (str): spreadsheet opened for an empty first line
+            max_sessions (int): sessions served at once
+            governor (QuotaGovernor, optional): API quotas, a default
+                QuotaGovernor if None
+            allowed_sheets (Iterable[str], optional): spreadsheets
+                clients may open besides default_sheet
+        """
+        self.session_main = session_main
+        self.default_sheet = default_sheet
+        self.allowed_sheets = frozenset(allowed_sheets or ()) | {
+            default_sheet
+            }
+        self.max_sessions = max_sessions
+        self._session_ids = itertools.count(1)
+        self.governor = governor or QuotaGovernor()
+        self.sessions = set()
+        self._client = None
+        self._executor = None
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """
+        Authorize once, then serve sessions until cancelled
+
+        Args:
+            host (str): interface to listen on
+            port (int): TCP port
+        """
+        from sheets.auth import authorize_client
+
+        loop = asyncio.get_running_loop()
+        threading.stack_size(SESSION_STACK_SIZE)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_sessions, thread_name_prefix='session'
+            )
+        set_quota_governor(self.governor)
+        sys.stdin = ConsoleRouter(sys.stdin)
+        sys.stdout = ConsoleRouter(sys.stdout)
+        try:
+            self._client = await loop.run_in_executor(
+                self._executor, authorize_client
+                )
+            server = await asyncio.start_server(
+                self._handle, host, port, limit=MAX_LINE
+                )
+            async with server:
+                print(f"Serving ReelTracker sessions on {host}:{port}",
+                      flush=True)
+                await server.serve_forever()
+        finally:
+            sys.stdin = sys.stdin._stream
+            sys.stdout = sys.stdout._stream
+            set_quota_governor(None)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle(self, reader, writer):
+        """
+        Serve one connection: read the spreadsheet name, then pump its
+        input to the session thread until either side ends
+        """
+        loop = asyncio.get_running_loop()
+        if len(self.sessions) >= self.max_sessions:
+            writer.write("\n⚠️  Too many sessions, try again later.\r\n"
+                         .encode())
+            await self._close(writer)
+            return
+        try:
+            first_line = await reader.readline()
+        except (ConnectionError, ValueError):
+            first_line = b''
+        if not first_line:
+            await self._close(writer)
+            return
+        sheet_name = (
+            first_line.decode(errors='replace').strip() or self.default_sheet
+            )
+        if sheet_name not in self.allowed_sheets:
+            writer.write(f"\n❌  Spreadsheet '{sheet_name}' is not served "
+                         "here.\r\n".encode())
+            await self._close(writer)
+            return
+        peer = writer.get_extra_info('peername') or ('?', 0)
+        tenant = f'{peer[0]}:{peer[1]}#{next(self._session_ids)}'
+        session = Session(sheet_name, tenant, SessionConsole(loop, writer))
+        self.sessions.add(session)
+        running = loop.run_in_executor(
+            self._executor, session.run, self.session_main, self._client
+            )
+        try:
+            await self._pump_input(reader, session, running)
+        finally:
+            self.sessions.discard(session)
+            self.governor.forget_tenant(session.tenant)
+            await self._close(writer)
+
+    @staticmethod
+    async def _pump_input(reader, session, running):
+        """
+        Feed client lines to the session until it ends or the client
+        disconnects, then let the session finish
+        """
+        while not running.done():
+            read = asyncio.ensure_future(reader.readline())
+            await asyncio.wait(
+                {read, running}, return_when=asyncio.FIRST_COMPLETED
+                )
+            if not read.done():
+                read.cancel()
+                break
+            try:
+                line = read.result()
+            except (ConnectionError, ValueError):
+                line = b''
+            session.console.feed(
+                line.replace(b'\r\n', b'\n').decode(errors='replace')
+                )
+            if not line:
+                break
+        try:
+            await running
+        except Exception as e:  # keep serving the other sessions
+            print(f"Session {session.tenant} on '{session.sheet_name}' "
+                  f"failed: {e!r}",
+                  file=sys.__stderr__)
+
+    @staticmethod
+    async def _close(writer):
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
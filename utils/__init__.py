@@ -5,17 +5,45 @@ Includes timestamping, popularity calculations, and formatting helpers.
 """
 
 from .utils import (
+    parse_iso_date,
     extract_year,
+    timestamp_to_epoch,
     get_current_timestamp,
     sort_items_by_popularity,
     get_popularity,
     calculate_weighted_popularity)
+from .tracing import (
+    tracer,
+    traced,
+    trace_span,
+    trace_run,
+    enable_tracing
+)
+from .quota import (
+    QuotaExceeded,
+    QuotaGovernor,
+    current_tenant,
+    set_quota_governor,
+    acquire_quota
+)
 
 
 __all__ = [
+    "parse_iso_date",
     "extract_year",
+    "timestamp_to_epoch",
     "get_current_timestamp",
     "sort_items_by_popularity",
     "get_popularity",
     "calculate_weighted_popularity",
+    "tracer",
+    "traced",
+    "trace_span",
+    "trace_run",
+    "enable_tracing",
+    "QuotaExceeded",
+    "QuotaGovernor",
+    "current_tenant",
+    "set_quota_governor",
+    "acquire_quota",
 ]
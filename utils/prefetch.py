@@ -0,0 +1,149 @@
+"""
+Idle-time prefetch scheduler.
+
+Runs a plan of small warm-up units on a daemon thread while the user
+sits at a prompt, e.g. the main menu. Units run one at a time with a
+short pause in between, only while the scheduler is resumed: pausing
+(when the user picks an option) or cancelling takes effect before the
+next unit. Each unit returns the number of requests it sent, and the
+scheduler stops for good once the session's request budget is spent.
+"""
+import contextvars
+import os
+import threading
+
+# Requests the prefetcher may send per session
+DEFAULT_REQUEST_BUDGET = 20
+# Seconds between units, so user work is never queued behind a burst
+UNIT_PAUSE = 0.05
+
+
+class PrefetchScheduler:
+    """
+    Runs a prefetch plan during idle periods
+
+    Every resume() starts a new pass over the plan; units whose caches
+    are already warm cost nothing, so passes after a change to the
+    library only fetch what is missing.
+
+    Attributes:
+        budget (int): maximum number of requests for the session
+        spent (int): requests sent so far
+    """
+    def __init__(self, plan, budget=None, pause=UNIT_PAUSE):
+        """
+        Args:
+            plan (callable): plan() -> iterable of units, each a callable
+                returning the number of requests it sent; called on the
+                scheduler thread, where it may block
+            budget (int, optional): request budget, REELTRACKER_PREFETCH_
+                BUDGET or DEFAULT_REQUEST_BUDGET if None (or if the
+                variable isn't a number)
+            pause (float): seconds to wait between units
+        """
+        if budget is None:
+            try:
+                budget = int(os.getenv(
+                    'REELTRACKER_PREFETCH_BUDGET', DEFAULT_REQUEST_BUDGET
+                    ))
+            except ValueError:
+                budget = DEFAULT_REQUEST_BUDGET
+        self.plan = plan
+        self.budget = budget
+        self.pause_seconds = pause
+        self.spent = 0
+        self._condition = threading.Condition()
+        self._idle = False
+        self._cancelled = False
+        # incremented by resume(), one pass over the plan per value
+        self._generation = 0
+        self._thread = None
+
+    @property
+    def exhausted(self):
+        """
+        bool: True once the request budget is spent
+        """
+        return self.spent >= self.budget
+
+    def start(self):
+        """
+        Start the scheduler thread, paused until resume()
+        It runs in a copy of the caller's context, so a session's
+        prefetching draws on that session's quota
+        """
+        if self._thread is None and self.budget > 0:
+            self._thread = threading.Thread(
+                target=contextvars.copy_context().run, args=(self._run,),
+                name='prefetch', daemon=True
+                )
+            self._thread.start()
+
+    def resume(self):
+        """
+        Mark the start of an idle period
+        """
+        with self._condition:
+            self._idle = True
+            self._generation += 1
+            self._condition.notify_all()
+
+    def pause(self):
+        """
+        Mark the end of an idle period; the unit in progress completes
+        """
+        with self._condition:
+            self._idle = False
+
+    def cancel(self):
+        """
+        Stop the scheduler after the unit in progress
+        """
+        with self._condition:
+            self._cancelled = True
+            self._condition.notify_all()
+
+    def _may_continue(self, generation):
+        with self._condition:
+            return (
+                not self._cancelled and self._idle
+                and self._generation == generation
+                )
+
+    def _run(self):
+        done = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._cancelled or (
+                        self._idle and self._generation != done
+                        )
+                    )
+                if self._cancelled:
+                    return
+                generation = self._generation
+            try:
+                finished = self._run_pass(generation)
+            except Exception:  # prefetching is best effort
+                return
+            if self.exhausted:
+                return
+            if finished:
+                done = generation
+
+    def _run_pass(self, generation):
+        """
+        Run the plan's units while the idle period lasts
+
+        Returns:
+            bool: True if every unit ran
+        """
+        for unit in self.plan():
+            if not self._may_continue(generation) or self.exhausted:
+                return False
+            self.spent += unit()
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._cancelled, timeout=self.pause_seconds
+                    )
+        return True
@@ -0,0 +1,193 @@
+"""
+Per-tenant quota governor for the shared API limits.
+
+When many sessions share one process (see ui.sessions), they also share
+one TMDb API key and one Google service account, and so one set of rate
+limits. The governor keeps a token bucket per API for the whole process
+and one per tenant with a fraction of its rate, so a single busy user is
+slowed down before the others notice.
+
+The tenant is taken from the `current_tenant` context variable, set by
+the session; requests made outside a session only draw on the shared
+bucket. Without a governor (the single-user CLI) acquire_quota() is a
+no-op.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+# Tenant the current context works for, None outside a session
+current_tenant = ContextVar('current_tenant', default=None)
+
+# API -> (requests per second, burst), shared by the process
+DEFAULT_LIMITS = {
+    'tmdb': (4.0, 40),      # TMDb allows about 40 requests per 10 s
+    'sheets': (1.0, 60),    # Google Sheets: 60 requests per minute per user
+}
+# Fraction of each shared limit a single tenant may use
+DEFAULT_TENANT_SHARE = 0.25
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised when a request can't be granted within the allowed wait
+    """
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously up to its capacity
+
+    Attributes:
+        rate (float): tokens added per second
+        capacity (float): maximum number of tokens
+        tokens (float): tokens currently available
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+            )
+        self._updated = now
+
+    def wait_time(self):
+        """
+        float: seconds until a token is available, 0 if one is
+        """
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class QuotaGovernor:
+    """
+    Grants API requests against shared and per-tenant token buckets
+
+    Attributes:
+        limits (dict): API -> (requests per second, burst)
+        tenant_share (float): fraction of each limit one tenant may use
+    """
+    def __init__(self, limits=None, tenant_share=None):
+        """
+        Args:
+            limits (dict, optional): API -> (requests per second, burst),
+                defaults to DEFAULT_LIMITS
+            tenant_share (float, optional): REELTRACKER_TENANT_SHARE if
+                None; DEFAULT_TENANT_SHARE if that isn't a number in (0, 1]
+        """
+        if tenant_share is None:
+            try:
+                tenant_share = float(os.getenv(
+                    'REELTRACKER_TENANT_SHARE', DEFAULT_TENANT_SHARE
+                    ))
+            except ValueError:
+                tenant_share = DEFAULT_TENANT_SHARE
+        # a share of 0 or less would never grant a token
+        if not 0 < tenant_share <= 1:
+            tenant_share = DEFAULT_TENANT_SHARE
+        self.limits = dict(limits or DEFAULT_LIMITS)
+        self.tenant_share = tenant_share
+        self._lock = threading.Lock()
+        self._shared = {
+            api: TokenBucket(rate, burst)
+            for api, (rate, burst) in self.limits.items()
+            }
+        # (api, tenant) -> TokenBucket
+        self._tenants = {}
+
+    def _tenant_bucket(self, api, tenant):
+        bucket = self._tenants.get((api, tenant))
+        if bucket is None:
+            rate, burst = self.limits[api]
+            bucket = self._tenants[(api, tenant)] = TokenBucket(
+                rate * self.tenant_share,
+                max(1.0, burst * self.tenant_share)
+                )
+        return bucket
+
+    def acquire(self, api, tenant=None, timeout=None):
+        """
+        Take one request from the API's quota, waiting for it if needed
+
+        Args:
+            api (str): key of limits, e.g. 'tmdb'
+            tenant (str, optional): tenant charged besides the shared
+                bucket, none outside a session
+            timeout (float, optional): longest wait in seconds,
+                no limit if None
+
+        Raises:
+            QuotaExceeded: if the request isn't granted within timeout
+        """
+        if api not in self._shared:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                buckets = [self._shared[api]]
+                if tenant is not None:
+                    buckets.append(self._tenant_bucket(api, tenant))
+                for bucket in buckets:
+                    bucket.refill(now)
+                wait = max(bucket.wait_time() for bucket in buckets)
+                if wait == 0:
+                    for bucket in buckets:
+                        bucket.tokens -= 1
+                    return
+            if deadline is not None and now + wait > deadline:
+                raise QuotaExceeded(
+                    f"{api} quota of '{tenant or 'shared'}' used up, "
+                    "try again in a few seconds"
+                    )
+            time.sleep(wait)
+
+    def forget_tenant(self, tenant):
+        """
+        Drop a tenant's buckets, e.g. when its last session ends
+        """
+        with self._lock:
+            for key in [key for key in self._tenants if key[1] == tenant]:
+                del self._tenants[key]
+
+
+_governor = None
+
+
+def set_quota_governor(governor):
+    """
+    Install the process-wide governor, None to turn quotas off
+
+    Args:
+        governor (QuotaGovernor or None)
+    """
+    global _governor
+    _governor = governor
+
+
+def get_quota_governor():
+    """
+    Returns:
+        QuotaGovernor or None: the installed governor
+    """
+    return _governor
+
+
+def acquire_quota(api, timeout=None):
+    """
+    Take one request from the API's quota for the current tenant
+    No-op unless a governor is installed
+
+    Args:
+        api (str): e.g. 'tmdb' or 'sheets'
+        timeout (float, optional): longest wait in seconds
+
+    Raises:
+        QuotaExceeded: if the request isn't granted within timeout
+    """
+    if _governor is not None:
+        _governor.acquire(api, current_tenant.get(), timeout)
@@ -0,0 +1,332 @@
+"""
+Lightweight span tracing for the recommendation pipeline.
+
+Stages are wrapped in spans (a decorator for functions, a context manager
+for inline blocks) that record their duration, the number of items they
+produced and their parent stage. Spans are grouped in runs, one per
+menu action or command: when a run ends, a summary table of its stages
+is printed and its spans are appended to a JSONL trace file. The active
+run is kept in a context variable, so sessions sharing the process (see
+ui.sessions) each trace their own run, and worker threads started with
+a copy of the caller's context add to the caller's run.
+
+Tracing is off by default and costs one attribute check per span.
+Enable it with the REELTRACKER_TRACE environment variable or the
+`--trace` command line flag; REELTRACKER_TRACE_FILE sets the trace file
+(default `trace.jsonl` in the cache directory).
+"""
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from storage.paths import cache_path
+
+TRACE_FILE = 'trace.jsonl'
+
+# Run the current context records spans into, None outside a run
+_current_run = ContextVar('trace_run', default=None)
+
+
+class Span:
+    """
+    One timed stage
+
+    Attributes:
+        name (str): stage name, e.g. 'tmdb.request'
+        span_id (int): id unique within the session
+        parent_id (int or None): id of the enclosing span in the thread
+        items (int or None): number of items the stage produced
+        attrs (dict): extra values, e.g. {'cached': True}
+        started (float): perf_counter() at start
+        duration (float): seconds, set when the span ends
+    """
+    __slots__ = (
+        'name', 'span_id', 'parent_id', 'items', 'attrs',
+        'started', 'duration', 'thread'
+    )
+
+    def __init__(self, name, span_id, parent_id, items=None):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.items = items
+        self.attrs = {}
+        self.thread = threading.current_thread().name
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def set(self, items=None, **attrs):
+        """
+        Record the item count and/or extra values of the stage
+        """
+        if items is not None:
+            self.items = items
+        self.attrs.update(attrs)
+
+    def to_dict(self, run_id, run_started):
+        """
+        Args:
+            run_id (str): id of the run the span belongs to
+            run_started (float): perf_counter() at the start of the run
+
+        Returns:
+            dict: one JSONL trace record
+        """
+        record = {
+            'run': run_id,
+            'span': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'thread': self.thread,
+            'start_ms': round((self.started - run_started) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3),
+            'items': self.items,
+        }
+        if self.attrs:
+            record['attrs'] = self.attrs
+        return record
+
+
+class _NullSpan:
+    """
+    Span handed out while tracing is off
+    """
+    def set(self, items=None, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Collects the spans of the runs in progress
+
+    Attributes:
+        enabled (bool): True if spans are recorded
+        path (str or None): JSONL trace file, resolved on first write
+    """
+    def __init__(self, enabled=False, path=None):
+        self.enabled = enabled
+        self.path = path
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    def enable(self, path=None):
+        """
+        Start recording spans
+
+        Args:
+            path (str, optional): JSONL trace file
+        """
+        self.enabled = True
+        if path is not None:
+            self.path = path
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, items=None):
+        """
+        Time a block as a stage of the current run
+
+        Args:
+            name (str): stage name
+            items (int, optional): number of items, can be set later
+                with span.set(items=...)
+
+        Yields:
+            Span: the span, or a no-op stand-in while tracing is off
+        """
+        run = _current_run.get()
+        if not self.enabled or run is None:
+            yield _NULL_SPAN
+            return
+        stack = self._stack()
+        span = Span(
+            name, next(self._ids), stack[-1].span_id if stack else None,
+            items
+            )
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.started
+            stack.pop()
+            with self.lock:
+                if not run['ended']:
+                    run['spans'].append(span)
+
+    @contextmanager
+    def run(self, name):
+        """
+        Group the spans of one menu action or command; on exit, print
+        their summary and append them to the trace file
+        A run inside a run of the same context adds to the outer one
+
+        Args:
+            name (str): run name, e.g. 'recommendation'
+        """
+        if not self.enabled or _current_run.get() is not None:
+            yield
+            return
+        run = {
+            'id': f'{time.strftime("%Y%m%dT%H%M%S")}-{next(self._ids)}',
+            'name': name,
+            'started': time.perf_counter(),
+            'spans': [],
+            'ended': False,
+        }
+        token = _current_run.set(run)
+        try:
+            with self.span(name):
+                yield
+        finally:
+            _current_run.reset(token)
+            with self.lock:
+                # spans of worker threads still running are dropped
+                run['ended'] = True
+            self._report(run)
+
+    def _report(self, run):
+        if not run['spans']:
+            return
+        total = max(span.duration for span in run['spans'])
+        print(f"\nTrace '{run['name']}' ({total * 1000:.1f} ms)")
+        print(format_summary(summarize(run['spans'])))
+        self._write(run)
+
+    def _write(self, run):
+        path = self.path or os.getenv('REELTRACKER_TRACE_FILE')
+        try:
+            with open(path or cache_path(TRACE_FILE), 'a') as trace_file:
+                for span in sorted(run['spans'], key=lambda s: s.started):
+                    trace_file.write(json.dumps(
+                        span.to_dict(run['id'], run['started'])
+                        ) + '\n')
+        except OSError:
+            print("\n⚠️  Could not write the trace file.")
+
+
+def summarize(spans):
+    """
+    Aggregate spans by stage name
+
+    Args:
+        spans (list[Span]): finished spans
+
+    Returns:
+        list[dict]: name, calls, total_ms, mean_ms, max_ms and items per
+        stage, slowest total first
+    """
+    stages = {}
+    for span in spans:
+        stage = stages.setdefault(span.name, {
+            'name': span.name, 'calls': 0, 'total_ms': 0.0,
+            'max_ms': 0.0, 'items': None,
+            })
+        duration = span.duration * 1000
+        stage['calls'] += 1
+        stage['total_ms'] += duration
+        stage['max_ms'] = max(stage['max_ms'], duration)
+        if span.items is not None:
+            stage['items'] = (stage['items'] or 0) + span.items
+    for stage in stages.values():
+        stage['mean_ms'] = stage['total_ms'] / stage['calls']
+    return sorted(
+        stages.values(), key=lambda stage: stage['total_ms'], reverse=True
+        )
+
+
+def format_summary(rows):
+    """
+    Format stage summaries as a table
+
+    Args:
+        rows (list[dict]): result of summarize()
+
+    Returns:
+        str: one line per stage
+    """
+    width = max([len(row['name']) for row in rows] + [5])
+    lines = [
+        f"  {'stage':<{width}}  {'calls':>6}  {'total ms':>9}  "
+        f"{'mean ms':>8}  {'max ms':>8}  {'items':>6}"
+        ]
+    for row in rows:
+        items = '' if row['items'] is None else row['items']
+        lines.append(
+            f"  {row['name']:<{width}}  {row['calls']:>6}  "
+            f"{row['total_ms']:>9.2f}  {row['mean_ms']:>8.2f}  "
+            f"{row['max_ms']:>8.2f}  {items:>6}"
+            )
+    return '\n'.join(lines)
+
+
+def _count(result):
+    """
+    Item count of a stage's result: its length if it has one
+    """
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+tracer = Tracer(enabled=bool(os.getenv('REELTRACKER_TRACE')))
+
+
+def traced(name, count=_count):
+    """
+    Decorator timing every call of a function as a stage
+
+    Args:
+        name (str): stage name
+        count (callable, optional): item count of a result, the length
+            of the result by default; None to record no count
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name) as span:
+                result = func(*args, **kwargs)
+                if count is not None:
+                    span.set(items=count(result))
+                return result
+        return wrapper
+    return decorator
+
+
+def trace_span(name, items=None):
+    """
+    Time a block as a stage of the current run (see Tracer.span)
+    """
+    return tracer.span(name, items)
+
+
+def trace_run(name):
+    """
+    Group the spans of one menu action or command (see Tracer.run)
+    """
+    return tracer.run(name)
+
+
+def enable_tracing(path=None):
+    """
+    Turn tracing on for the session, e.g. from the --trace flag
+
+    Args:
+        path (str, optional): JSONL trace file
+    """
+    tracer.enable(path)
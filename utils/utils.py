@@ -5,20 +5,76 @@ scoring popularity, and sorting.
 Supports both raw API data and custom objects for flexible handling.
 """
 import math
+import calendar
 from datetime import datetime
 
 
-# --- Formatting ---
+# --- Dates ---
+def parse_iso_date(date):
+    """
+    Parse the leading YYYY[-MM[-DD]] prefix of an ISO date string
+    Slices the digits directly instead of going through strptime,
+    missing month/day default to 1
+
+    Args:
+        date (str): ISO formatted date, e.g. '2024-05-01' or '2024'
+
+    Returns:
+        tuple[int, int, int] or None: (year, month, day), None if malformed
+    """
+    if not isinstance(date, str) or len(date) < 4:
+        return None
+    year = date[:4]
+    if not year.isdigit() or year == '0000':
+        return None
+    month = date[5:7]
+    day = date[8:10]
+    month = int(month) if len(month) == 2 and month.isdigit() else 1
+    day = int(day) if len(day) == 2 and day.isdigit() else 1
+    if not 1 <= month <= 12 or not 1 <= day <= 31:
+        return int(year), 1, 1
+    return int(year), month, day
+
+
 def extract_year(date):
     """
-    Use datetime to extract year from string
+    Extract year from an ISO date string
+
+    Args:
+        date (str): YYYY-MM-DD format (partial dates are accepted)
+
+    Returns:
+        str: YYYY, or 'Unknown' if the date is missing or malformed
+    """
+    if not isinstance(date, str) or not date[:4].isdigit():
+        return 'Unknown'
+    return date[:4]
+
+
+def timestamp_to_epoch(timestamp):
+    """
+    Convert a 'YYYY-MM-DD HH:MM:SS' timestamp into epoch seconds
+    Timestamps are treated as naive, only their ordering matters
 
     Args:
-        date (str): YYYY-MM-DD format
+        timestamp (str): timestamp as stored in the sheet
+
+    Returns:
+        int: seconds since epoch, 0 for empty or malformed values
     """
-    d = datetime.strptime(date, '%Y-%m-%d')
-    year_string = d.strftime("%Y")
-    return year_string
+    parsed = parse_iso_date(timestamp)
+    if parsed is None:
+        return 0
+    time_part = timestamp[11:19]
+    hours = minutes = seconds = 0
+    if len(time_part) == 8 and time_part[2] == ':' and time_part[5] == ':':
+        clock = time_part.split(':')
+        if all(unit.isdigit() for unit in clock):
+            hours, minutes, seconds = (int(unit) for unit in clock)
+    return calendar.timegm(parsed + (hours, minutes, seconds))
+
+
+# --- Formatting ---
 
 
 def get_current_timestamp():